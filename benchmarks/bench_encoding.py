@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Report encode time against output size for every output format and
+encoding preset. The output of the example assets is used, scaled up so that
+the timings are meaningful.
+"""
+
+import argparse
+import os
+import io
+import json
+import time
+
+import PIL.Image
+
+import templatelayer.template_layout
+import templatelayer.encoding
+
+_ASSETS_PATH = \
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '..',
+        'assets',
+        'example')
+
+_FORMATS = ['PNG', 'JPEG', 'WEBP']
+_DEFAULT_SCALE = 10
+_DEFAULT_REPEAT = 3
+
+# Placeholder name -> component file-name
+_COMPONENTS = {
+    'top-left': 'top_left.png',
+    'top-right': 'top_right.png',
+    'middle-center': 'middle_center.png',
+    'bottom-center': 'bottom_center.png',
+}
+
+def _get_output(scale):
+    with open(os.path.join(_ASSETS_PATH, 'layout.json')) as f:
+        config = json.load(f)
+
+    template_im = PIL.Image.open(os.path.join(_ASSETS_PATH, 'template.png'))
+    ct = templatelayer.template_layout.CompiledTemplate(template_im, config)
+
+    im_mapping = {
+        name: PIL.Image.open(os.path.join(_ASSETS_PATH, filename))
+        for name, filename
+        in _COMPONENTS.items()
+    }
+
+    output_im = ct.render(im_mapping)
+
+    size = (output_im.width * scale, output_im.height * scale)
+    return output_im.resize(size, PIL.Image.BICUBIC)
+
+def _time(repeat, callback):
+    best_duration = None
+    for _ in range(repeat):
+        start_time = time.time()
+        result = callback()
+        duration = time.time() - start_time
+
+        if best_duration is None or duration < best_duration:
+            best_duration = duration
+
+    return best_duration, result
+
+def _encode(im, format_, preset):
+    f = io.BytesIO()
+    templatelayer.encoding.save(im, f, format_=format_, preset=preset)
+
+    return f.getvalue()
+
+def _main(args):
+    im = _get_output(args.scale)
+
+    print("Output: ({}, {}) {}".format(im.width, im.height, im.mode))
+    print('')
+
+    print("{:>6}  {:>9}  {:>10}  {:>10}".format(
+          'format', 'preset', 'time (s)', 'size (B)'))
+
+    presets = [None] + list(templatelayer.encoding.PRESETS)
+
+    for format_ in args.formats:
+        for preset in presets:
+            duration, data = \
+                _time(
+                    args.repeat,
+                    lambda: _encode(im, format_, preset))
+
+            print("{:>6}  {:>9}  {:>10.4f}  {:>10}".format(
+                  format_, preset or '(default)', duration, len(data)))
+
+def _get_args():
+    p = argparse.ArgumentParser()
+
+    p.add_argument(
+        'formats',
+        nargs='*',
+        type=lambda s: s.upper(),
+        default=_FORMATS,
+        help="Output formats to measure")
+
+    p.add_argument(
+        '--scale',
+        type=int,
+        default=_DEFAULT_SCALE,
+        help="Factor to scale the example output up by")
+
+    p.add_argument(
+        '--repeat',
+        type=int,
+        default=_DEFAULT_REPEAT,
+        help="Number of times to encode (the best time is reported)")
+
+    args = p.parse_args()
+    return args
+
+if __name__ == '__main__':
+    args = _get_args()
+    _main(args)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+"""Compare the PIL and NumPy compositing backends for grids of small
+placeholders (like a thumbnail sheet). The NumPy backend is measured both
+with components as images (as they would be when loaded from files) and as
+arrays (as they would be when produced by an upstream NumPy pipeline).
+"""
+
+import argparse
+import math
+import time
+
+import templatelayer.template_layout
+import templatelayer.numpy_backend
+import templatelayer.testing_common
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_DEFAULT_COUNTS = [100, 1000, 10000]
+_TILE_SIZE = 16
+_DEFAULT_REPEAT = 3
+
+def _get_grid(count):
+    columns = int(math.ceil(math.sqrt(count)))
+
+    placeholders = {}
+    im_mapping = {}
+    for i in range(count):
+        row, column = divmod(i, columns)
+        name = 'tile-{}'.format(i)
+
+        placeholders[name] = {
+            'left': column * _TILE_SIZE,
+            'top': row * _TILE_SIZE,
+            'width': _TILE_SIZE,
+            'height': _TILE_SIZE,
+        }
+
+        color = (i % 256, (i // 256) % 256, 0)
+
+        im_mapping[name] = \
+            templatelayer.testing_common.get_new_image(
+                _TILE_SIZE,
+                _TILE_SIZE,
+                color=color)
+
+    config = {
+        'placeholders': placeholders,
+    }
+
+    side = columns * _TILE_SIZE
+    template_im = templatelayer.testing_common.get_new_image(side, side)
+
+    return template_im, config, im_mapping
+
+def _time(repeat, callback):
+    best_duration = None
+    for _ in range(repeat):
+        start_time = time.time()
+        result = callback()
+        duration = time.time() - start_time
+
+        if best_duration is None or duration < best_duration:
+            best_duration = duration
+
+    return best_duration, result
+
+def _main(args):
+    if templatelayer.numpy_backend.is_available() is False:
+        print("NumPy is not installed.")
+        return
+
+    print("{:>8}  {:>9}  {:>12}  {:>8}  {:>12}  {:>8}  {:>9}".format(
+          'count', 'pil (s)', 'np-image (s)', 'speedup', 'np-array (s)',
+          'speedup', 'identical'))
+
+    for count in args.counts:
+        template_im, config, im_mapping = _get_grid(count)
+
+        ct = templatelayer.template_layout.CompiledTemplate(template_im, config)
+        nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+
+        pil_duration, pil_im = \
+            _time(args.repeat, lambda: ct.render(im_mapping))
+
+        image_duration, image_im = \
+            _time(args.repeat, lambda: nc.render(im_mapping))
+
+        a_mapping = {
+            name: numpy.asarray(im)
+            for name, im
+            in im_mapping.items()
+        }
+
+        array_duration, array_im = \
+            _time(args.repeat, lambda: nc.render(a_mapping))
+
+        is_identical = \
+            pil_im.tobytes() == image_im.tobytes() and \
+            pil_im.tobytes() == array_im.tobytes()
+
+        print("{:>8}  {:>9.4f}  {:>12.4f}  {:>7.2f}x  {:>12.4f}  {:>7.2f}x  "
+              "{:>9}".format(
+              count, pil_duration, image_duration,
+              pil_duration / image_duration, array_duration,
+              pil_duration / array_duration, str(is_identical)))
+
+def _get_args():
+    p = argparse.ArgumentParser()
+
+    p.add_argument(
+        'counts',
+        nargs='*',
+        type=int,
+        default=_DEFAULT_COUNTS,
+        help="Placeholder counts to measure")
+
+    p.add_argument(
+        '--repeat',
+        type=int,
+        default=_DEFAULT_REPEAT,
+        help="Number of times to render (the best time is reported)")
+
+    args = p.parse_args()
+    return args
+
+if __name__ == '__main__':
+    args = _get_args()
+    _main(args)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""Measure how long layout validation takes as the number of placeholders
+grows. The placeholders are laid out as a square grid (like a contact sheet or
+a tile mosaic), which is the worst case for the number of placeholders
+crossed by the sweep at any one time.
+"""
+
+import argparse
+import math
+import time
+
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_DEFAULT_COUNTS = [1000, 10000, 100000]
+_TILE_SIZE = 4
+
+def _get_grid_config(count):
+    columns = int(math.ceil(math.sqrt(count)))
+
+    placeholders = {}
+    for i in range(count):
+        row, column = divmod(i, columns)
+
+        placeholders['tile-{}'.format(i)] = {
+            'left': column * _TILE_SIZE,
+            'top': row * _TILE_SIZE,
+            'width': _TILE_SIZE,
+            'height': _TILE_SIZE,
+        }
+
+    config = {
+        'placeholders': placeholders,
+    }
+
+    return config
+
+def _main(args):
+    print("{:>10}  {:>10}  {:>14}".format('count', 'seconds', 'us/placeholder'))
+
+    for count in args.counts:
+        config = _get_grid_config(count)
+
+        side = int(math.ceil(math.sqrt(count))) * _TILE_SIZE
+        template_im = templatelayer.testing_common.get_new_image(side, side)
+
+        start_time = time.time()
+        templatelayer.template_layout.SimpleTemplateLayout(template_im, config)
+        duration = time.time() - start_time
+
+        print("{:>10}  {:>10.3f}  {:>14.2f}".format(
+              count, duration, duration / count * 1000000.0))
+
+def _get_args():
+    p = argparse.ArgumentParser()
+
+    p.add_argument(
+        'counts',
+        nargs='*',
+        type=int,
+        default=_DEFAULT_COUNTS,
+        help="Placeholder counts to measure")
+
+    args = p.parse_args()
+    return args
+
+if __name__ == '__main__':
+    args = _get_args()
+    _main(args)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+
+"""Time every stage of the compositing pipeline (layout validation, template
+decode, component decode, paste, and encode) along with whole renders, over
+synthetic templates and grid layouts of several sizes and placeholder counts.
+Every case is measured in a fresh process so that the peak RSS reported for it
+is its own rather than that of the largest case so far. Results can be written
+as JSON to compare runs across versions.
+"""
+
+import argparse
+import sys
+import io
+import json
+import math
+import platform
+import time
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import PIL
+import PIL.Image
+
+import templatelayer
+import templatelayer.template_layout
+import templatelayer.encoding
+import templatelayer.testing_common
+
+_DEFAULT_SIZES = ['512x512', '2048x2048']
+_DEFAULT_PLACEHOLDER_COUNTS = [1, 16, 64]
+_DEFAULT_REPEAT = 3
+
+_STAGES = [
+    'validate',
+    'template_decode',
+    'component_decode',
+    'paste',
+    'encode',
+    'render',
+]
+
+def _parse_size(s):
+    width, height = s.lower().split('x')
+    return int(width), int(height)
+
+def _encode_png(im):
+    f = io.BytesIO()
+    im.save(f, 'PNG')
+
+    return f.getvalue()
+
+def _decode(data):
+    im = PIL.Image.open(io.BytesIO(data))
+    im.load()
+
+    return im
+
+def _get_case(width, height, placeholder_count):
+    """Return the encoded template, a grid layout with the given number of
+    placeholders, and encoded components (by placeholder name) that fill it.
+    """
+
+    columns = int(math.ceil(math.sqrt(placeholder_count)))
+    rows = int(math.ceil(float(placeholder_count) / columns))
+
+    cell_width = width // columns
+    cell_height = height // rows
+
+    template_im = \
+        templatelayer.testing_common.get_new_image(
+            width,
+            height,
+            color=(0, 0, 255))
+
+    placeholders = {}
+    components = {}
+
+    for i in range(placeholder_count):
+        name = 'ph{}'.format(i)
+
+        placeholders[name] = {
+            'left': (i % columns) * cell_width,
+            'top': (i // columns) * cell_height,
+            'width': cell_width,
+            'height': cell_height,
+        }
+
+        component_im = \
+            templatelayer.testing_common.get_new_image(
+                cell_width,
+                cell_height,
+                color=(i % 256, (i * 7) % 256, (i * 13) % 256))
+
+        components[name] = _encode_png(component_im)
+
+    config = {
+        'placeholders': placeholders,
+    }
+
+    return _encode_png(template_im), config, components
+
+def _time(repeat, callback):
+    best_duration = None
+    for _ in range(repeat):
+        start_time = time.time()
+        result = callback()
+        duration = time.time() - start_time
+
+        if best_duration is None or duration < best_duration:
+            best_duration = duration
+
+    return best_duration, result
+
+def _get_peak_rss():
+    """Return the peak resident-set size of this process in bytes, or None if
+    it can't be determined on this platform.
+    """
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes and macOS reports bytes.
+    if sys.platform != 'darwin':
+        peak *= 1024
+
+    return peak
+
+def _measure(width, height, placeholder_count, repeat):
+    template_data, config, components = \
+        _get_case(width, height, placeholder_count)
+
+    durations = {}
+
+    durations['template_decode'], template_im = \
+        _time(repeat, lambda: _decode(template_data))
+
+    durations['validate'], _ = \
+        _time(
+            repeat,
+            lambda: templatelayer.template_layout.SimpleTemplateLayout(
+                        template_im,
+                        config))
+
+    ct = templatelayer.template_layout.CompiledTemplate(template_im, config)
+
+    def decode_components():
+        return {
+            name: _decode(data)
+            for name, data
+            in components.items()
+        }
+
+    durations['component_decode'], im_mapping = \
+        _time(repeat, decode_components)
+
+    durations['paste'], output_im = \
+        _time(repeat, lambda: ct.render(im_mapping))
+
+    def encode():
+        f = io.BytesIO()
+        templatelayer.encoding.save(output_im, f, format_='PNG')
+
+        return f.getvalue()
+
+    durations['encode'], _ = _time(repeat, encode)
+
+    def render():
+        f = io.BytesIO()
+
+        templatelayer.encoding.save(
+            ct.render(decode_components()),
+            f,
+            format_='PNG')
+
+        return f.getvalue()
+
+    durations['render'], _ = _time(repeat, render)
+
+    megapixels = width * height / 1000000.0
+
+    result = {
+        'width': width,
+        'height': height,
+        'placeholders': placeholder_count,
+        'seconds': durations,
+        'renders_per_second': 1.0 / durations['render'],
+        'megapixels_per_second': megapixels / durations['render'],
+        'peak_rss_bytes': _get_peak_rss(),
+    }
+
+    return result
+
+def _measure_in_process(width, height, placeholder_count, repeat):
+    """Run the case in a new (spawned rather than forked, so that it doesn't
+    start with our memory) process. The peak RSS is process-wide.
+    """
+
+    context = multiprocessing.get_context('spawn')
+
+    with context.Pool(1) as pool:
+        result = \
+            pool.apply(
+                _measure,
+                (width, height, placeholder_count, repeat))
+
+    return result
+
+def _main(args):
+    sizes = [_parse_size(s) for s in args.sizes]
+
+    results = []
+    for width, height in sizes:
+        for placeholder_count in args.placeholders:
+            result = \
+                _measure_in_process(
+                    width,
+                    height,
+                    placeholder_count,
+                    args.repeat)
+
+            results.append(result)
+
+            if args.json_filepath == '-':
+                continue
+
+            stage_phrases = [
+                '{}={:.4f}s'.format(stage, result['seconds'][stage])
+                for stage
+                in _STAGES
+            ]
+
+            peak_rss = result['peak_rss_bytes']
+            if peak_rss is None:
+                peak_rss_phrase = '(unknown)'
+            else:
+                peak_rss_phrase = \
+                    '{:.1f}MB'.format(peak_rss / (1024.0 * 1024.0))
+
+            print("({}, {}) x{}: {:.1f} renders/s {:.1f} MP/s peak-rss={}".format(
+                  width, height, placeholder_count,
+                  result['renders_per_second'],
+                  result['megapixels_per_second'],
+                  peak_rss_phrase))
+
+            print("  {}".format(' '.join(stage_phrases)))
+
+    if args.json_filepath is None:
+        return
+
+    report = {
+        'version': templatelayer.__version__,
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    if args.json_filepath == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print('')
+    else:
+        with open(args.json_filepath, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+def _get_args():
+    p = argparse.ArgumentParser()
+
+    p.add_argument(
+        '--sizes',
+        nargs='+',
+        default=_DEFAULT_SIZES,
+        help="Template sizes to measure, as WIDTHxHEIGHT")
+
+    p.add_argument(
+        '--placeholders',
+        nargs='+',
+        type=int,
+        default=_DEFAULT_PLACEHOLDER_COUNTS,
+        help="Placeholder counts to measure. Placeholders are laid out in a "
+             "grid that fills the template.")
+
+    p.add_argument(
+        '--repeat',
+        type=int,
+        default=_DEFAULT_REPEAT,
+        help="Number of times to run every stage (the best time is "
+             "reported)")
+
+    p.add_argument(
+        '--json',
+        dest='json_filepath',
+        help="Write the results as JSON to the given file-path (\"-\" for "
+             "STDOUT, in which case nothing else is printed)")
+
+    args = p.parse_args()
+    return args
+
+if __name__ == '__main__':
+    args = _get_args()
+    _main(args)
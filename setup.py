@@ -32,6 +32,9 @@ setuptools.setup(
     zip_safe=False,
     scripts=[
         'templatelayer/resources/scripts/template_image_apply_overlays',
+        'templatelayer/resources/scripts/template_image_convert_raw',
+        'templatelayer/resources/scripts/template_image_render_client',
     ],
     install_requires=install_requires,
+    python_requires='>=3.7',
 )
@@ -0,0 +1,277 @@
+"""Renders animated (multi-frame) templates, e.g. GIF, APNG, or WebP.
+
+Every frame of the template is decoded once, converted into its own canvas,
+and composited in place. Static components are decoded and fit once and then
+applied to every frame. Animated components must have as many frames as the
+template, and each of their frames is applied to the matching frame of the
+template. Frames can be composited on several threads at once, with only a
+bounded number of them in flight at a time. Pillow's encoders need every
+frame before they write anything, so a rendered animation is held in memory
+in full until it's written (see `templatelayer.encoding.save_all()`).
+"""
+
+import logging
+import collections
+import concurrent.futures
+
+import PIL.Image
+
+import templatelayer.template_layout
+import templatelayer.component_loader
+import templatelayer.encoding
+import templatelayer.output_cache
+import templatelayer.instrumentation
+
+_LOGGER = logging.getLogger(__name__)
+
+# Animated formats keep transparency in an alpha channel.
+DEFAULT_CANVAS_MODE = 'RGBA'
+
+# The number of frames that may be in flight for every worker.
+_FRAMES_PER_WORKER = 2
+
+
+class AnimationRenderException(templatelayer.template_layout.TemplateLayoutException):
+    pass
+
+
+def get_frame_count(im):
+    return getattr(im, 'n_frames', 1)
+
+def is_animated(im):
+    return get_frame_count(im) > 1
+
+
+class AnimatedRenderer(object):
+    """Renders outputs from one multi-frame template and one layout. The
+    layout is parsed and validated once, against the first frame.
+    """
+
+    def __init__(self, template_im, config, layout_cache=None,
+                 canvas_mode=DEFAULT_CANVAS_MODE, fit_cache=None,
+                 validate_bounds=False, workers=1):
+        """`template_im` must be an open (not necessarily loaded) image. It's
+        read one frame at a time for every render, so it must stay open and
+        must not be used by two renders at once. Frames are composited on
+        `workers` threads.
+        """
+
+        assert \
+            workers >= 1, \
+            "At least one worker is required."
+
+        template_im.seek(0)
+
+        # This only parses and validates the layout. The frames are decoded
+        # for every render.
+        tl = \
+            templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                config,
+                layout_cache=layout_cache,
+                validate_bounds=validate_bounds)
+
+        self._placeholder_configs = tl.placeholder_configs
+
+        # Load every mask image once, up front, so that frames never have to.
+
+        self._masks = {}
+        for name, ph in self._placeholder_configs.items():
+            if ph.mask is not None and \
+               ph.mask != templatelayer.template_layout.MASK_ALPHA:
+                self._masks[name] = templatelayer.template_layout.load_mask(ph)
+
+        self._template_im = template_im
+        self._canvas_mode = canvas_mode
+        self._fit_cache = fit_cache
+        self._workers = workers
+
+    def _new_layout(self, canvas_im):
+        tl = \
+            templatelayer.template_layout.SimpleTemplateLayout.from_placeholder_configs(
+                canvas_im,
+                self._placeholder_configs,
+                masks=self._masks,
+                fit_cache=self._fit_cache)
+
+        return tl
+
+    def _open_components(self, components):
+        """Open every component. Return a 2-tuple of a dictionary of the
+        static components (name -> (fitted image, offset)) and a dictionary of
+        the animated ones (name -> open image).
+        """
+
+        # This layout is only used to check and fit components. Nothing is
+        # pasted into it.
+        tl = self._new_layout(self._template_im)
+        loader = templatelayer.component_loader.ComponentLoader(tl)
+
+        frame_count = get_frame_count(self._template_im)
+
+        static = {}
+        animated = {}
+
+        try:
+            for name, filepath in components.items():
+                im = PIL.Image.open(filepath)
+
+                try:
+                    component_frame_count = get_frame_count(im)
+
+                    if component_frame_count > 1:
+                        if component_frame_count != frame_count:
+                            raise AnimationRenderException(
+                                "Component [{}] has ({}) frames but the "
+                                "template has ({}).".format(
+                                name, component_frame_count, frame_count))
+
+                        tl.validate_image_for_placeholder(name, im)
+                except Exception:
+                    im.close()
+                    raise
+
+                if component_frame_count > 1:
+                    animated[name] = im
+                    continue
+
+                im.close()
+
+                with loader.open(name, filepath) as component_im:
+                    fitted_im, offset = tl.fit_component(name, component_im)
+
+                    # The fitted image outlives the component.
+                    if fitted_im is component_im:
+                        fitted_im = component_im.copy()
+
+                static[name] = (fitted_im, offset)
+        except Exception:
+            for im in animated.values():
+                im.close()
+
+            raise
+
+        return static, animated
+
+    def _get_frame(self, im, i, stage, name=None):
+        """Seek to the given frame and return a copy of it in the canvas
+        mode. The copy is what is composited into (and what the encoder
+        receives), so no other copy is made.
+        """
+
+        with templatelayer.instrumentation.measure(stage, name) \
+                as measurement:
+            im.seek(i)
+
+            frame_im = im.convert(self._canvas_mode)
+            measurement.pixels = frame_im.width * frame_im.height
+
+        # The duration of the frame, in milliseconds.
+        duration = im.info.get('duration')
+        if duration is not None:
+            frame_im.info['duration'] = duration
+
+        return frame_im
+
+    def _render_frame(self, canvas_im, static, animated_frames):
+        tl = self._new_layout(canvas_im)
+
+        for name, (fitted_im, offset) in static.items():
+            tl.apply_fitted_component(name, fitted_im, offset)
+
+        for name, frame_im in animated_frames.items():
+            tl.apply_component(name, frame_im)
+
+        return tl.resource
+
+    def _iterate_jobs(self, static, animated):
+        for i in range(get_frame_count(self._template_im)):
+            canvas_im = \
+                self._get_frame(
+                    self._template_im,
+                    i,
+                    templatelayer.instrumentation.STAGE_TEMPLATE_DECODE)
+
+            animated_frames = {
+                name: self._get_frame(
+                        im,
+                        i,
+                        templatelayer.instrumentation.STAGE_COMPONENT_DECODE,
+                        name)
+                for name, im
+                in animated.items()
+            }
+
+            yield canvas_im, static, animated_frames
+
+    def iterate_frames(self, components):
+        """Render the given components (a mapping of placeholder names to
+        file-paths) into every frame of the template and yield the frames in
+        order. Frames are only rendered a few (per worker) ahead of the one
+        that is due next, so a consumer that writes them out as they arrive
+        doesn't hold the whole animation.
+        """
+
+        static, animated = self._open_components(components)
+
+        try:
+            jobs = self._iterate_jobs(static, animated)
+
+            if self._workers == 1:
+                for job in jobs:
+                    yield self._render_frame(*job)
+
+                return
+
+            # Frames are decoded here, in order, and composited on the
+            # workers. Only a few frames per worker are submitted ahead of
+            # the one that is due next.
+
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._workers) as executor:
+                pending = collections.deque()
+
+                for job in jobs:
+                    pending.append(executor.submit(self._render_frame, *job))
+
+                    if len(pending) >= self._workers * _FRAMES_PER_WORKER:
+                        yield pending.popleft().result()
+
+                while pending:
+                    yield pending.popleft().result()
+        finally:
+            for im in animated.values():
+                im.close()
+
+    def render(self, components, fp, format_=None, preset=None, **options):
+        """Render the given components into every frame and save the
+        animation to the given file-path or file-like resource. Every frame is
+        held in memory until the animation is written. The format defaults to
+        the one implied by the file-path and then to that of the template. The
+        loop-count of the template is kept.
+        """
+
+        if format_ is None:
+            format_ = \
+                templatelayer.encoding.get_format(
+                    fp,
+                    default=self._template_im.format)
+
+        if isinstance(fp, str):
+            templatelayer.output_cache.prepare_output(fp)
+
+        templatelayer.encoding.save_all(
+            self.iterate_frames(components),
+            fp,
+            format_=format_,
+            preset=preset,
+            loop=self._template_im.info.get('loop'),
+            **options)
+
+    @property
+    def frame_count(self):
+        return get_frame_count(self._template_im)
+
+    @property
+    def placeholder_configs(self):
+        return self._placeholder_configs
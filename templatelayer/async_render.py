@@ -0,0 +1,153 @@
+"""An asyncio facade for rendering from within an event loop (e.g. a web
+service). Nothing here blocks the loop: files are read, and images are
+decoded, composited, and encoded, on an executor.
+"""
+
+import logging
+import asyncio
+import concurrent.futures
+import io
+
+import PIL.Image
+
+import templatelayer.template_layout
+import templatelayer.component_loader
+import templatelayer.encoding
+
+_LOGGER = logging.getLogger(__name__)
+
+# The number of renders that may be in flight at once. Every render holds its
+# canvas and its components in memory, so this bounds memory.
+DEFAULT_MAX_CONCURRENCY = 4
+
+DEFAULT_FORMAT = 'PNG'
+
+
+def _read(resource):
+    """Return the data of the given file-path. Data is returned as-is."""
+
+    if isinstance(resource, bytes):
+        return resource
+
+    with open(resource, 'rb') as f:
+        return f.read()
+
+def _compile(template_data, config, layout_cache):
+    template_im = PIL.Image.open(io.BytesIO(template_data))
+
+    ct = \
+        templatelayer.template_layout.CompiledTemplate(
+            template_im,
+            config,
+            layout_cache=layout_cache)
+
+    return ct
+
+def _render(ct, component_data, format_, preset, options):
+    tl = ct.new_layout()
+    loader = templatelayer.component_loader.ComponentLoader(tl)
+
+    for name, data in component_data:
+        with loader.open(name, io.BytesIO(data)) as overlay_im:
+            tl.apply_component(name, overlay_im)
+
+    f = io.BytesIO()
+
+    templatelayer.encoding.save(
+        tl.resource,
+        f,
+        format_=format_,
+        preset=preset,
+        **options)
+
+    return f.getvalue()
+
+
+class AsyncRenderer(object):
+    """Renders with a `CompiledTemplate` without blocking the event loop.
+
+    The work is done on `executor` (a thread-pool of `max_concurrency` threads
+    if not given; PIL releases the GIL while decoding, compositing, and
+    encoding). No more than `max_concurrency` renders are in flight at once;
+    the rest wait on a semaphore without holding any of their data.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 executor=None):
+        self._max_concurrency = max_concurrency
+
+        # Before Python 3.10, a semaphore belongs to the loop that is current
+        # when it's created, so it's only created once we're running in one
+        # (and again if we're later used from another).
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        if executor is None:
+            self._executor = \
+                concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max_concurrency)
+
+            self._owns_executor = True
+        else:
+            self._executor = executor
+            self._owns_executor = False
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._semaphore_loop = loop
+
+        return self._semaphore
+
+    async def _run(self, f, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, f, *args)
+
+    async def compile(self, template, config, layout_cache=None):
+        """Decode the template and validate the layout, and return a
+        `CompiledTemplate` to render with. `template` is a file-path or the
+        encoded template data.
+        """
+
+        template_data = await self._run(_read, template)
+        ct = await self._run(_compile, template_data, config, layout_cache)
+
+        return ct
+
+    async def render(self, ct, components, format_=DEFAULT_FORMAT,
+                     preset=None, **options):
+        """Apply the given components (a mapping of placeholder names to
+        file-paths or encoded image data) to a fresh copy of the template of
+        the given `CompiledTemplate` and return the output encoded with the
+        given preset and options (see `templatelayer.encoding`).
+        """
+
+        async with self._get_semaphore():
+            names = list(components.keys())
+
+            reads = [
+                self._run(_read, components[name])
+                for name
+                in names
+            ]
+
+            component_data = list(zip(names, await asyncio.gather(*reads)))
+
+            data = \
+                await self._run(
+                    _render,
+                    ct,
+                    component_data,
+                    format_,
+                    preset,
+                    options)
+
+        return data
+
+    def close(self):
+        """Shut down the executor if it was created here."""
+
+        if self._owns_executor is True:
+            self._executor.shutdown()
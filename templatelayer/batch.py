@@ -0,0 +1,633 @@
+import logging
+import collections
+import csv
+import json
+import os
+import io
+import multiprocessing
+
+import PIL.Image
+
+import templatelayer.template_layout
+import templatelayer.raw_template
+import templatelayer.fit
+import templatelayer.component_loader
+import templatelayer.encoding
+import templatelayer.incremental
+import templatelayer.output_cache
+import templatelayer.instrumentation
+
+_LOGGER = logging.getLogger(__name__)
+
+_BATCH_JOB = \
+    collections.namedtuple(
+        '_BATCH_JOB', [
+            'output_filepath',
+            'components',
+        ])
+
+_BATCH_RESULT = \
+    collections.namedtuple(
+        '_BATCH_RESULT', [
+            'job',
+            'error',
+            'action',
+        ])
+
+# The action is only reported by incremental renders and for outputs that came
+# from the output cache.
+_BATCH_RESULT.__new__.__defaults__ = (None,)
+
+_MANIFEST_FORMATS = (
+    'jsonl',
+    'csv',
+)
+
+_CSV_OUTPUT_COLUMN_NAME = 'output'
+
+
+class ManifestError(templatelayer.template_layout.TemplateLayoutException):
+    pass
+
+
+class WorkerInitializationError(templatelayer.template_layout.TemplateLayoutException):
+    pass
+
+
+def get_manifest_format(filepath):
+    """Determine the manifest format from the file-path. Anything not ending
+    in ".csv" is considered to be JSONL.
+    """
+
+    _, extension = os.path.splitext(filepath)
+    if extension.lower() == '.csv':
+        return 'csv'
+
+    return 'jsonl'
+
+def _read_jsonl_manifest(f):
+    """Yield one job for every non-empty line. Every line must look like:
+
+        {"output": "<file-path>", "components": {"<name>": "<file-path>"}}
+    """
+
+    for i, line in enumerate(f):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            record = json.loads(line)
+            output_filepath = record['output']
+            components = record['components']
+        except (ValueError, KeyError, TypeError):
+            _LOGGER.exception("Manifest line ({}) is not valid.".format(i + 1))
+            raise ManifestError("Manifest line ({}) is not valid.".format(i + 1))
+
+        yield _BATCH_JOB(
+                output_filepath=output_filepath,
+                components=sorted(components.items()))
+
+def _read_csv_manifest(f):
+    """Yield one job for every row. The header must have an "output" column
+    and one column for each placeholder. Empty cells are ignored.
+    """
+
+    reader = csv.DictReader(f)
+
+    if _CSV_OUTPUT_COLUMN_NAME not in (reader.fieldnames or []):
+        raise ManifestError(
+            "CSV manifest must have an [{}] column.".format(
+            _CSV_OUTPUT_COLUMN_NAME))
+
+    placeholder_names = [
+        name
+        for name
+        in reader.fieldnames
+        if name != _CSV_OUTPUT_COLUMN_NAME
+    ]
+
+    for row in reader:
+        components = [
+            (name, row[name])
+            for name
+            in placeholder_names
+            if row[name]
+        ]
+
+        yield _BATCH_JOB(
+                output_filepath=row[_CSV_OUTPUT_COLUMN_NAME],
+                components=components)
+
+def read_manifest(f, format_='jsonl'):
+    """Yield the jobs described by the given manifest file-like resource."""
+
+    if format_ == 'jsonl':
+        return _read_jsonl_manifest(f)
+    elif format_ == 'csv':
+        return _read_csv_manifest(f)
+
+    raise ValueError("Manifest format not valid: [{}]".format(format_))
+
+
+def _get_result(renderer, job):
+    """Render the job and capture any failure so that one bad job doesn't stop
+    the rest of the batch.
+    """
+
+    try:
+        action = renderer.render(job)
+    except Exception as e:
+        _LOGGER.debug("Job for [{}] failed.".format(job.output_filepath),
+                      exc_info=True)
+
+        error = "{}: {}".format(e.__class__.__name__, e)
+        return _BATCH_RESULT(job=job, error=error)
+
+    return _BATCH_RESULT(job=job, error=None, action=action)
+
+
+class BatchRenderer(object):
+    """Renders many outputs from one template and one layout. The layout is
+    parsed and validated once and the template is decoded once.
+    """
+
+    def __init__(self, template_im, config, layout_cache=None,
+                 canvas_mode=None, fit_cache=None, format_=None, preset=None,
+                 encoder_options=None, output_cache=None,
+                 validate_bounds=False, template_digest=None):
+        """Outputs are saved in `format_` or, by default, the format implied
+        by their extension, with the given encoding preset and options (see
+        `templatelayer.encoding`). If an `OutputCache` is given, outputs that
+        were already rendered from the same template, layout, components, and
+        encoding are taken from it rather than being rendered again; it
+        requires `template_digest`, which identifies the template content
+        (see `get_template_digest()`). If `validate_bounds` is True, a layout
+        with placeholders outside of the template is rejected before anything
+        is rendered.
+        """
+
+        if encoder_options is None:
+            encoder_options = {}
+
+        self._format = format_
+        self._preset = preset
+        self._encoder_options = encoder_options
+        self._output_cache = output_cache
+
+        self._ct = \
+            templatelayer.template_layout.CompiledTemplate(
+                template_im,
+                config,
+                layout_cache=layout_cache,
+                canvas_mode=canvas_mode,
+                fit_cache=fit_cache,
+                validate_bounds=validate_bounds)
+
+        self._output_base_digest = None
+        if output_cache is not None:
+            assert \
+                template_digest is not None, \
+                "A template digest is required with an output cache."
+
+            self._output_base_digest = \
+                self._get_output_base_digest(template_digest)
+
+    def _get_mask_digests(self):
+        """Return the digests of the mask files, by placeholder name."""
+
+        mask_digests = {
+            name: templatelayer.incremental.get_file_digest(
+                    self._ct.placeholder_configs[name].mask)
+            for name
+            in self._ct.masks
+        }
+
+        return mask_digests
+
+    def _get_output_base_digest(self, template_digest):
+        """Return a digest of everything other than the components and the
+        output format that affects an output: the template content, the
+        compiled layout, the mask files, the canvas mode, and the encoding.
+        """
+
+        placeholders = [
+            list(ph)
+            for _, ph
+            in sorted(self._ct.placeholder_configs.items())
+        ]
+
+        description = {
+            'template': template_digest,
+            'placeholders': placeholders,
+            'masks': self._get_mask_digests(),
+            'mode': self._ct.mode,
+            'preset': self._preset,
+            'options': self._encoder_options,
+        }
+
+        encoded = \
+            json.dumps(description, sort_keys=True, separators=(',', ':'))
+
+        return templatelayer.incremental.get_data_digest(
+                encoded.encode('utf-8'))
+
+    def _get_output_key(self, job):
+        format_ = self._format
+        if format_ is None:
+            format_ = templatelayer.encoding.get_format(job.output_filepath)
+
+        component_digests = {
+            name: templatelayer.incremental.get_file_digest(filepath)
+            for name, filepath
+            in job.components
+        }
+
+        base_digest = \
+            templatelayer.incremental.get_data_digest(
+                '{} {}'.format(self._output_base_digest, format_).encode(
+                    'utf-8'))
+
+        return templatelayer.output_cache.get_key(
+                base_digest,
+                component_digests)
+
+    def _apply_components(self, tl, components):
+        loader = templatelayer.component_loader.ComponentLoader(tl)
+
+        for name, filepath in components:
+            with loader.open(name, filepath) as overlay_im:
+                tl.apply_component(name, overlay_im)
+
+    def _save(self, im, output_filepath):
+        templatelayer.output_cache.prepare_output(output_filepath)
+
+        templatelayer.encoding.save(
+            im,
+            output_filepath,
+            format_=self._format,
+            preset=self._preset,
+            **self._encoder_options)
+
+    def render(self, job):
+        """Apply the components of the given job to a fresh copy of the
+        template and write the output. Returns
+        `templatelayer.output_cache.ACTION_CACHED` if the output was taken
+        from the output cache.
+        """
+
+        key = None
+        if self._output_cache is not None:
+            key = self._get_output_key(job)
+
+            if self._output_cache.fetch(key, job.output_filepath) is True:
+                return templatelayer.output_cache.ACTION_CACHED
+
+        tl = self._ct.new_layout()
+        self._apply_components(tl, job.components)
+
+        self._save(tl.resource, job.output_filepath)
+
+        if key is not None:
+            self._output_cache.store(key, job.output_filepath)
+
+    def render_all(self, jobs):
+        """Render every job. Yields a result for each job after it has been
+        processed. Failed jobs have a non-empty `error`.
+        """
+
+        for job in jobs:
+            yield _get_result(self, job)
+
+
+class IncrementalBatchRenderer(BatchRenderer):
+    """A `BatchRenderer` that records what every output was rendered from
+    (see `templatelayer.incremental`) and, on later renders, skips outputs
+    whose components haven't changed and updates outputs where only some
+    have. An update reopens the previous output, restores the template under
+    the changed placeholders, and applies only their new components.
+
+    `template_digest` identifies the template content (e.g. a digest of the
+    template file). Outputs are rendered from scratch if it, the layout, a
+    mask file, or the encoding changes. `render()` returns one of the
+    `templatelayer.incremental` actions or, for a full render that was taken
+    from the output cache, `templatelayer.output_cache.ACTION_CACHED`.
+    """
+
+    def __init__(self, template_im, config, template_digest, **kwargs):
+        super(IncrementalBatchRenderer, self).__init__(
+            template_im,
+            config,
+            template_digest=template_digest,
+            **kwargs)
+
+        encoding = {
+            'format': self._format,
+            'preset': self._preset,
+            'options': self._encoder_options,
+        }
+
+        self._base_digest = \
+            templatelayer.incremental.get_base_digest(
+                template_digest,
+                config,
+                self._get_mask_digests(),
+                encoding)
+
+    def _get_previous_im(self, output_filepath):
+        """Return the previous output as a canvas that can be updated, or
+        None if it can't be.
+        """
+
+        format_ = self._format
+        if format_ is None:
+            format_ = templatelayer.encoding.get_format(output_filepath)
+
+        if format_ not in templatelayer.incremental.LOSSLESS_FORMATS:
+            return None
+
+        try:
+            with PIL.Image.open(output_filepath) as previous_im:
+                if previous_im.size != self._ct.size or \
+                   previous_im.mode != self._ct.mode:
+                    return None
+
+                previous_im.load()
+                return previous_im.copy()
+        except (IOError, OSError):
+            _LOGGER.warning("Previous output can not be read and will be "
+                            "rendered again: [{}]".format(output_filepath))
+
+            return None
+
+    def _update(self, job, changed_names):
+        canvas_im = self._get_previous_im(job.output_filepath)
+        if canvas_im is None:
+            return False
+
+        for name in changed_names:
+            self._ct.restore_placeholder(canvas_im, name)
+
+        changed_names_s = set(changed_names)
+
+        changed_components = [
+            (name, filepath)
+            for name, filepath
+            in job.components
+            if name in changed_names_s
+        ]
+
+        tl = self._ct.new_layout(canvas_im=canvas_im)
+        self._apply_components(tl, changed_components)
+
+        self._save(tl.resource, job.output_filepath)
+
+        return True
+
+    def render(self, job):
+        output_filepath = job.output_filepath
+
+        previous_state = \
+            templatelayer.incremental.read_state(output_filepath)
+
+        if previous_state is not None and \
+           (previous_state['base'] != self._base_digest or
+            os.path.exists(output_filepath) is False):
+            previous_state = None
+
+        component_digests = \
+            templatelayer.incremental.get_component_digests(
+                job.components,
+                previous_state)
+
+        changed_names = None
+        if previous_state is not None:
+            changed_names = \
+                templatelayer.incremental.get_changed_placeholder_names(
+                    previous_state,
+                    component_digests)
+
+            if not changed_names:
+                # Record any new modification-times so that unchanged files
+                # aren't read again next time.
+                if component_digests != previous_state['components']:
+                    templatelayer.incremental.write_state(
+                        output_filepath,
+                        self._base_digest,
+                        component_digests)
+
+                return templatelayer.incremental.ACTION_SKIPPED
+
+        # Don't leave a state behind that might not match the output if we're
+        # interrupted while writing it.
+        templatelayer.incremental.remove_state(output_filepath)
+
+        if changed_names is not None and \
+           self._update(job, changed_names) is True:
+            action = templatelayer.incremental.ACTION_UPDATED
+        else:
+            action = super(IncrementalBatchRenderer, self).render(job)
+            if action is None:
+                action = templatelayer.incremental.ACTION_RENDERED
+
+        templatelayer.incremental.write_state(
+            output_filepath,
+            self._base_digest,
+            component_digests)
+
+        return action
+
+
+# Every worker process holds its own renderer (the parsed layout and the
+# decoded template).
+_WORKER_RENDERER = None
+
+# The failure, if the worker couldn't be initialized. The initializer must not
+# raise: the pool would just keep replacing the worker and never finish.
+_WORKER_ERROR = None
+
+def get_template_digest(template):
+    """Return a digest of the template content. `template` is either the
+    encoded template data or the file-path of a raw template (see
+    `open_template()`).
+    """
+
+    if isinstance(template, bytes):
+        return templatelayer.incremental.get_data_digest(template)
+
+    return templatelayer.incremental.get_file_digest(template)
+
+def open_template(template):
+    """Return the template image and the mode to render in. `template` is
+    either the encoded template data or the file-path of a raw template.
+    """
+
+    if isinstance(template, bytes):
+        with templatelayer.instrumentation.measure(
+                templatelayer.instrumentation.STAGE_TEMPLATE_DECODE) \
+                as measurement:
+            template_im = PIL.Image.open(io.BytesIO(template))
+            template_im.load()
+
+            measurement.bytes = len(template)
+            measurement.pixels = template_im.width * template_im.height
+
+        return template_im, template_im.mode
+
+    rt = templatelayer.raw_template.RawTemplate(template)
+    return rt.image, rt.mode
+
+def _initialize_worker(*args):
+    global _WORKER_ERROR
+
+    try:
+        _create_worker_renderer(*args)
+    except Exception as e:
+        _LOGGER.exception("Worker could not be initialized.")
+        _WORKER_ERROR = "{}: {}".format(e.__class__.__name__, e)
+
+def _create_worker_renderer(template, config, layout_cache,
+                            fit_cache_max_bytes, encoding, template_digest,
+                            output_cache_parameters):
+    global _WORKER_RENDERER
+
+    format_, preset, encoder_options = encoding
+
+    template_im, canvas_mode = open_template(template)
+
+    fit_cache = None
+    if fit_cache_max_bytes is not None:
+        fit_cache = templatelayer.fit.FitCache(max_bytes=fit_cache_max_bytes)
+
+    kwargs = {}
+
+    output_cache = None
+    if output_cache_parameters is not None:
+        output_cache_path, output_cache_max_bytes, output_template_digest = \
+            output_cache_parameters
+
+        kwargs['template_digest'] = output_template_digest
+
+        output_cache = \
+            templatelayer.output_cache.OutputCache(
+                path=output_cache_path,
+                max_bytes=output_cache_max_bytes)
+
+    cls = BatchRenderer
+
+    if template_digest is not None:
+        kwargs['template_digest'] = template_digest
+        cls = IncrementalBatchRenderer
+
+    _WORKER_RENDERER = \
+        cls(
+            template_im,
+            config,
+            layout_cache=layout_cache,
+            canvas_mode=canvas_mode,
+            fit_cache=fit_cache,
+            format_=format_,
+            preset=preset,
+            encoder_options=encoder_options,
+            output_cache=output_cache,
+            **kwargs)
+
+def _render_in_worker(job):
+    # This fails the whole batch rather than just the job.
+    if _WORKER_ERROR is not None:
+        raise WorkerInitializationError(
+            "Worker could not be initialized: {}".format(_WORKER_ERROR))
+
+    return _get_result(_WORKER_RENDERER, job)
+
+
+class ParallelBatchRenderer(object):
+    """Renders jobs across a pool of worker processes. Every worker parses the
+    layout and decodes the template once, when it starts.
+
+    `template` is either the encoded template data or the file-path of a raw
+    template. Workers map a raw template rather than decoding it, so they all
+    share the same pages. If `fit_cache_max_bytes` is given, every worker
+    keeps its own `FitCache` of that size. The encoding parameters are the
+    same as for `BatchRenderer`. If `template_digest` is given, the workers
+    render incrementally (see `IncrementalBatchRenderer`). If
+    `output_cache_path` is given, every worker uses an `OutputCache` in that
+    directory (they share its entries). If `validate_bounds` is True, the
+    placeholders are checked against the template before any worker starts.
+
+    If a worker can't be initialized, `render_all()` raises
+    `WorkerInitializationError`.
+    """
+
+    def __init__(self, template, config, workers, chunksize=1,
+                 layout_cache=None, fit_cache_max_bytes=None, format_=None,
+                 preset=None, encoder_options=None, template_digest=None,
+                 output_cache_path=None, output_cache_max_bytes=None,
+                 validate_bounds=False):
+        # Compile the template in this process, just as the workers will, so
+        # that a bad layout (or a missing mask) fails immediately rather than
+        # once in every worker. This also populates the layout cache for the
+        # workers. The bounds don't have to be checked again by the workers.
+
+        template_im, canvas_mode = open_template(template)
+
+        templatelayer.template_layout.CompiledTemplate(
+            template_im,
+            config,
+            layout_cache=layout_cache,
+            canvas_mode=canvas_mode,
+            validate_bounds=validate_bounds)
+
+        self._template = template
+        self._config = config
+        self._layout_cache = layout_cache
+        self._fit_cache_max_bytes = fit_cache_max_bytes
+        self._encoding = (format_, preset, encoder_options)
+        self._template_digest = template_digest
+
+        self._output_cache_parameters = None
+        if output_cache_path is not None:
+            if output_cache_max_bytes is None:
+                output_cache_max_bytes = \
+                    templatelayer.output_cache.DEFAULT_MAX_BYTES
+
+            # The template is only hashed once, here, for every worker.
+            output_template_digest = template_digest
+            if output_template_digest is None:
+                output_template_digest = get_template_digest(template)
+
+            self._output_cache_parameters = \
+                (output_cache_path,
+                 output_cache_max_bytes,
+                 output_template_digest)
+
+        self._workers = workers
+        self._chunksize = chunksize
+
+    def render_all(self, jobs):
+        """Render every job. Yields a result for each job as it completes
+        (not necessarily in the order given).
+        """
+
+        pool = \
+            multiprocessing.Pool(
+                self._workers,
+                initializer=_initialize_worker,
+                initargs=(
+                    self._template,
+                    self._config,
+                    self._layout_cache,
+                    self._fit_cache_max_bytes,
+                    self._encoding,
+                    self._template_digest,
+                    self._output_cache_parameters))
+
+        try:
+            for result in pool.imap_unordered(
+                            _render_in_worker,
+                            jobs,
+                            chunksize=self._chunksize):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,107 @@
+import logging
+import collections
+import contextlib
+import time
+
+import PIL.Image
+
+import templatelayer.fit
+import templatelayer.template_cache
+import templatelayer.instrumentation
+
+_LOGGER = logging.getLogger(__name__)
+
+_DECODE_STATS = \
+    collections.namedtuple(
+        '_DECODE_STATS', [
+            'name',
+            'filepath',
+            'source_size',
+            'decoded_size',
+            'decoded_bytes',
+            'full_bytes',
+            'seconds',
+        ])
+
+
+class ComponentLoader(object):
+    """Opens component images for a layout.
+
+    Components are opened lazily (only the header is read) and checked
+    against their placeholder before anything is decoded. For placeholders
+    with a fit mode, JPEGs are then decoded at the smallest DCT scale that
+    still covers the placeholder rather than at full size. The decode is
+    timed and recorded in `stats`, along with how many bytes were decoded
+    compared to a full decode.
+    """
+
+    def __init__(self, tl):
+        self._tl = tl
+        self._stats = []
+
+    def load(self, name, filepath):
+        """Return the decoded component image for the given placeholder. The
+        caller must close it.
+        """
+
+        ph = self._tl.get_placeholder_config(name)
+
+        im = PIL.Image.open(filepath)
+
+        try:
+            self._tl.validate_image_for_placeholder(name, im)
+
+            source_size = im.size
+            full_bytes = templatelayer.template_cache.get_image_bytes(im)
+
+            templatelayer.fit.draft_image(im, ph.width, ph.height, ph.fit)
+
+            with templatelayer.instrumentation.measure(
+                    templatelayer.instrumentation.STAGE_COMPONENT_DECODE,
+                    name) as measurement:
+                start_time = time.time()
+                im.load()
+                seconds = time.time() - start_time
+
+                measurement.bytes = \
+                    templatelayer.template_cache.get_image_bytes(im)
+
+                measurement.pixels = im.width * im.height
+        except Exception:
+            im.close()
+            raise
+
+        decode_stats = \
+            _DECODE_STATS(
+                name=name,
+                filepath=filepath,
+                source_size=source_size,
+                decoded_size=im.size,
+                decoded_bytes=templatelayer.template_cache.get_image_bytes(im),
+                full_bytes=full_bytes,
+                seconds=seconds)
+
+        self._stats.append(decode_stats)
+
+        return im
+
+    @contextlib.contextmanager
+    def open(self, name, filepath):
+        """Yield the decoded component image for the given placeholder and
+        close it afterward.
+        """
+
+        im = self.load(name, filepath)
+
+        try:
+            yield im
+        finally:
+            im.close()
+
+    @property
+    def stats(self):
+        """A list of `_DECODE_STATS` for every component loaded so far, in
+        the order loaded.
+        """
+
+        return self._stats
@@ -0,0 +1,97 @@
+"""Size accounting and eviction that are shared by the on-disk caches (see
+`templatelayer.layout_cache` and `templatelayer.output_cache`). Both keep one
+file per entry in a directory and use the modification-time of an entry as
+the time that it was last used.
+"""
+
+import logging
+import os
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def get_entries(path, suffix):
+    """Return (modification-time, size, file-path) for every entry (every
+    file with the given suffix) in the given directory, least-recently-used
+    first.
+    """
+
+    entries = []
+    for filename in os.listdir(path):
+        if filename.endswith(suffix) is False:
+            continue
+
+        filepath = os.path.join(path, filename)
+
+        try:
+            s = os.stat(filepath)
+        except OSError:
+            continue
+
+        entries.append((s.st_mtime, s.st_size, filepath))
+
+    entries.sort()
+    return entries
+
+
+class DiskCacheBudget(object):
+    """Keeps a running total of the bytes of the entries in a cache directory
+    and removes the least-recently-used entries once it exceeds `max_bytes`.
+    The directory is only listed when the first entry is added and whenever
+    the total goes over budget. The total is then corrected for entries that
+    were replaced, or that were added or removed by other processes.
+    """
+
+    def __init__(self, path, suffix, max_bytes):
+        self._path = path
+        self._suffix = suffix
+        self._max_bytes = max_bytes
+
+        # Unknown until the directory is first listed.
+        self._total_bytes = None
+
+        self._lock = threading.Lock()
+
+    def _get_entries(self):
+        entries = get_entries(self._path, self._suffix)
+        self._total_bytes = sum(size for _, size, _ in entries)
+
+        return entries
+
+    def _evict(self):
+        entries = self._get_entries()
+
+        evicted_count = 0
+        for _, size, filepath in entries:
+            if self._total_bytes <= self._max_bytes:
+                break
+
+            try:
+                os.unlink(filepath)
+            except OSError:
+                continue
+
+            self._total_bytes -= size
+            evicted_count += 1
+
+        return evicted_count
+
+    def add(self, entry_bytes):
+        """Account for an entry of the given size that was just written to
+        the directory and, if that puts us over budget, remove the least-
+        recently-used entries. Return the number of entries that were
+        removed.
+        """
+
+        with self._lock:
+            if self._total_bytes is None:
+                # The new entry is already counted.
+                self._get_entries()
+            else:
+                self._total_bytes += entry_bytes
+
+            if self._total_bytes <= self._max_bytes:
+                return 0
+
+            return self._evict()
@@ -0,0 +1,224 @@
+import logging
+import os
+
+import PIL.Image
+
+import templatelayer.instrumentation
+
+_LOGGER = logging.getLogger(__name__)
+
+PRESET_FAST = 'fast'
+PRESET_BALANCED = 'balanced'
+PRESET_SMALLEST = 'smallest'
+
+PRESETS = (PRESET_FAST, PRESET_BALANCED, PRESET_SMALLEST)
+
+# Format -> preset -> options to save with
+_PRESET_OPTIONS = {
+    'PNG': {
+        PRESET_FAST: {
+            'compress_level': 1,
+        },
+        PRESET_BALANCED: {
+            'compress_level': 6,
+        },
+        PRESET_SMALLEST: {
+            'compress_level': 9,
+            'optimize': True,
+        },
+    },
+    'JPEG': {
+        PRESET_FAST: {
+            'quality': 85,
+            'subsampling': 2,
+        },
+        PRESET_BALANCED: {
+            'quality': 85,
+            'subsampling': 2,
+            'optimize': True,
+        },
+        PRESET_SMALLEST: {
+            'quality': 75,
+            'subsampling': 2,
+            'optimize': True,
+            'progressive': True,
+        },
+    },
+    'WEBP': {
+        PRESET_FAST: {
+            'quality': 80,
+            'method': 0,
+        },
+        PRESET_BALANCED: {
+            'quality': 80,
+            'method': 4,
+        },
+        PRESET_SMALLEST: {
+            'quality': 75,
+            'method': 6,
+        },
+    },
+}
+
+# Format -> the modes that it can store. Other modes are converted to RGB.
+_FORMAT_MODES = {
+    'JPEG': ('L', 'RGB', 'CMYK'),
+}
+
+# Formats that can store more than one frame.
+ANIMATED_FORMATS = ('GIF', 'PNG', 'WEBP')
+
+# Format -> the options that apply to it
+_FORMAT_OPTIONS = {
+    'PNG': ('compress_level', 'optimize'),
+    'JPEG': ('quality', 'subsampling', 'optimize', 'progressive'),
+    'WEBP': ('quality', 'method', 'lossless'),
+}
+
+
+class EncodingException(Exception):
+    pass
+
+
+def get_format(fp, default=None):
+    """Return the PIL format for the given file-path or file-like resource,
+    based on its extension, or `default` if there isn't one.
+    """
+
+    filepath = fp
+    if isinstance(fp, str) is False:
+        filepath = getattr(fp, 'name', None)
+
+        if isinstance(filepath, str) is False:
+            return default
+
+    _, extension = os.path.splitext(filepath)
+
+    return PIL.Image.registered_extensions().get(extension.lower(), default)
+
+def _get_written_bytes(fp):
+    """Return the size of what was written to the given file-path or file-
+    like resource, or None if it can't be determined (e.g. a pipe).
+    """
+
+    if isinstance(fp, str):
+        return os.path.getsize(fp)
+
+    try:
+        return fp.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+def get_save_options(format_, preset=None, **options):
+    """Return the options to save in the given format with: those of the
+    preset (if any) updated with the given options. Options that are None, or
+    that don't apply to the format, are ignored.
+    """
+
+    save_options = {}
+
+    if preset is not None:
+        if preset not in PRESETS:
+            raise EncodingException(
+                "Encoding preset not valid: [{}]".format(preset))
+
+        try:
+            save_options.update(_PRESET_OPTIONS[format_][preset])
+        except KeyError:
+            _LOGGER.debug("Format has no presets: [{}]".format(format_))
+
+    applicable = _FORMAT_OPTIONS.get(format_, ())
+
+    for name, value in options.items():
+        if value is None:
+            continue
+
+        if name not in applicable:
+            _LOGGER.debug("Option [{}] does not apply to format [{}] and "
+                          "will be ignored.".format(name, format_))
+
+            continue
+
+        save_options[name] = value
+
+    return save_options
+
+def save(im, fp, format_=None, preset=None, **options):
+    """Save the image to the given file-path or file-like resource with the
+    given preset and options. The format defaults to the one implied by the
+    extension and then to that of the image. Images are converted to RGB for
+    formats that can't store their mode (e.g. RGBA as JPEG).
+    """
+
+    if format_ is None:
+        format_ = get_format(fp, default=im.format)
+
+    if format_ is None:
+        raise EncodingException(
+            "Output format can not be determined and must be given.")
+
+    save_options = get_save_options(format_, preset=preset, **options)
+
+    modes = _FORMAT_MODES.get(format_)
+    if modes is not None and im.mode not in modes:
+        im = im.convert('RGB')
+
+    with templatelayer.instrumentation.measure(
+            templatelayer.instrumentation.STAGE_ENCODE) as measurement:
+        im.save(fp, format_, **save_options)
+
+        measurement.pixels = im.width * im.height
+        measurement.bytes = _get_written_bytes(fp)
+
+def _iterate_measured(frames, measurement):
+    for im in frames:
+        measurement.pixels += im.width * im.height
+        yield im
+
+def save_all(frames, fp, format_=None, preset=None, loop=None, **options):
+    """Save the given frames as an animation (see `ANIMATED_FORMATS`) with
+    the given preset and options. `frames` may be any iterable and the
+    duration of every frame (in milliseconds) is taken from its "duration"
+    info. Every frame is collected before anything is written: Pillow's
+    encoders for all of these formats need the whole sequence up front.
+    """
+
+    frames = iter(frames)
+
+    try:
+        first_im = next(frames)
+    except StopIteration:
+        raise EncodingException("At least one frame must be given.")
+
+    if format_ is None:
+        format_ = get_format(fp, default=first_im.format)
+
+    if format_ not in ANIMATED_FORMATS:
+        raise EncodingException(
+            "Format can not store animations: [{}]".format(format_))
+
+    save_options = get_save_options(format_, preset=preset, **options)
+
+    if loop is not None:
+        save_options['loop'] = loop
+
+    with templatelayer.instrumentation.measure(
+            templatelayer.instrumentation.STAGE_ENCODE) as measurement:
+        measurement.pixels = first_im.width * first_im.height
+
+        append_images = list(_iterate_measured(frames, measurement))
+
+        save_options['duration'] = [
+            im.info.get('duration', 0)
+            for im
+            in [first_im] + append_images
+        ]
+
+        first_im.save(
+            fp,
+            format_,
+            save_all=True,
+            append_images=append_images,
+            **save_options)
+
+        measurement.bytes = _get_written_bytes(fp)
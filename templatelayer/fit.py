@@ -0,0 +1,273 @@
+import logging
+import collections
+import hashlib
+import math
+import threading
+
+import PIL.Image
+
+import templatelayer.template_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+# The component must already have the size of the placeholder.
+FIT_EXACT = 'exact'
+
+# Scale the component to fit within the placeholder, keeping its aspect ratio.
+# It's centered, and the template shows through the rest of the placeholder.
+FIT_CONTAIN = 'contain'
+
+# Scale the component to cover the placeholder, keeping its aspect ratio. It's
+# centered and whatever falls outside of the placeholder is cropped.
+FIT_COVER = 'cover'
+
+# Scale the component to the size of the placeholder, ignoring its aspect
+# ratio.
+FIT_STRETCH = 'stretch'
+
+FIT_MODES = (FIT_EXACT, FIT_CONTAIN, FIT_COVER, FIT_STRETCH)
+
+DEFAULT_RESAMPLE = PIL.Image.LANCZOS
+
+# The source is first reduced by an integer factor (which is cheap) until it's
+# no more than this many times the target size, and only the rest is
+# resampled. At three, the result can't be told apart from resampling the
+# whole way.
+_REDUCING_GAP = 3.0
+
+DEFAULT_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+_FIT_GEOMETRY = \
+    collections.namedtuple(
+        '_FIT_GEOMETRY', [
+            'size',
+            'box',
+            'offset',
+        ])
+
+
+def get_fit_geometry(source_size, target_size, fit):
+    """Return how a source of the given size is fit to the target size: the
+    size to resample to, the box of the source to resample from, and the
+    offset of the result within the target.
+    """
+
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+
+    source_box = (0, 0, source_width, source_height)
+
+    if fit == FIT_STRETCH or source_size == target_size:
+        return _FIT_GEOMETRY(target_size, source_box, (0, 0))
+
+    width_scale = float(target_width) / source_width
+    height_scale = float(target_height) / source_height
+
+    if fit == FIT_CONTAIN:
+        scale = min(width_scale, height_scale)
+
+        width = min(target_width, max(1, int(round(source_width * scale))))
+        height = min(target_height, max(1, int(round(source_height * scale))))
+
+        offset = ((target_width - width) // 2, (target_height - height) // 2)
+
+        return _FIT_GEOMETRY((width, height), source_box, offset)
+
+    if fit == FIT_COVER:
+        scale = max(width_scale, height_scale)
+
+        box_width = target_width / scale
+        box_height = target_height / scale
+
+        left = (source_width - box_width) / 2.0
+        top = (source_height - box_height) / 2.0
+
+        box = (left, top, left + box_width, top + box_height)
+
+        return _FIT_GEOMETRY(target_size, box, (0, 0))
+
+    raise ValueError("Fit mode not valid: [{}]".format(fit))
+
+def _get_draft_size(source_size, geometry):
+    """Return the smallest size that the whole source can be decoded at
+    without the resampled box dropping below the target size.
+    """
+
+    source_width, source_height = source_size
+    left, top, right, bottom = geometry.box
+    width, height = geometry.size
+
+    width_scale = float(width) / (right - left)
+    height_scale = float(height) / (bottom - top)
+
+    return (
+        int(math.ceil(source_width * width_scale)),
+        int(math.ceil(source_height * height_scale)),
+    )
+
+def draft_image(im, width, height, fit):
+    """If the image hasn't been loaded yet and is a JPEG, configure it to be
+    decoded at the smallest DCT scale that still leaves enough pixels to fit
+    it to the given size. This is much cheaper than decoding at full size and
+    then resampling. Return the box of the original image within the image
+    that will be decoded, or None if nothing changed.
+    """
+
+    if fit is None or fit == FIT_EXACT or im.size == (width, height):
+        return None
+
+    geometry = get_fit_geometry(im.size, (width, height), fit)
+    draft_size = _get_draft_size(im.size, geometry)
+
+    if draft_size[0] >= im.width or draft_size[1] >= im.height:
+        return None
+
+    # This does nothing for images that are already loaded or aren't JPEGs.
+    result = im.draft(im.mode, draft_size)
+
+    if result is None:
+        return None
+
+    _, box = result
+    return box
+
+def fit_image(im, width, height, fit, resample=DEFAULT_RESAMPLE):
+    """Fit the given image to the given size and return a 2-tuple of the
+    fitted image and its offset within that size. The image is returned as-is
+    if it already fits. JPEGs that haven't been loaded yet are decoded at a
+    reduced scale (see `draft_image()`).
+    """
+
+    target_size = (width, height)
+
+    if fit is None or fit == FIT_EXACT or im.size == target_size:
+        return im, (0, 0)
+
+    original_size = im.size
+    draft_box = draft_image(im, width, height, fit)
+
+    geometry = get_fit_geometry(original_size, target_size, fit)
+
+    if draft_box is not None:
+        draft_left, draft_top, draft_right, draft_bottom = draft_box
+
+        x_scale = float(draft_right - draft_left) / original_size[0]
+        y_scale = float(draft_bottom - draft_top) / original_size[1]
+
+        left, top, right, bottom = geometry.box
+
+        box = (
+            draft_left + left * x_scale,
+            draft_top + top * y_scale,
+            draft_left + right * x_scale,
+            draft_top + bottom * y_scale,
+        )
+
+        geometry = geometry._replace(box=box)
+
+    fitted_im = \
+        im.resize(
+            geometry.size,
+            resample,
+            box=geometry.box,
+            reducing_gap=_REDUCING_GAP)
+
+    return fitted_im, geometry.offset
+
+def get_source_digest(im):
+    """Return a digest of the mode, size, and pixels of the given image."""
+
+    h = hashlib.sha1()
+    h.update('{} {} {}'.format(im.mode, im.width, im.height).encode('ascii'))
+    h.update(im.tobytes())
+
+    return h.hexdigest()
+
+
+class FitCache(object):
+    """An in-process, memory-bounded LRU cache of fitted components, keyed by
+    a digest of the source pixels along with the target size and fit mode.
+    This saves resampling the same image (e.g. a logo) for every placeholder
+    and every render that it's used in. Looking up an image requires that it
+    be decoded (to hash it), so draft JPEGs before they're looked-up (see
+    `ComponentLoader`) to still decode them at a reduced scale.
+
+    Cached images are shared and must not be modified.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self._max_bytes = max_bytes
+
+        self._entries = collections.OrderedDict()
+        self._current_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    def fit_image(self, im, width, height, fit, resample=DEFAULT_RESAMPLE):
+        """Like `fit_image()`, but return a cached result if there is one."""
+
+        if fit is None or fit == FIT_EXACT or im.size == (width, height):
+            return im, (0, 0)
+
+        key = (get_source_digest(im), width, height, fit, resample)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+                return entry
+
+            self._misses += 1
+
+        # Resample outside of the lock so that other lookups can still be
+        # served in the meantime.
+
+        entry = fit_image(im, width, height, fit, resample=resample)
+
+        fitted_im, _ = entry
+        image_bytes = templatelayer.template_cache.get_image_bytes(fitted_im)
+
+        if image_bytes > self._max_bytes:
+            return entry
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._current_bytes += image_bytes
+
+                self._evict()
+
+        return entry
+
+    def _evict(self):
+        while self._current_bytes > self._max_bytes:
+            _, (fitted_im, _) = self._entries.popitem(last=False)
+
+            self._current_bytes -= \
+                templatelayer.template_cache.get_image_bytes(fitted_im)
+
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            stats = \
+                templatelayer.template_cache.CACHE_STATS(
+                    hits=self._hits,
+                    misses=self._misses,
+                    evictions=self._evictions,
+                    count=len(self._entries),
+                    bytes=self._current_bytes)
+
+        return stats
@@ -0,0 +1,156 @@
+"""State for incremental re-rendering. Next to every output, a small JSON file
+records what it was rendered from: a digest of the template, layout, and
+encoding, and a digest of every component. A later render compares against it
+to skip the output or to update only the placeholders whose components
+changed (see `templatelayer.batch.IncrementalBatchRenderer`).
+"""
+
+import logging
+import os
+import json
+import hashlib
+import tempfile
+
+import templatelayer.layout_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+ACTION_RENDERED = 'rendered'
+ACTION_UPDATED = 'updated'
+ACTION_SKIPPED = 'skipped'
+
+_STATE_SUFFIX = '.tlstate'
+_STATE_VERSION = 1
+
+# Previous outputs in these formats are read back exactly, so they can be
+# updated in place. Updating a lossy output would compound its artifacts, so
+# those are always rendered from scratch when something changed.
+LOSSLESS_FORMATS = ('PNG', 'TIFF', 'BMP')
+
+
+def get_state_filepath(output_filepath):
+    return output_filepath + _STATE_SUFFIX
+
+def get_file_digest(filepath):
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+def get_data_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def get_base_digest(template_digest, config, mask_digests, encoding):
+    """Return a digest of everything other than the components that affects
+    an output. `mask_digests` maps placeholder names to the digests of their
+    mask files. `encoding` is any JSON-serializable description of how the
+    output is encoded.
+    """
+
+    description = {
+        'template': template_digest,
+        'layout': templatelayer.layout_cache.get_config_hash(config),
+        'masks': mask_digests,
+        'encoding': encoding,
+    }
+
+    encoded = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def get_component_digests(components, previous_state=None):
+    """Return a dictionary of placeholder names to [file-path, modification-
+    time, size, digest] for the given (name, file-path) pairs. Files whose
+    path, modification-time, and size haven't changed since the previous
+    state aren't read again.
+    """
+
+    previous_components = {}
+    if previous_state is not None:
+        previous_components = previous_state['components']
+
+    digests = {}
+    for name, filepath in components:
+        s = os.stat(filepath)
+
+        previous = previous_components.get(name)
+        if previous is not None and \
+           previous[:3] == [filepath, s.st_mtime, s.st_size]:
+            digests[name] = previous
+            continue
+
+        digests[name] = \
+            [filepath, s.st_mtime, s.st_size, get_file_digest(filepath)]
+
+    return digests
+
+def get_changed_placeholder_names(previous_state, component_digests):
+    """Return the names of placeholders whose component was added, removed, or
+    has different content.
+    """
+
+    previous_components = previous_state['components']
+
+    names_s = set(previous_components.keys()) | set(component_digests.keys())
+
+    changed = []
+    for name in sorted(names_s):
+        previous = previous_components.get(name)
+        current = component_digests.get(name)
+
+        if previous is None or current is None or previous[3] != current[3]:
+            changed.append(name)
+
+    return changed
+
+def read_state(output_filepath):
+    """Return the state recorded for the given output, or None if there isn't
+    any (or it can't be used).
+    """
+
+    state_filepath = get_state_filepath(output_filepath)
+
+    try:
+        with open(state_filepath) as f:
+            state = json.load(f)
+    except (IOError, OSError):
+        return None
+    except ValueError:
+        _LOGGER.warning("Incremental state is not valid and will be "
+                        "ignored: [{}]".format(state_filepath))
+
+        return None
+
+    if state.get('version') != _STATE_VERSION:
+        return None
+
+    return state
+
+def write_state(output_filepath, base_digest, component_digests):
+    state = {
+        'version': _STATE_VERSION,
+        'base': base_digest,
+        'components': component_digests,
+    }
+
+    state_filepath = get_state_filepath(output_filepath)
+
+    # Write atomically so that an interrupted write never leaves a state
+    # that doesn't match the output.
+
+    handle, temp_filepath = \
+        tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(state_filepath)),
+            suffix='.tmp')
+
+    with os.fdopen(handle, 'w') as f:
+        json.dump(state, f)
+
+    os.rename(temp_filepath, state_filepath)
+
+def remove_state(output_filepath):
+    try:
+        os.unlink(get_state_filepath(output_filepath))
+    except OSError:
+        pass
@@ -0,0 +1,246 @@
+"""Hooks around every stage of a render. Code that does the work wraps each
+stage in `measure()`; every installed hook is then called with a
+`_STAGE_RECORD` when the stage finishes. Nothing is measured while no hooks
+are installed.
+
+`Collector` is a hook that keeps every record and can summarize them by
+stage. `profile()` runs a block under cProfile or (if installed) pyinstrument.
+"""
+
+import logging
+import collections
+import contextlib
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+STAGE_CONFIG_PARSE = 'config_parse'
+STAGE_OVERLAP_VALIDATION = 'overlap_validation'
+STAGE_TEMPLATE_DECODE = 'template_decode'
+STAGE_BOUNDS_VALIDATION = 'bounds_validation'
+STAGE_COMPONENT_DECODE = 'component_decode'
+STAGE_PASTE = 'paste'
+STAGE_ENCODE = 'encode'
+
+# In the order that they happen during a render.
+STAGES = (
+    STAGE_CONFIG_PARSE,
+    STAGE_OVERLAP_VALIDATION,
+    STAGE_TEMPLATE_DECODE,
+    STAGE_BOUNDS_VALIDATION,
+    STAGE_COMPONENT_DECODE,
+    STAGE_PASTE,
+    STAGE_ENCODE,
+)
+
+PROFILER_CPROFILE = 'cprofile'
+PROFILER_PYINSTRUMENT = 'pyinstrument'
+
+PROFILERS = (PROFILER_CPROFILE, PROFILER_PYINSTRUMENT)
+
+_STAGE_RECORD = \
+    collections.namedtuple(
+        '_STAGE_RECORD', [
+            'stage',
+            'name',
+            'seconds',
+            'bytes',
+            'pixels',
+        ])
+
+_STAGE_SUMMARY = \
+    collections.namedtuple(
+        '_STAGE_SUMMARY', [
+            'stage',
+            'count',
+            'seconds',
+            'bytes',
+            'pixels',
+        ])
+
+# This is replaced rather than modified so that it can be read without
+# locking.
+_HOOKS = ()
+_HOOKS_LOCK = threading.Lock()
+
+
+class _Measurement(object):
+    """Handed to the measured block so that it can record how much it
+    processed.
+    """
+
+    __slots__ = ('bytes', 'pixels')
+
+    def __init__(self):
+        self.bytes = None
+        self.pixels = None
+
+
+def add_hook(hook):
+    """Install a callable that is called with a `_STAGE_RECORD` whenever a
+    stage finishes, in whichever thread did the work.
+    """
+
+    global _HOOKS
+
+    with _HOOKS_LOCK:
+        _HOOKS = _HOOKS + (hook,)
+
+def remove_hook(hook):
+    global _HOOKS
+
+    with _HOOKS_LOCK:
+        _HOOKS = tuple(h for h in _HOOKS if h is not hook)
+
+@contextlib.contextmanager
+def hooked(hook):
+    """Install the given hook for the duration of the block."""
+
+    add_hook(hook)
+
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
+
+@contextlib.contextmanager
+def measure(stage, name=None):
+    """Time the block as the given stage (and, optionally, the name of what
+    it processed, e.g. a placeholder). The block may set `bytes` and `pixels`
+    on the yielded measurement.
+    """
+
+    measurement = _Measurement()
+
+    if not _HOOKS:
+        yield measurement
+        return
+
+    start_time = time.time()
+    yield measurement
+    seconds = time.time() - start_time
+
+    record = \
+        _STAGE_RECORD(
+            stage=stage,
+            name=name,
+            seconds=seconds,
+            bytes=measurement.bytes,
+            pixels=measurement.pixels)
+
+    for hook in _HOOKS:
+        try:
+            hook(record)
+        except Exception:
+            _LOGGER.exception("Instrumentation hook failed.")
+
+
+class Collector(object):
+    """A hook that keeps every record."""
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def get_summary(self):
+        """Return a `_STAGE_SUMMARY` for every stage that was recorded, in
+        stage order. Byte and pixel counts that weren't recorded are counted
+        as zero.
+        """
+
+        with self._lock:
+            records = list(self._records)
+
+        totals = collections.OrderedDict()
+        for record in records:
+            count, seconds, bytes_, pixels = \
+                totals.get(record.stage, (0, 0.0, 0, 0))
+
+            totals[record.stage] = (
+                count + 1,
+                seconds + record.seconds,
+                bytes_ + (record.bytes or 0),
+                pixels + (record.pixels or 0),
+            )
+
+        def get_order(stage):
+            try:
+                return STAGES.index(stage)
+            except ValueError:
+                return len(STAGES)
+
+        summary = [
+            _STAGE_SUMMARY(stage, *totals[stage])
+            for stage
+            in sorted(totals.keys(), key=get_order)
+        ]
+
+        return summary
+
+    def to_dict(self):
+        """Return the records and the summary as JSON-serializable data."""
+
+        report = {
+            'stages': [
+                summary._asdict()
+                for summary
+                in self.get_summary()
+            ],
+            'records': [
+                record._asdict()
+                for record
+                in self.records
+            ],
+        }
+
+        return report
+
+    @property
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+
+@contextlib.contextmanager
+def profile(filepath, profiler=PROFILER_CPROFILE):
+    """Profile the block and write the results to the given file-path. With
+    cProfile, the file can be read with `pstats`. With pyinstrument (which
+    must be installed), it's a text report.
+    """
+
+    if profiler == PROFILER_CPROFILE:
+        import cProfile
+
+        p = cProfile.Profile()
+        p.enable()
+
+        try:
+            yield
+        finally:
+            p.disable()
+            p.dump_stats(filepath)
+
+    elif profiler == PROFILER_PYINSTRUMENT:
+        try:
+            import pyinstrument
+        except ImportError:
+            raise ValueError("Profiler not installed: [{}]".format(profiler))
+
+        p = pyinstrument.Profiler()
+        p.start()
+
+        try:
+            yield
+        finally:
+            p.stop()
+
+            with open(filepath, 'w') as f:
+                f.write(p.output_text())
+
+    else:
+        raise ValueError("Profiler not valid: [{}]".format(profiler))
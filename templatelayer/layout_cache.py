@@ -0,0 +1,253 @@
+import logging
+import os
+import json
+import hashlib
+import struct
+import mmap
+import array
+import sys
+import tempfile
+
+import templatelayer.template_layout
+import templatelayer.disk_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+_CACHE_PATH_ENVIRONMENT_NAME = 'TEMPLATELAYER_LAYOUT_CACHE_PATH'
+
+_DEFAULT_CACHE_PATH = \
+    os.path.join(
+        os.path.expanduser('~'),
+        '.cache',
+        'templatelayer',
+        'layouts')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_FILENAME_SUFFIX = '.layout'
+
+# The header has a magic (which also versions the format), the number of
+# placeholders, and the length of the encoded metadata. It is followed by four
+# little-endian 32-bit integers (top, left, height, width) for every
+# placeholder and then the JSON-encoded metadata (the names and any optional
+# fields that are set). The same format is used for binary layout files (see
+# `templatelayer.layout_loader`).
+_MAGIC = b'TLC3'
+_HEADER = struct.Struct('<4sII')
+
+_PLACEHOLDER_FIELDS = ('top', 'left', 'height', 'width')
+_PLACEHOLDER_OPTION_FIELDS = ('mask', 'fit')
+
+
+def get_default_cache_path():
+    return os.environ.get(_CACHE_PATH_ENVIRONMENT_NAME, _DEFAULT_CACHE_PATH)
+
+def get_config_hash(config):
+    """Return a digest of the layout config that doesn't depend on the order
+    of keys. A `PlaceholderTable` (e.g. from `templatelayer.layout_loader`)
+    has the same digest as the layout config that it was loaded from.
+    """
+
+    if isinstance(config, templatelayer.template_layout.PlaceholderTable):
+        config = config.to_config()
+
+    encoded = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def encode_placeholders(placeholder_configs):
+    """Return the compact binary encoding of the given placeholder-configs.
+    Raises `TypeError` or `OverflowError` for coordinates that aren't 32-bit
+    integers.
+    """
+
+    placeholders = list(placeholder_configs.values())
+
+    values = array.array('i')
+    for ph in placeholders:
+        for field in _PLACEHOLDER_FIELDS:
+            values.append(getattr(ph, field))
+
+    if sys.byteorder != 'little':
+        values.byteswap()
+
+    names = []
+    options = {}
+    for ph in placeholders:
+        names.append(ph.name)
+
+        ph_options = {}
+        for field in _PLACEHOLDER_OPTION_FIELDS:
+            value = getattr(ph, field)
+            if value is not None:
+                ph_options[field] = value
+
+        if ph_options:
+            options[ph.name] = ph_options
+
+    metadata = {
+        'names': names,
+        'options': options,
+    }
+
+    encoded_metadata = json.dumps(metadata).encode('utf-8')
+
+    header = _HEADER.pack(_MAGIC, len(placeholders), len(encoded_metadata))
+
+    return header + values.tobytes() + encoded_metadata
+
+def is_encoded_placeholders(data):
+    return data[:len(_MAGIC)] == _MAGIC
+
+def decode_placeholders(data):
+    """Return a `PlaceholderTable` from the given encoded data (bytes or an
+    mmap). The coordinates are read straight into the columns of the table.
+    """
+
+    _, count, metadata_length = _HEADER.unpack(data[:_HEADER.size])
+
+    values = array.array('i')
+
+    offset = _HEADER.size
+    values_length = count * len(_PLACEHOLDER_FIELDS) * values.itemsize
+    values.frombytes(data[offset:offset + values_length])
+
+    if sys.byteorder != 'little':
+        values.byteswap()
+
+    offset += values_length
+    encoded_metadata = data[offset:offset + metadata_length]
+    metadata = json.loads(encoded_metadata.decode('utf-8'))
+
+    names = metadata['names']
+    options = metadata['options']
+
+    if len(names) != count or \
+       len(values) != count * len(_PLACEHOLDER_FIELDS):
+        raise ValueError("Layout cache entry is truncated.")
+
+    # The values are stored one placeholder after another, so every column is
+    # a slice.
+
+    field_count = len(_PLACEHOLDER_FIELDS)
+
+    placeholder_options = {}
+    for i, name in enumerate(names):
+        ph_options = options.get(name)
+        if ph_options:
+            placeholder_options[i] = (
+                ph_options.get('mask'),
+                ph_options.get('fit'),
+            )
+
+    placeholder_configs = \
+        templatelayer.template_layout.PlaceholderTable(
+            names,
+            values[0::field_count],
+            values[1::field_count],
+            values[2::field_count],
+            values[3::field_count],
+            options=placeholder_options)
+
+    return placeholder_configs
+
+
+class LayoutCache(object):
+    """An on-disk cache of validated placeholder-configs keyed by a hash of
+    the layout config. Entries are compact binary files that are loaded via
+    mmap. The least-recently-used entries are removed once the total size
+    exceeds `max_bytes`.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            path = get_default_cache_path()
+
+        self._path = path
+
+        self._budget = \
+            templatelayer.disk_cache.DiskCacheBudget(
+                path,
+                _FILENAME_SUFFIX,
+                max_bytes)
+
+    def _get_filepath(self, config_hash):
+        return os.path.join(self._path, config_hash + _FILENAME_SUFFIX)
+
+    def get(self, config):
+        """Return the cached placeholder-configs for the given layout config
+        or None if not cached.
+        """
+
+        filepath = self._get_filepath(get_config_hash(config))
+
+        try:
+            with open(filepath, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None
+
+        try:
+            # Entries written by other versions are just misses.
+            if is_encoded_placeholders(mm) is False:
+                _LOGGER.debug("Layout cache entry is from another version: "
+                              "[{}]".format(filepath))
+
+                return None
+
+            placeholder_configs = decode_placeholders(mm)
+        except (struct.error, ValueError, KeyError, TypeError):
+            _LOGGER.warning("Layout cache entry is not valid and will be "
+                            "ignored: [{}]".format(filepath))
+
+            return None
+        finally:
+            mm.close()
+
+        # Mark as recently-used.
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            pass
+
+        return placeholder_configs
+
+    def set(self, config, placeholder_configs):
+        """Store the given placeholder-configs for the given layout config.
+        Configs with values that can't be stored compactly are not cached.
+        """
+
+        try:
+            data = encode_placeholders(placeholder_configs)
+        except (TypeError, OverflowError):
+            _LOGGER.debug("Layout can not be cached.", exc_info=True)
+            return
+
+        filepath = self._get_filepath(get_config_hash(config))
+
+        try:
+            if os.path.exists(self._path) is False:
+                os.makedirs(self._path)
+
+            # Write atomically so that concurrent readers never see a partial
+            # entry.
+
+            handle, temp_filepath = \
+                tempfile.mkstemp(
+                    dir=self._path,
+                    suffix='.tmp')
+
+            with os.fdopen(handle, 'wb') as f:
+                f.write(data)
+
+            os.rename(temp_filepath, filepath)
+        except (IOError, OSError):
+            _LOGGER.warning("Could not write layout cache entry: "
+                            "[{}]".format(filepath), exc_info=True)
+
+            return
+
+        self._budget.add(len(data))
+
+    @property
+    def path(self):
+        return self._path
@@ -0,0 +1,416 @@
+"""Load large layouts straight into a `PlaceholderTable` without building the
+whole config in memory first. Three formats are supported:
+
+- "json": the usual layout config. It's parsed incrementally, so only one
+  placeholder is held as Python objects at a time.
+- "ndjson": one placeholder per line, e.g.
+  {"name": "top-left", "top": 0, "left": 0, "height": 100, "width": 50}
+- "binary": the compact encoding that the layout cache uses (see
+  `templatelayer.layout_cache`), which is mapped rather than parsed.
+
+Coordinates must be 32-bit integers and sizes must not be negative. The
+loaded placeholders are checked for overlaps just like a parsed config, and
+the table can be passed anywhere that a layout config is accepted.
+"""
+
+import logging
+import os
+import re
+import json
+import mmap
+import array
+
+import templatelayer.template_layout
+import templatelayer.layout_cache
+import templatelayer.fit
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_BINARY = 'binary'
+
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON, FORMAT_BINARY)
+
+# Extension -> format. Anything else is JSON.
+_EXTENSION_FORMATS = {
+    '.ndjson': FORMAT_NDJSON,
+    '.jsonl': FORMAT_NDJSON,
+    '.layout': FORMAT_BINARY,
+}
+
+_DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+
+class LayoutLoadError(templatelayer.template_layout.TemplateLayoutException):
+    pass
+
+
+def get_layout_format(filepath):
+    """Determine the layout format from the file-path."""
+
+    _, extension = os.path.splitext(filepath)
+    return _EXTENSION_FORMATS.get(extension.lower(), FORMAT_JSON)
+
+
+class _JsonStream(object):
+    """Decodes one JSON value at a time from a file-like resource, reading it
+    in chunks.
+    """
+
+    def __init__(self, f, chunk_size=_DEFAULT_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+
+        self._buffer = ''
+        self._position = 0
+        self._is_eof = False
+
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read more data, keeping whatever hasn't been consumed. Returns False
+        at the end of the data.
+        """
+
+        if self._is_eof is True:
+            return False
+
+        # Read at least as much as is buffered so that a large value is
+        # retried a logarithmic number of times.
+        remaining = self._buffer[self._position:]
+        chunk = self._f.read(max(self._chunk_size, len(remaining)))
+
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode('utf-8')
+
+        if not chunk:
+            self._is_eof = True
+            return False
+
+        self._buffer = remaining + chunk
+        self._position = 0
+
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            m = _WHITESPACE_RE.match(self._buffer, self._position)
+            self._position = m.end()
+
+            if self._position < len(self._buffer) or self._fill() is False:
+                return
+
+    def read_character(self):
+        """Consume and return the next non-whitespace character, or an empty
+        string at the end of the data.
+        """
+
+        self._skip_whitespace()
+
+        if self._position >= len(self._buffer):
+            return ''
+
+        c = self._buffer[self._position]
+        self._position += 1
+
+        return c
+
+    def peek_character(self):
+        self._skip_whitespace()
+
+        if self._position >= len(self._buffer):
+            return ''
+
+        return self._buffer[self._position]
+
+    def read_value(self):
+        """Decode and return the next value."""
+
+        self._skip_whitespace()
+
+        while True:
+            try:
+                value, end = \
+                    self._decoder.raw_decode(self._buffer, self._position)
+            except ValueError:
+                if self._fill() is False:
+                    raise
+
+                continue
+
+            # A number or literal that ends with the buffer may continue in
+            # the next chunk.
+            if end == len(self._buffer) and self._fill() is True:
+                continue
+
+            self._position = end
+            return value
+
+
+def _expect(stream, expected):
+    c = stream.read_character()
+    if c not in expected:
+        raise LayoutLoadError(
+            "Layout is not valid: expected one of [{}] but found [{}].".format(
+            expected, c))
+
+    return c
+
+def _iterate_json_object(stream):
+    """Yield the keys of the object at the current position. The value of
+    each key must be consumed from the stream before advancing.
+    """
+
+    _expect(stream, '{')
+
+    if stream.peek_character() == '}':
+        stream.read_character()
+        return
+
+    while True:
+        key = stream.read_value()
+        if isinstance(key, str) is False:
+            raise LayoutLoadError("Layout is not valid: key is not a string.")
+
+        _expect(stream, ':')
+
+        yield key
+
+        if _expect(stream, ',}') == '}':
+            return
+
+def _iterate_json_placeholders(f):
+    """Yield (name, parameters) for every placeholder of a layout config."""
+
+    stream = _JsonStream(f)
+    found_placeholders = False
+
+    for key in _iterate_json_object(stream):
+        if key != 'placeholders':
+            # Skip it.
+            stream.read_value()
+            continue
+
+        if stream.peek_character() != '{':
+            break
+
+        found_placeholders = True
+
+        for name in _iterate_json_object(stream):
+            yield name, stream.read_value()
+
+    if found_placeholders is False:
+        raise LayoutLoadError(
+            "Layout config must have 'placeholders' dictionary/object.")
+
+def _iterate_ndjson_placeholders(f):
+    for i, line in enumerate(f):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            parameters = json.loads(line)
+            name = parameters['name']
+        except (ValueError, KeyError, TypeError):
+            raise LayoutLoadError(
+                "Layout line ({}) is not valid.".format(i + 1))
+
+        yield name, parameters
+
+
+class _TableBuilder(object):
+    """Appends placeholders straight into the columns of a table. A
+    placeholder that is given again replaces the earlier one (as it would in
+    a parsed JSON object).
+    """
+
+    def __init__(self):
+        self._names = []
+        self._indices = {}
+
+        self._tops = array.array('i')
+        self._lefts = array.array('i')
+        self._heights = array.array('i')
+        self._widths = array.array('i')
+
+        self._options = {}
+
+    def add(self, name, parameters):
+        try:
+            values = (
+                parameters['top'],
+                parameters['left'],
+                parameters['height'],
+                parameters['width'],
+            )
+
+            mask = parameters.get('mask')
+            fit = parameters.get('fit')
+        except (KeyError, TypeError, AttributeError):
+            raise LayoutLoadError(
+                "One or more placeholder parameters are missing for "
+                "[{}].".format(name))
+
+        if mask is not None and isinstance(mask, str) is False:
+            raise LayoutLoadError(
+                "Placeholder [{}] mask must be [{}] or a file-path.".format(
+                name, templatelayer.template_layout.MASK_ALPHA))
+
+        if fit is not None and fit not in templatelayer.fit.FIT_MODES:
+            raise LayoutLoadError(
+                "Placeholder [{}] fit must be one of: {}".format(
+                name, ', '.join(templatelayer.fit.FIT_MODES)))
+
+        i = self._indices.get(name)
+
+        columns = (self._tops, self._lefts, self._heights, self._widths)
+
+        try:
+            if i is None:
+                i = len(self._names)
+
+                for column, value in zip(columns, values):
+                    column.append(value)
+
+                self._names.append(name)
+                self._indices[name] = i
+            else:
+                for column, value in zip(columns, values):
+                    column[i] = value
+        except (TypeError, OverflowError):
+            raise LayoutLoadError(
+                "Placeholder [{}] coordinates must be 32-bit integers.".format(
+                name))
+
+        if mask is not None or fit is not None:
+            self._options[i] = (mask, fit)
+        else:
+            self._options.pop(i, None)
+
+    def get_table(self):
+        pt = \
+            templatelayer.template_layout.PlaceholderTable(
+                self._names,
+                self._tops,
+                self._lefts,
+                self._heights,
+                self._widths,
+                options=self._options)
+
+        return pt
+
+
+def _load_binary(filepath):
+    with open(filepath, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if templatelayer.layout_cache.is_encoded_placeholders(mm) is False:
+            raise LayoutLoadError(
+                "Binary layout is not valid: [{}]".format(filepath))
+
+        try:
+            return templatelayer.layout_cache.decode_placeholders(mm)
+        except (ValueError, KeyError, TypeError) as e:
+            raise LayoutLoadError(
+                "Binary layout is not valid: [{}] {}".format(filepath, e))
+    finally:
+        mm.close()
+
+def validate_placeholder_table(pt):
+    """Check the sizes of every placeholder at once (on the columns) and then
+    check that none overlap.
+    """
+
+    if not pt:
+        raise LayoutLoadError("At least one placeholder must be configured.")
+
+    for column in (pt.heights, pt.widths):
+        smallest = min(column)
+        if smallest < 0:
+            name = pt.names[column.index(smallest)]
+
+            raise LayoutLoadError(
+                "Placeholder [{}] size must not be negative.".format(name))
+
+    pt.assert_no_overlaps()
+
+def load_layout(filepath, format_=None):
+    """Load, validate, and return the placeholders of the given layout file
+    as a `PlaceholderTable`. The format is determined from the extension if
+    not given.
+    """
+
+    if format_ is None:
+        format_ = get_layout_format(filepath)
+
+    if format_ == FORMAT_BINARY:
+        pt = _load_binary(filepath)
+    elif format_ in (FORMAT_JSON, FORMAT_NDJSON):
+        if format_ == FORMAT_JSON:
+            iterate = _iterate_json_placeholders
+        else:
+            iterate = _iterate_ndjson_placeholders
+
+        builder = _TableBuilder()
+
+        with open(filepath) as f:
+            try:
+                for name, parameters in iterate(f):
+                    builder.add(name, parameters)
+            except ValueError as e:
+                raise LayoutLoadError(
+                    "Layout is not valid JSON: [{}] {}".format(filepath, e))
+
+        pt = builder.get_table()
+    else:
+        raise ValueError("Layout format not valid: [{}]".format(format_))
+
+    validate_placeholder_table(pt)
+
+    return pt
+
+def read_config(filepath, format_=None, stream=False):
+    """Read the given layout file in whatever form `SimpleTemplateLayout`
+    should be given: a plain JSON config is parsed into a dictionary (so that
+    the layout cache can be used), unless `stream` is True, and every other
+    format is loaded straight into a `PlaceholderTable` (already validated).
+    """
+
+    if format_ is None:
+        format_ = get_layout_format(filepath)
+
+    if stream is True or format_ != FORMAT_JSON:
+        return load_layout(filepath, format_=format_)
+
+    with open(filepath) as f:
+        return json.load(f)
+
+def write_layout(placeholder_configs, f, format_):
+    """Write the given placeholder-configs (a `PlaceholderTable` or a
+    dictionary of `_PLACEHOLDER`) to the given file-like resource as NDJSON
+    (text) or binary.
+    """
+
+    if format_ == FORMAT_BINARY:
+        f.write(templatelayer.layout_cache.encode_placeholders(
+                placeholder_configs))
+    elif format_ == FORMAT_NDJSON:
+        for ph in placeholder_configs.values():
+            record = dict(
+                (field, value)
+                for field, value
+                in ph._asdict().items()
+                if value is not None)
+
+            f.write(json.dumps(record) + '\n')
+    else:
+        raise ValueError("Layout format not valid for writing: "
+                         "[{}]".format(format_))
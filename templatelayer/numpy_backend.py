@@ -0,0 +1,189 @@
+"""An optional compositing backend that uses NumPy. This is only available if
+NumPy is installed.
+"""
+
+import logging
+import collections
+
+import PIL.Image
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import templatelayer.template_layout
+import templatelayer.fit
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bilevel images are packed eight pixels to a byte, which doesn't match the
+# one-element-per-pixel arrays that NumPy produces for them.
+_UNSUPPORTED_MODES = ('1',)
+
+
+def is_available():
+    return numpy is not None
+
+def _get_clipped_slices(ph, width, height):
+    """Return the (canvas, component) slice pairs for the part of the
+    placeholder that falls within the canvas, or None if nothing does. This
+    matches how PIL clips a paste.
+    """
+
+    left = max(ph.left, 0)
+    top = max(ph.top, 0)
+    right = min(ph.left + ph.width, width)
+    bottom = min(ph.top + ph.height, height)
+
+    if left >= right or top >= bottom:
+        return None
+
+    canvas_slices = (slice(top, bottom), slice(left, right))
+
+    component_slices = (
+        slice(top - ph.top, bottom - ph.top),
+        slice(left - ph.left, right - ph.left),
+    )
+
+    return canvas_slices, component_slices
+
+
+class NumpyCompositor(object):
+    """Composites every component of a render in one pass over an array.
+
+    The template is converted to an array once, and the (clipped) slices of
+    every placeholder are computed once, when constructed. Every render copies
+    the template array, writes each component with a slice assignment and
+    converts back to an image once. Components may be given as images or as
+    arrays (with the layout that `numpy.asarray()` produces for an image in
+    the template's mode). Images that share a size are converted to arrays
+    together. The output is byte-identical to pasting with PIL.
+
+    Getting the pixels out of an image costs more than pasting it, so this is
+    only faster than PIL when the components are already arrays.
+    """
+
+    def __init__(self, compiled_template):
+        if numpy is None:
+            raise templatelayer.template_layout.TemplateLayoutException(
+                "NumPy is not installed.")
+
+        self._placeholder_configs = compiled_template.placeholder_configs
+        self._mode = compiled_template.mode
+
+        if self._mode in _UNSUPPORTED_MODES:
+            raise templatelayer.template_layout.TemplateLayoutException(
+                "Templates in mode [{}] are not supported by the NumPy "
+                "compositor.".format(self._mode))
+
+        for ph in self._placeholder_configs.values():
+            if ph.mask is not None:
+                raise templatelayer.template_layout.TemplateLayoutException(
+                    "Masked placeholders are not supported by the NumPy "
+                    "compositor: [{}]".format(ph.name))
+
+            if ph.fit is not None and \
+               ph.fit != templatelayer.fit.FIT_EXACT:
+                raise templatelayer.template_layout.TemplateLayoutException(
+                    "Fitted placeholders are not supported by the NumPy "
+                    "compositor: [{}]".format(ph.name))
+
+        template_im = compiled_template.new_layout().resource
+        self._template_a = numpy.asarray(template_im).copy()
+
+        # The array only holds the palette indices of P and PA templates, so
+        # the palette (and the transparency and other info) is put back on
+        # every output.
+
+        self._palette = None
+        if template_im.palette is not None:
+            rawmode = template_im.palette.mode
+            self._palette = (template_im.getpalette(rawmode), rawmode)
+
+        self._info = dict(template_im.info)
+
+        self._width, self._height = template_im.size
+
+        # name -> (canvas slices, component slices) or None if the
+        # placeholder is entirely outside of the template
+        self._slices = {}
+        for name, ph in self._placeholder_configs.items():
+            self._slices[name] = \
+                _get_clipped_slices(ph, self._width, self._height)
+
+    def _raise_not_compatible(self, ph, width, height):
+        raise templatelayer.template_layout.PlaceholderNotCompatibleException(
+            "Image with size ({}, {}) not compatible with placeholder "
+            "[{}] size ({}, {}).".format(
+            width, height, ph.name, ph.width, ph.height))
+
+    def _get_component_arrays(self, im_mapping):
+        """Validate the components and yield (name, array) pairs."""
+
+        # Images are grouped by size so that every group is converted with
+        # one join rather than one array per image.
+        groups = collections.OrderedDict()
+
+        for name, component in im_mapping.items():
+            try:
+                ph = self._placeholder_configs[name]
+            except KeyError:
+                raise templatelayer.template_layout.UnknownPlaceholderException(name)
+
+            if isinstance(component, numpy.ndarray) is True:
+                if component.shape[:2] != (ph.height, ph.width):
+                    self._raise_not_compatible(
+                        ph,
+                        component.shape[1],
+                        component.shape[0])
+
+                yield name, component
+                continue
+
+            if ph.width != component.width or ph.height != component.height:
+                self._raise_not_compatible(
+                    ph,
+                    component.width,
+                    component.height)
+
+            if component.mode != self._mode:
+                component = component.convert(self._mode)
+
+            groups.setdefault(component.size, []).append((name, component))
+
+        for (width, height), group in groups.items():
+            data = b''.join(im.tobytes() for _, im in group)
+
+            group_a = numpy.frombuffer(data, dtype=self._template_a.dtype)
+            group_a = \
+                group_a.reshape(
+                    (len(group), height, width) + self._template_a.shape[2:])
+
+            for i, (name, _) in enumerate(group):
+                yield name, group_a[i]
+
+    def render(self, im_mapping):
+        """Apply the given overlays to a copy of the template and return the
+        image.
+        """
+
+        canvas_a = self._template_a.copy()
+
+        for name, component_a in self._get_component_arrays(im_mapping):
+            slices = self._slices[name]
+            if slices is None:
+                continue
+
+            canvas_slices, component_slices = slices
+            canvas_a[canvas_slices] = component_a[component_slices]
+
+        size = (self._width, self._height)
+        im = PIL.Image.frombytes(self._mode, size, canvas_a.tobytes())
+
+        if self._palette is not None:
+            im.putpalette(*self._palette)
+
+        im.info.update(self._info)
+
+        return im
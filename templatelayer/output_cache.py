@@ -0,0 +1,187 @@
+import logging
+import os
+import json
+import hashlib
+import shutil
+import stat
+import tempfile
+import threading
+
+import templatelayer.template_cache
+import templatelayer.disk_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+_CACHE_PATH_ENVIRONMENT_NAME = 'TEMPLATELAYER_OUTPUT_CACHE_PATH'
+
+_DEFAULT_CACHE_PATH = \
+    os.path.join(
+        os.path.expanduser('~'),
+        '.cache',
+        'templatelayer',
+        'outputs')
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_FILENAME_SUFFIX = '.output'
+
+# The action reported for a batch job whose output came from the cache.
+ACTION_CACHED = 'cached'
+
+
+def get_default_cache_path():
+    return os.environ.get(_CACHE_PATH_ENVIRONMENT_NAME, _DEFAULT_CACHE_PATH)
+
+def prepare_output(output_filepath):
+    """Remove the output at the given file-path, if there is one, so that it
+    is replaced rather than written into. It may be hard-linked to a (read-
+    only) cache entry.
+    """
+
+    if os.path.lexists(output_filepath) is True:
+        os.unlink(output_filepath)
+
+def get_key(base_digest, component_digests):
+    """Return the cache key for an output. `base_digest` describes everything
+    other than the components (the template, layout, and encoding) and
+    `component_digests` maps placeholder names to component content digests.
+    """
+
+    description = {
+        'base': base_digest,
+        'components': component_digests,
+    }
+
+    encoded = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class OutputCache(object):
+    """An on-disk, content-addressed cache of encoded outputs. A hit is
+    hard-linked (or, across file-systems, copied) to the output file-path
+    rather than being rendered and encoded again. The least-recently-used
+    entries are removed once the total size exceeds `max_bytes`.
+
+    Entries are read-only so that an output that is hard-linked to one can't
+    be modified in place. Writers must replace such outputs rather than
+    write into them.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            path = get_default_cache_path()
+
+        self._path = path
+
+        self._budget = \
+            templatelayer.disk_cache.DiskCacheBudget(
+                path,
+                _FILENAME_SUFFIX,
+                max_bytes)
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    def _get_filepath(self, key):
+        return os.path.join(self._path, key + _FILENAME_SUFFIX)
+
+    def fetch(self, key, output_filepath):
+        """Write the cached output for the given key to the given file-path
+        and return True, or return False if it's not cached.
+        """
+
+        filepath = self._get_filepath(key)
+
+        if os.path.exists(filepath) is False:
+            with self._lock:
+                self._misses += 1
+
+            return False
+
+        try:
+            prepare_output(output_filepath)
+
+            try:
+                os.link(filepath, output_filepath)
+            except OSError:
+                shutil.copyfile(filepath, output_filepath)
+
+            # Mark as recently-used.
+            os.utime(filepath, None)
+        except (IOError, OSError):
+            _LOGGER.warning("Could not use output cache entry: "
+                            "[{}]".format(filepath), exc_info=True)
+
+            with self._lock:
+                self._misses += 1
+
+            return False
+
+        with self._lock:
+            self._hits += 1
+
+        return True
+
+    def store(self, key, output_filepath):
+        """Add the output at the given file-path to the cache."""
+
+        filepath = self._get_filepath(key)
+
+        try:
+            if os.path.exists(self._path) is False:
+                os.makedirs(self._path)
+
+            # Write atomically so that concurrent readers never see a partial
+            # entry.
+
+            handle, temp_filepath = \
+                tempfile.mkstemp(
+                    dir=self._path,
+                    suffix='.tmp')
+
+            with os.fdopen(handle, 'wb') as f:
+                with open(output_filepath, 'rb') as g:
+                    shutil.copyfileobj(g, f)
+
+            entry_bytes = os.path.getsize(temp_filepath)
+
+            os.chmod(temp_filepath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.rename(temp_filepath, filepath)
+        except (IOError, OSError):
+            _LOGGER.warning("Could not write output cache entry: "
+                            "[{}]".format(filepath), exc_info=True)
+
+            return
+
+        evicted_count = self._budget.add(entry_bytes)
+
+        if evicted_count > 0:
+            with self._lock:
+                self._evictions += evicted_count
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def stats(self):
+        entries = []
+        if os.path.exists(self._path) is True:
+            entries = \
+                templatelayer.disk_cache.get_entries(
+                    self._path,
+                    _FILENAME_SUFFIX)
+
+        with self._lock:
+            stats = \
+                templatelayer.template_cache.CACHE_STATS(
+                    hits=self._hits,
+                    misses=self._misses,
+                    evictions=self._evictions,
+                    count=len(entries),
+                    bytes=sum(size for _, size, _ in entries))
+
+        return stats
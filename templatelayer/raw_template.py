@@ -0,0 +1,143 @@
+import logging
+import struct
+import mmap
+
+import PIL.Image
+
+_LOGGER = logging.getLogger(__name__)
+
+# The header has a magic (which also versions the format), the mode of the
+# image, the mode that the pixels are stored in, and the dimensions. The
+# pixels follow immediately, uncompressed, row by row.
+_MAGIC = b'TLRAW001'
+_HEADER = struct.Struct('<8s8s8sII')
+
+# Image mode -> storage mode. The storage modes are ones that PIL can map
+# directly from a buffer without copying. RGB is padded to four bytes per
+# pixel because that's how PIL holds it internally.
+_STORAGE_MODES = {
+    'L': 'L',
+    'RGB': 'RGBX',
+    'RGBA': 'RGBA',
+    'CMYK': 'CMYK',
+    'I;16': 'I;16',
+}
+
+# The number of rows to convert at a time when writing.
+_WRITE_STRIP_HEIGHT = 256
+
+
+class RawTemplateException(Exception):
+    pass
+
+
+def _encode_mode(mode):
+    return mode.encode('ascii').ljust(8, b'\0')
+
+def _decode_mode(encoded):
+    return encoded.rstrip(b'\0').decode('ascii')
+
+def is_raw_template(filepath):
+    """Return whether the given file is a raw template."""
+
+    with open(filepath, 'rb') as f:
+        magic = f.read(len(_MAGIC))
+
+    return magic == _MAGIC
+
+def write_raw_template(im, filepath):
+    """Write the given image as an uncompressed, memory-mappable raw template.
+    Images in modes without a direct storage mode are converted to RGB (or
+    RGBA if they have transparency).
+    """
+
+    if im.mode not in _STORAGE_MODES:
+        if 'A' in im.getbands() or 'transparency' in im.info:
+            im = im.convert('RGBA')
+        else:
+            im = im.convert('RGB')
+
+    storage_mode = _STORAGE_MODES[im.mode]
+
+    header = \
+        _HEADER.pack(
+            _MAGIC,
+            _encode_mode(im.mode),
+            _encode_mode(storage_mode),
+            im.width,
+            im.height)
+
+    with open(filepath, 'wb') as f:
+        f.write(header)
+
+        # Convert in strips so that we never hold a second full copy of the
+        # pixels.
+
+        for top in range(0, im.height, _WRITE_STRIP_HEIGHT):
+            bottom = min(top + _WRITE_STRIP_HEIGHT, im.height)
+            strip_im = im.crop((0, top, im.width, bottom))
+
+            f.write(strip_im.tobytes('raw', storage_mode))
+
+
+class RawTemplate(object):
+    """A raw template that is memory-mapped rather than decoded. Every process
+    that maps the same file shares the same pages.
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < _HEADER.size:
+            raise RawTemplateException(
+                "Raw template is truncated: [{}]".format(filepath))
+
+        magic, encoded_mode, encoded_storage_mode, width, height = \
+            _HEADER.unpack(self._mm[:_HEADER.size])
+
+        if magic != _MAGIC:
+            raise RawTemplateException(
+                "Not a raw template: [{}]".format(filepath))
+
+        self._mode = _decode_mode(encoded_mode)
+        storage_mode = _decode_mode(encoded_storage_mode)
+        size = (width, height)
+
+        data = memoryview(self._mm)[_HEADER.size:]
+
+        # This doesn't copy. The image is read-only and refers directly to
+        # the mapped pages.
+        self._im = \
+            PIL.Image.frombuffer(
+                storage_mode,
+                size,
+                data,
+                'raw',
+                storage_mode,
+                0,
+                1)
+
+    def new_canvas(self):
+        """Return a new, writable image with the template pixels."""
+
+        if self._im.mode == self._mode:
+            return self._im.copy()
+
+        return self._im.convert(self._mode)
+
+    @property
+    def image(self):
+        """The read-only, memory-mapped image. This is in the storage mode,
+        which may differ from `mode` (e.g. RGBX rather than RGB).
+        """
+
+        return self._im
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def size(self):
+        return self._im.size
@@ -0,0 +1,90 @@
+"""The client side of the render server (see `templatelayer.render_server`).
+This only uses the standard library so that clients start quickly.
+
+The protocol is one JSON object per line in each direction. A request has
+the file-paths of the layout config (which identifies the layout), the
+template, the output, and a list of (placeholder name, file-path) pairs for
+the components:
+
+    {"layout": "/layout.json", "template": "/template.png", "output": "/output.png", "components": [["top-left", "/top_left.png"]]}
+
+and every request gets one response:
+
+    {"status": "ok"}
+    {"status": "error", "error": "PlaceholderNotCompatibleException: ..."}
+
+Any number of requests may be sent over one connection.
+"""
+
+import logging
+import os
+import json
+import socket
+
+_LOGGER = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+
+class RenderServerException(Exception):
+    pass
+
+
+class RenderClient(object):
+    """Sends render requests to a render server over its Unix socket."""
+
+    def __init__(self, socket_path):
+        self._socket_path = socket_path
+
+        self._s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            self._s.connect(socket_path)
+        except Exception:
+            self._s.close()
+            raise
+
+        self._f = self._s.makefile('rwb')
+
+    def render(self, layout_filepath, template_filepath, components,
+               output_filepath):
+        """Have the server render the given components (a list of
+        (placeholder name, file-path) pairs) and write the output. Relative
+        paths are relative to this process, not the server.
+        """
+
+        request = {
+            'layout': os.path.abspath(layout_filepath),
+            'template': os.path.abspath(template_filepath),
+            'output': os.path.abspath(output_filepath),
+            'components': [
+                (name, os.path.abspath(filepath))
+                for name, filepath
+                in components
+            ],
+        }
+
+        self._f.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._f.flush()
+
+        line = self._f.readline()
+        if not line:
+            raise RenderServerException(
+                "Render server closed the connection: [{}]".format(
+                self._socket_path))
+
+        response = json.loads(line.decode('utf-8'))
+
+        if response['status'] != STATUS_OK:
+            raise RenderServerException(response['error'])
+
+    def close(self):
+        self._f.close()
+        self._s.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
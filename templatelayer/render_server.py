@@ -0,0 +1,240 @@
+"""A long-running render server that keeps templates and layouts decoded and
+validated between requests. It listens on a Unix socket. See
+`templatelayer.render_client` for the protocol and the client.
+"""
+
+import logging
+import os
+import stat
+import json
+import threading
+import socket
+import socketserver
+
+import PIL.Image
+
+import templatelayer.template_layout
+import templatelayer.template_cache
+import templatelayer.component_loader
+import templatelayer.layout_loader
+import templatelayer.raw_template
+import templatelayer.encoding
+import templatelayer.output_cache
+import templatelayer.render_client
+
+_LOGGER = logging.getLogger(__name__)
+
+# The decoded templates (and masks) of the compiled (template, layout) pairs
+# that are kept.
+DEFAULT_MAX_TEMPLATE_BYTES = templatelayer.template_cache.DEFAULT_MAX_BYTES
+
+
+def _compile(template_filepath, layout_filepath, layout_cache,
+             validate_bounds, layout_format, stream_layout):
+    config = \
+        templatelayer.layout_loader.read_config(
+            layout_filepath,
+            format_=layout_format,
+            stream=stream_layout)
+
+    if templatelayer.raw_template.is_raw_template(template_filepath) is True:
+        rt = templatelayer.raw_template.RawTemplate(template_filepath)
+
+        ct = \
+            templatelayer.template_layout.CompiledTemplate(
+                rt.image,
+                config,
+                layout_cache=layout_cache,
+                canvas_mode=rt.mode,
+                validate_bounds=validate_bounds)
+
+        return ct
+
+    with PIL.Image.open(template_filepath) as template_im:
+        template_im.load()
+
+        ct = \
+            templatelayer.template_layout.CompiledTemplate(
+                template_im,
+                config,
+                layout_cache=layout_cache,
+                validate_bounds=validate_bounds)
+
+    return ct
+
+
+class _CompiledTemplateCache(templatelayer.template_cache.TemplateImageCache):
+    """Keeps compiled (template, layout) pairs, least-recently-used first
+    out, within a budget on the bytes of their decoded templates and masks.
+    Entries are keyed by both files, so a change to either compiles again.
+    """
+
+    def _get_entry_bytes(self, ct):
+        return ct.image_bytes
+
+    def get_compiled_template(self, template_filepath, layout_filepath,
+                              compile_):
+        key = \
+            (self._get_key(template_filepath),
+             self._get_key(layout_filepath))
+
+        return self._get_or_load(key, compile_, template_filepath)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            response = self.server.render_server.handle_request(line)
+
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class RenderServer(object):
+    """Renders requests from any number of clients, each on its own thread.
+    Templates are decoded, and layouts are loaded and validated, once. They
+    are then kept (within `max_template_bytes` of decoded pixels, least-
+    recently-used first out) until their files change. If `validate_bounds`
+    is True, the placeholders are checked against the template when it's
+    compiled. Layouts are read as `templatelayer.layout_loader.read_config()`
+    describes, and outputs are saved in `format_` or, by default, the format
+    implied by their extension, with the given encoding preset and options
+    (see `templatelayer.encoding`).
+    """
+
+    def __init__(self, socket_path, layout_cache=None,
+                 max_template_bytes=DEFAULT_MAX_TEMPLATE_BYTES,
+                 validate_bounds=False, layout_format=None,
+                 stream_layout=False, format_=None, preset=None,
+                 encoder_options=None):
+        if encoder_options is None:
+            encoder_options = {}
+
+        self._socket_path = socket_path
+        self._layout_cache = layout_cache
+        self._validate_bounds = validate_bounds
+        self._layout_format = layout_format
+        self._stream_layout = stream_layout
+        self._format = format_
+        self._preset = preset
+        self._encoder_options = encoder_options
+
+        self._compiled = _CompiledTemplateCache(max_bytes=max_template_bytes)
+
+        self._server = None
+        self._started = threading.Event()
+
+    def get_compiled_template(self, template_filepath, layout_filepath):
+        """Return the `CompiledTemplate` for the given template and layout
+        config, compiling it if it's not already loaded.
+        """
+
+        def compile_():
+            ct = \
+                _compile(
+                    template_filepath,
+                    layout_filepath,
+                    self._layout_cache,
+                    self._validate_bounds,
+                    self._layout_format,
+                    self._stream_layout)
+
+            return ct
+
+        ct = \
+            self._compiled.get_compiled_template(
+                template_filepath,
+                layout_filepath,
+                compile_)
+
+        return ct
+
+    def render(self, layout_filepath, template_filepath, components,
+               output_filepath):
+        ct = self.get_compiled_template(template_filepath, layout_filepath)
+
+        tl = ct.new_layout()
+        loader = templatelayer.component_loader.ComponentLoader(tl)
+
+        for name, filepath in components:
+            with loader.open(name, filepath) as overlay_im:
+                tl.apply_component(name, overlay_im)
+
+        templatelayer.output_cache.prepare_output(output_filepath)
+
+        templatelayer.encoding.save(
+            tl.resource,
+            output_filepath,
+            format_=self._format,
+            preset=self._preset,
+            **self._encoder_options)
+
+    def handle_request(self, line):
+        """Handle one encoded request and return the response."""
+
+        try:
+            request = json.loads(line.decode('utf-8'))
+
+            self.render(
+                request['layout'],
+                request['template'],
+                request['components'],
+                request['output'])
+        except Exception as e:
+            _LOGGER.exception("Render failed.")
+
+            return {
+                'status': templatelayer.render_client.STATUS_ERROR,
+                'error': "{}: {}".format(e.__class__.__name__, e),
+            }
+
+        return {
+            'status': templatelayer.render_client.STATUS_OK,
+        }
+
+    def _remove_stale_socket(self):
+        """A socket left behind by a server that is no longer running would
+        keep us from binding, so remove it. A socket that still accepts
+        connections is left alone (and binding will fail).
+        """
+
+        try:
+            s = os.stat(self._socket_path)
+        except OSError:
+            return
+
+        if stat.S_ISSOCK(s.st_mode) is False:
+            return
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            probe.connect(self._socket_path)
+        except socket.error:
+            os.unlink(self._socket_path)
+        finally:
+            probe.close()
+
+    def serve_forever(self):
+        self._remove_stale_socket()
+
+        self._server = _UnixServer(self._socket_path, _RequestHandler)
+        self._server.render_server = self
+
+        self._started.set()
+
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(self._socket_path)
+
+    def shutdown(self):
+        """Stop `serve_forever()` from another thread."""
+
+        self._started.wait()
+        self._server.shutdown()
@@ -0,0 +1,182 @@
+"""A grid spatial index over placeholder rectangles, for hit-testing
+and region queries.
+"""
+
+import logging
+import array
+import bisect
+import math
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GridIndex(object):
+    """Buckets rectangles into a grid of roughly one cell per rectangle that
+    spans all of them. The grid lines are placed at quantiles of the left
+    and top edges, so cells are small where the rectangles are dense and
+    large where they're sparse. Every rectangle is recorded in each cell that
+    it touches. Rectangles are identified by their position in the given
+    columns, and those without area are left out.
+
+    Placeholders don't overlap, so every cell holds a handful of rectangles
+    (about the square root of their number, at worst, when they line up
+    along a diagonal) and queries only look at the cells under them. The
+    buckets are stored as two flat arrays (offsets and members) rather than
+    as a list per cell.
+    """
+
+    def __init__(self, lefts, tops, widths, heights):
+        self._lefts = lefts
+        self._tops = tops
+        self._widths = widths
+        self._heights = heights
+
+        positions = [
+            i
+            for i
+            in range(len(lefts))
+            if widths[i] > 0 and heights[i] > 0
+        ]
+
+        if not positions:
+            self._columns = 0
+            self._rows = 0
+            self._column_edges = [0]
+            self._row_edges = [0]
+            self._offsets = array.array('i', [0])
+            self._members = array.array('i')
+
+            return
+
+        # Place the column and row boundaries at quantiles of the left and top
+        # edges, rather than at even intervals, so that a dense cluster gets
+        # as many cells as the sparse remainder of the layout. Aim for about
+        # one cell per rectangle.
+
+        max_right = max(lefts[i] + widths[i] for i in positions)
+        max_bottom = max(tops[i] + heights[i] for i in positions)
+
+        divisions = int(math.ceil(math.sqrt(len(positions))))
+
+        self._column_edges = \
+            self._get_edges([lefts[i] for i in positions], max_right, divisions)
+
+        self._row_edges = \
+            self._get_edges([tops[i] for i in positions], max_bottom, divisions)
+
+        self._columns = len(self._column_edges) - 1
+        self._rows = len(self._row_edges) - 1
+
+        # Count the members of every cell, turn the counts into offsets, and
+        # then fill the cells.
+
+        cell_count = self._columns * self._rows
+        counts = array.array('i', [0]) * (cell_count + 1)
+
+        for i in positions:
+            for cell in self._iterate_cells(
+                            lefts[i],
+                            tops[i],
+                            lefts[i] + widths[i],
+                            tops[i] + heights[i]):
+                counts[cell + 1] += 1
+
+        for cell in range(cell_count):
+            counts[cell + 1] += counts[cell]
+
+        self._offsets = counts
+
+        self._members = array.array('i', [0]) * counts[cell_count]
+        next_slots = array.array('i', counts[:cell_count])
+
+        for i in positions:
+            for cell in self._iterate_cells(
+                            lefts[i],
+                            tops[i],
+                            lefts[i] + widths[i],
+                            tops[i] + heights[i]):
+                self._members[next_slots[cell]] = i
+                next_slots[cell] += 1
+
+    @staticmethod
+    def _get_edges(starts, end, divisions):
+        """Return the ascending, distinct boundaries that split the given
+        start coordinates into (at most) the given number of equal-sized
+        groups, followed by the end coordinate.
+        """
+
+        starts = sorted(starts)
+        count = len(starts)
+
+        edges = []
+        for division in range(divisions):
+            edge = starts[division * count // divisions]
+            if not edges or edge != edges[-1]:
+                edges.append(edge)
+
+        edges.append(end)
+
+        return edges
+
+    def _iterate_cells(self, left, top, right, bottom):
+        """Yield the cells touched by the given rectangle (right and bottom
+        are exclusive), clipped to the grid.
+        """
+
+        first_column = \
+            max(0, bisect.bisect_right(self._column_edges, left) - 1)
+
+        last_column = \
+            min(self._columns - 1,
+                bisect.bisect_right(self._column_edges, right - 1) - 1)
+
+        first_row = max(0, bisect.bisect_right(self._row_edges, top) - 1)
+
+        last_row = \
+            min(self._rows - 1,
+                bisect.bisect_right(self._row_edges, bottom - 1) - 1)
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                yield row * self._columns + column
+
+    def _get_members(self, cell):
+        return self._members[self._offsets[cell]:self._offsets[cell + 1]]
+
+    def get_position_at(self, x, y):
+        """Return the position of the rectangle that contains the given
+        pixel, or None.
+        """
+
+        for cell in self._iterate_cells(x, y, x + 1, y + 1):
+            for i in self._get_members(cell):
+                if self._lefts[i] <= x < self._lefts[i] + self._widths[i] and \
+                   self._tops[i] <= y < self._tops[i] + self._heights[i]:
+                    return i
+
+        return None
+
+    def get_positions_in(self, left, top, width, height):
+        """Return the positions of the rectangles that intersect the given
+        one, in ascending order.
+        """
+
+        if width <= 0 or height <= 0:
+            return []
+
+        right = left + width
+        bottom = top + height
+
+        found_s = set()
+        for cell in self._iterate_cells(left, top, right, bottom):
+            for i in self._get_members(cell):
+                if i in found_s:
+                    continue
+
+                if self._lefts[i] < right and \
+                   left < self._lefts[i] + self._widths[i] and \
+                   self._tops[i] < bottom and \
+                   top < self._tops[i] + self._heights[i]:
+                    found_s.add(i)
+
+        return sorted(found_s)
@@ -0,0 +1,161 @@
+import logging
+import os
+import collections
+import hashlib
+import threading
+
+import PIL.Image
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CACHE_STATS = \
+    collections.namedtuple(
+        'CACHE_STATS', [
+            'hits',
+            'misses',
+            'evictions',
+            'count',
+            'bytes',
+        ])
+
+
+def get_image_bytes(im):
+    """Return the number of bytes that PIL uses to hold the decoded pixels of
+    the given image. Multi-band images are stored at four bytes per pixel.
+    """
+
+    if len(im.getbands()) > 1 or im.mode in ('I', 'F'):
+        pixel_size = 4
+    elif im.mode.startswith('I;16'):
+        pixel_size = 2
+    else:
+        pixel_size = 1
+
+    return im.width * im.height * pixel_size
+
+
+class TemplateImageCache(object):
+    """An in-process, memory-bounded LRU cache of decoded template images.
+
+    Entries are keyed by the file-path with its modification-time and size or,
+    if `key_by_content` is true, by a hash of the file content (which survives
+    copies and touches at the cost of reading the file on every lookup).
+    Callers always receive their own copy of the cached pixels.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, key_by_content=False):
+        self._max_bytes = max_bytes
+        self._key_by_content = key_by_content
+
+        self._entries = collections.OrderedDict()
+        self._current_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    def _get_key(self, filepath):
+        if self._key_by_content is True:
+            h = hashlib.sha1()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+
+            return h.hexdigest()
+
+        s = os.stat(filepath)
+        return (os.path.abspath(filepath), s.st_mtime, s.st_size)
+
+    def _load(self, filepath):
+        with PIL.Image.open(filepath) as im:
+            im.load()
+
+            # Detach from the file (and any lazy-loading state).
+            return im.copy()
+
+    def _get_entry_bytes(self, entry):
+        return get_image_bytes(entry)
+
+    def _get_or_load(self, key, load, description):
+        """Return the entry for the given key, calling `load()` to create it
+        (outside of the lock) if it's not cached.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+                return entry
+
+            self._misses += 1
+
+        # Load outside of the lock so that other entries can still be served
+        # in the meantime.
+
+        entry = load()
+        entry_bytes = self._get_entry_bytes(entry)
+
+        if entry_bytes > self._max_bytes:
+            _LOGGER.debug("Entry is larger than the cache and won't be "
+                          "cached: [{}]".format(description))
+
+            return entry
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._current_bytes += entry_bytes
+
+                self._evict()
+
+        return entry
+
+    def get_nocopy(self, filepath):
+        """Return the cached, decoded image for the given file-path. It is
+        shared with every other caller and must not be modified.
+        """
+
+        key = self._get_key(filepath)
+
+        return \
+            self._get_or_load(
+                key,
+                lambda: self._load(filepath),
+                filepath)
+
+    def get(self, filepath):
+        """Return a copy of the decoded image for the given file-path. The
+        copy may be freely modified.
+        """
+
+        return self.get_nocopy(filepath).copy()
+
+    def _evict(self):
+        while self._current_bytes > self._max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self._current_bytes -= self._get_entry_bytes(entry)
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            stats = \
+                CACHE_STATS(
+                    hits=self._hits,
+                    misses=self._misses,
+                    evictions=self._evictions,
+                    count=len(self._entries),
+                    bytes=self._current_bytes)
+
+        return stats
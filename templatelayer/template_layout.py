@@ -1,6 +1,17 @@
 import logging
-import json
 import collections
+import collections.abc
+import bisect
+import array
+import operator
+
+import PIL.Image
+import PIL.ImageChops
+
+import templatelayer.fit
+import templatelayer.instrumentation
+import templatelayer.spatial_index
+import templatelayer.template_cache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -12,6 +23,24 @@ _PLACEHOLDER = \
             'left',
             'height',
             'width',
+            'mask',
+            'fit',
+        ])
+
+# Optional fields default to None.
+_PLACEHOLDER.__new__.__defaults__ = (None, None)
+
+# A placeholder "mask" of this value uses the alpha of the component itself.
+# Any other value is the file-path of a mask image.
+MASK_ALPHA = 'alpha'
+
+_REGION = \
+    collections.namedtuple(
+        '_REGION', [
+            'top',
+            'left',
+            'height',
+            'width',
         ])
 
 
@@ -31,19 +60,649 @@ class UnknownPlaceholderException(TemplateLayoutException):
     pass
 
 
+class PlaceholderOutOfBoundsError(TemplateLayoutException):
+    pass
+
+
+class AnimatedTemplateError(TemplateLayoutException):
+    pass
+
+
+def _get_clipped_extents(placeholders, width, height):
+    """Yield (left, top, right, bottom) for every placeholder, clipped to the
+    template. Placeholders that end up empty are skipped.
+    """
+
+    for ph in placeholders:
+        left = max(ph.left, 0)
+        top = max(ph.top, 0)
+        right = min(ph.left + ph.width, width)
+        bottom = min(ph.top + ph.height, height)
+
+        if left < right and top < bottom:
+            yield left, top, right, bottom
+
+def get_covered_area(placeholders, width, height):
+    """Return the number of template pixels covered by the given placeholders.
+    Placeholders are validated to not overlap, so the union is just the sum of
+    the (clipped) areas.
+    """
+
+    area = 0
+    for left, top, right, bottom in \
+            _get_clipped_extents(placeholders, width, height):
+        area += (right - left) * (bottom - top)
+
+    return area
+
+def get_uncovered_regions(placeholders, width, height):
+    """Return a list of `_REGION` rectangles covering every template pixel that
+    isn't covered by one of the given (non-overlapping) placeholders.
+
+    The template is swept from top to bottom. The placeholders that cross the
+    sweep line are kept sorted by left, and the gaps between them are open
+    regions. A placeholder edge only changes the gaps on either side of it, so
+    every edge is handled with one binary search and a constant number of
+    region updates (O(n log n) comparisons overall; the sorted lists are
+    shifted in C). A gap that continues unchanged past a row with edges
+    extends the same region rather than starting a new one.
+    """
+
+    # Removals sort before insertions on the same row because the bottom
+    # edge is exclusive.
+
+    _REMOVE = 0
+    _INSERT = 1
+
+    events = []
+    for left, top, right, bottom in \
+            _get_clipped_extents(placeholders, width, height):
+        events.append((top, _INSERT, left, right))
+        events.append((bottom, _REMOVE, left, right))
+
+    events.sort()
+
+    active_lefts = []
+    active_rights = []
+
+    # (left, right) -> top, for the gaps that were open before the current
+    # row.
+    open_regions = {}
+
+    # The gaps that were closed, and those that were opened, by the edges on
+    # the current row. A gap that is closed and opened again on the same row
+    # just continues.
+    closed_regions = {}
+    opened_s = set([(0, width)])
+
+    regions = []
+
+    def close_gap(left, right):
+        if left >= right:
+            return
+
+        extent = (left, right)
+
+        if extent in opened_s:
+            opened_s.remove(extent)
+        else:
+            closed_regions[extent] = open_regions.pop(extent)
+
+    def open_gap(left, right):
+        if left >= right:
+            return
+
+        extent = (left, right)
+
+        if extent in closed_regions:
+            open_regions[extent] = closed_regions.pop(extent)
+        else:
+            opened_s.add(extent)
+
+    def finish_row(y):
+        for extent, region_top in closed_regions.items():
+            # Gaps opened by the edges on the bottom row are empty.
+            if region_top == y:
+                continue
+
+            region = \
+                _REGION(
+                    top=region_top,
+                    left=extent[0],
+                    height=y - region_top,
+                    width=extent[1] - extent[0])
+
+            regions.append(region)
+
+        closed_regions.clear()
+
+        for extent in opened_s:
+            open_regions[extent] = y
+
+        opened_s.clear()
+
+    y = 0
+    for event_y, event_type, left, right in events:
+        if event_y != y:
+            finish_row(y)
+            y = event_y
+
+        position = bisect.bisect_left(active_lefts, left)
+
+        if event_type == _REMOVE:
+            previous_right = active_rights[position - 1] if position > 0 else 0
+
+            if position + 1 < len(active_lefts):
+                next_left = active_lefts[position + 1]
+            else:
+                next_left = width
+
+            del active_lefts[position]
+            del active_rights[position]
+
+            close_gap(previous_right, left)
+            close_gap(right, next_left)
+            open_gap(previous_right, next_left)
+        else:
+            previous_right = active_rights[position - 1] if position > 0 else 0
+
+            if position < len(active_lefts):
+                next_left = active_lefts[position]
+            else:
+                next_left = width
+
+            active_lefts.insert(position, left)
+            active_rights.insert(position, right)
+
+            close_gap(previous_right, next_left)
+            open_gap(previous_right, left)
+            open_gap(right, next_left)
+
+    finish_row(y)
+
+    # Close whatever is still open at the bottom of the template.
+
+    for extent in list(open_regions.keys()):
+        close_gap(*extent)
+
+    finish_row(height)
+
+    regions.sort()
+    return regions
+
+def _assert_no_overlaps_in_columns(names, lefts, tops, widths, heights):
+    """Make sure that none of the placeholders described by the given
+    parallel columns overlap. Right and bottom edges are exclusive.
+
+    A vertical line is swept from left to right across the placeholders. The
+    vertical extents of the placeholders that currently cross the line are
+    kept sorted by top. As long as no overlap has been found, those extents
+    are disjoint, so a newly-crossed placeholder only has to be checked
+    against its immediate neighbors. This takes O(n log n) comparisons rather
+    than comparing every pair.
+
+    When an overlap is found, the placeholder that was configured later is
+    reported first.
+    """
+
+    # Removals sort before insertions at the same position because the right
+    # edge is exclusive.
+
+    _REMOVE = 0
+    _INSERT = 1
+
+    events = []
+    for i in range(len(names)):
+        if widths[i] <= 0 or heights[i] <= 0:
+            continue
+
+        events.append((lefts[i], _INSERT, i))
+        events.append((lefts[i] + widths[i], _REMOVE, i))
+
+    events.sort()
+
+    active_tops = []
+    active_indices = []
+
+    for _, event_type, i in events:
+        top = tops[i]
+        position = bisect.bisect_left(active_tops, top)
+
+        if event_type == _REMOVE:
+            del active_tops[position]
+            del active_indices[position]
+
+            continue
+
+        left = lefts[i]
+        right = left + widths[i]
+        bottom = top + heights[i]
+
+        for neighbor_position in (position - 1, position):
+            if neighbor_position < 0 or \
+               neighbor_position >= len(active_indices):
+                continue
+
+            j = active_indices[neighbor_position]
+
+            if left < lefts[j] + widths[j] and lefts[j] < right and \
+               top < tops[j] + heights[j] and tops[j] < bottom:
+                later, earlier = max(i, j), min(i, j)
+
+                raise PlaceholderOverlapError(
+                        "Placeholder [{}] overlaps with placeholder "
+                        "[{}].".format(names[later], names[earlier]))
+
+        active_tops.insert(position, top)
+        active_indices.insert(position, i)
+
+def _get_column(values):
+    """Return the values as a compact array of C ints or, if any of them can't
+    be stored as one (e.g. a float), as a list.
+    """
+
+    if isinstance(values, array.array) and values.typecode == 'i':
+        return values
+
+    values = list(values)
+
+    try:
+        return array.array('i', values)
+    except (TypeError, OverflowError):
+        return values
+
+
+class PlaceholderTable(collections.abc.Mapping):
+    """Read-only, column-oriented storage for parsed placeholder-configs. The
+    coordinates are kept in parallel arrays and the (rarely-set) mask and fit
+    options in a sparse dictionary, rather than as one tuple per placeholder.
+
+    This is a mapping of placeholder names to `_PLACEHOLDER`, in config
+    order. The tuples are created when they're accessed. Placeholders also
+    have a position (see `get_index()`) that can be used to keep per-
+    placeholder state in arrays.
+    """
+
+    def __init__(self, names, tops, lefts, heights, widths, options=None):
+        """`options` is a dictionary of positions to (mask, fit) for the
+        placeholders that have either.
+        """
+
+        if options is None:
+            options = {}
+
+        self._names = list(names)
+        self._indices = dict((name, i) for i, name in enumerate(self._names))
+
+        self._tops = _get_column(tops)
+        self._lefts = _get_column(lefts)
+        self._heights = _get_column(heights)
+        self._widths = _get_column(widths)
+
+        self._options = options
+
+        # (width, height) -> covered area
+        self._covered_areas = {}
+
+        # Template sizes that every placeholder is known to fit within.
+        self._bounds_checked_s = set()
+
+        # Built on first use.
+        self._spatial_index = None
+
+    @classmethod
+    def from_placeholders(cls, placeholders):
+        """Build a table from `_PLACEHOLDER` tuples."""
+
+        placeholders = list(placeholders)
+
+        options = {}
+        for i, ph in enumerate(placeholders):
+            if ph.mask is not None or ph.fit is not None:
+                options[i] = (ph.mask, ph.fit)
+
+        pt = \
+            cls(
+                [ph.name for ph in placeholders],
+                [ph.top for ph in placeholders],
+                [ph.left for ph in placeholders],
+                [ph.height for ph in placeholders],
+                [ph.width for ph in placeholders],
+                options=options)
+
+        return pt
+
+    def __getitem__(self, name):
+        return self.get_by_index(self._indices[name])
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._indices
+
+    def __repr__(self):
+        return '<{} ({}) placeholders>'.format(
+               self.__class__.__name__, len(self._names))
+
+    def get_index(self, name):
+        """Return the position of the given placeholder or None if there's no
+        such placeholder.
+        """
+
+        return self._indices.get(name)
+
+    def get_by_index(self, i):
+        mask, fit = self._options.get(i, (None, None))
+
+        ph = \
+            _PLACEHOLDER(
+                name=self._names[i],
+                top=self._tops[i],
+                left=self._lefts[i],
+                height=self._heights[i],
+                width=self._widths[i],
+                mask=mask,
+                fit=fit)
+
+        return ph
+
+    def to_config(self):
+        """Return the layout config that these placeholders would be parsed
+        from.
+        """
+
+        placeholders = {}
+        for ph in self.values():
+            parameters = {
+                'top': ph.top,
+                'left': ph.left,
+                'height': ph.height,
+                'width': ph.width,
+            }
+
+            if ph.mask is not None:
+                parameters['mask'] = ph.mask
+
+            if ph.fit is not None:
+                parameters['fit'] = ph.fit
+
+            placeholders[ph.name] = parameters
+
+        config = {
+            'placeholders': placeholders,
+        }
+
+        return config
+
+    def assert_no_overlaps(self):
+        """Raise `PlaceholderOverlapError` if any of the placeholders overlap.
+        This works on the columns directly.
+        """
+
+        _assert_no_overlaps_in_columns(
+            self._names,
+            self._lefts,
+            self._tops,
+            self._widths,
+            self._heights)
+
+    def assert_in_bounds(self, width, height):
+        """Raise `PlaceholderOutOfBoundsError` if any placeholder extends
+        beyond a template of the given size. Each size is only checked once.
+
+        The extremes of whole columns are compared first, which is done in C
+        and is cheap even for huge layouts. The placeholders are only visited
+        one at a time to find the offending one for the error.
+        """
+
+        key = (width, height)
+        if key in self._bounds_checked_s:
+            return
+
+        if not self._names:
+            self._bounds_checked_s.add(key)
+            return
+
+        if min(self._lefts) >= 0 and \
+           min(self._tops) >= 0 and \
+           max(map(operator.add, self._lefts, self._widths)) <= width and \
+           max(map(operator.add, self._tops, self._heights)) <= height:
+            self._bounds_checked_s.add(key)
+            return
+
+        for i in range(len(self._names)):
+            left = self._lefts[i]
+            top = self._tops[i]
+            right = left + self._widths[i]
+            bottom = top + self._heights[i]
+
+            if left < 0 or top < 0 or right > width or bottom > height:
+                raise PlaceholderOutOfBoundsError(
+                        "Placeholder [{}] ({}, {}) - ({}, {}) is not within "
+                        "the template ({}, {}).".format(
+                        self._names[i], left, top, right, bottom, width,
+                        height))
+
+    def get_covered_area(self, width, height):
+        """Return the number of pixels of a template of the given size that
+        are covered by placeholders. This is only calculated once per size.
+        """
+
+        key = (width, height)
+
+        try:
+            return self._covered_areas[key]
+        except KeyError:
+            pass
+
+        area = get_covered_area(self.values(), width, height)
+        self._covered_areas[key] = area
+
+        return area
+
+    def get_placeholder_at(self, x, y):
+        """Return the placeholder that contains the given pixel, or None."""
+
+        i = self.spatial_index.get_position_at(x, y)
+        if i is None:
+            return None
+
+        return self.get_by_index(i)
+
+    def get_placeholders_in(self, rect):
+        """Return the placeholders that intersect the given rectangle (a
+        `_REGION` or a (top, left, height, width) tuple), in config order.
+        """
+
+        region = _REGION(*rect)
+
+        positions = \
+            self.spatial_index.get_positions_in(
+                region.left,
+                region.top,
+                region.width,
+                region.height)
+
+        return [self.get_by_index(i) for i in positions]
+
+    @property
+    def spatial_index(self):
+        """A `GridIndex` over the placeholders by position. It's built the
+        first time that it's needed.
+        """
+
+        if self._spatial_index is None:
+            self._spatial_index = \
+                templatelayer.spatial_index.GridIndex(
+                    self._lefts,
+                    self._tops,
+                    self._widths,
+                    self._heights)
+
+        return self._spatial_index
+
+    @property
+    def names(self):
+        """The placeholder names in position order. This must not be
+        modified.
+        """
+
+        return self._names
+
+    @property
+    def tops(self):
+        return self._tops
+
+    @property
+    def lefts(self):
+        return self._lefts
+
+    @property
+    def heights(self):
+        return self._heights
+
+    @property
+    def widths(self):
+        return self._widths
+
+
+def load_mask(ph):
+    """Load the mask image for the given placeholder as mode "L". The alpha
+    band is used for images that have one.
+    """
+
+    with PIL.Image.open(ph.mask) as mask_im:
+        if mask_im.size != (ph.width, ph.height):
+            raise PlaceholderNotCompatibleException(
+                "Mask with size ({}, {}) not compatible with placeholder "
+                "[{}] size ({}, {}).".format(
+                mask_im.width, mask_im.height, ph.name, ph.width, ph.height))
+
+        if 'A' in mask_im.getbands():
+            return mask_im.getchannel('A')
+
+        return mask_im.convert('L')
+
+def paste_masked(base_im, overlay_im, offset, mask_im=None):
+    """Blend the overlay into the base image. `mask_im` is the mask image for
+    the placeholder or None to only use the alpha of the overlay. If there's
+    both, they're multiplied.
+
+    Onto an opaque base, this is a single paste with a mask (PIL blends in C).
+    Onto a base with alpha, the overlay is alpha-composited so that the
+    resulting alpha is correct.
+    """
+
+    has_alpha = 'A' in overlay_im.getbands()
+
+    if mask_im is None:
+        if has_alpha is False:
+            base_im.paste(overlay_im, offset)
+            return
+
+        mask_im = overlay_im.getchannel('A')
+    elif has_alpha is True:
+        mask_im = PIL.ImageChops.multiply(mask_im, overlay_im.getchannel('A'))
+
+    if base_im.mode != 'RGBA':
+        base_im.paste(overlay_im, offset, mask_im)
+        return
+
+    overlay_im = overlay_im.convert('RGBA')
+    overlay_im.putalpha(mask_im)
+
+    # The destination can't be negative, so clip the overlay instead.
+
+    left, top = offset
+    source = (max(-left, 0), max(-top, 0))
+    dest = (max(left, 0), max(top, 0))
+
+    base_im.alpha_composite(overlay_im, dest=dest, source=source)
+
+
 class SimpleTemplateLayout(object):
-    def __init__(self, template_im, config):
+    def __init__(self, template_im, config, layout_cache=None,
+                 fit_cache=None, validate_bounds=False):
         """Initialize with the template IM object and the file-like resource
-        with the layout config.
+        with the layout config (or a `PlaceholderTable` that was already
+        loaded). If a `LayoutCache` is given, a previously validated copy of
+        the same config is used rather than validating again. If a `FitCache`
+        is given, components that have to be resized for their placeholder
+        are looked-up there first. If `validate_bounds` is True, placeholders
+        that extend beyond the template raise `PlaceholderOutOfBoundsError`
+        rather than being clipped.
         """
 
-        placeholder_configs = self._parse_and_validate(config)
+        # A table was already loaded and validated (see
+        # `templatelayer.layout_loader`).
+        if isinstance(config, PlaceholderTable):
+            placeholder_configs = config
+        else:
+            placeholder_configs = None
+            if layout_cache is not None:
+                placeholder_configs = layout_cache.get(config)
+
+            if placeholder_configs is None:
+                placeholder_configs = self._parse_and_validate(config)
+
+                if layout_cache is not None:
+                    layout_cache.set(config, placeholder_configs)
+
+        self._initialize(
+            template_im,
+            placeholder_configs,
+            fit_cache=fit_cache)
+
+        if validate_bounds is True:
+            with templatelayer.instrumentation.measure(
+                    templatelayer.instrumentation.STAGE_BOUNDS_VALIDATION):
+                self._placeholder_configs.assert_in_bounds(*template_im.size)
+
+    @classmethod
+    def from_placeholder_configs(cls, template_im, placeholder_configs,
+                                 masks=None, fit_cache=None):
+        """Initialize with placeholder-configs that were already parsed and
+        validated by another instance. This skips parsing and validation.
+        `masks` may be a dictionary of already-loaded mask images to share.
+        """
+
+        tl = cls.__new__(cls)
+
+        tl._initialize(
+            template_im,
+            placeholder_configs,
+            masks=masks,
+            fit_cache=fit_cache)
+
+        return tl
+
+    def _initialize(self, template_im, placeholder_configs, masks=None,
+                    fit_cache=None):
+        if isinstance(placeholder_configs, PlaceholderTable) is False:
+            placeholder_configs = \
+                PlaceholderTable.from_placeholders(
+                    placeholder_configs.values())
+
         self._placeholder_configs = placeholder_configs
 
-        self._applied_placeholders_s = set()
+        # One bit per placeholder, by position, along with a count of the set
+        # bits.
+        self._applied = bytearray((len(placeholder_configs) + 7) // 8)
+        self._applied_count = 0
 
         self._base_im = template_im
 
+        # Placeholder name -> mask image (mode "L")
+        if masks is None:
+            masks = {}
+
+        self._masks = masks
+        self._fit_cache = fit_cache
+
     def _parse_and_validate(self, layout):
         """Process the whole config."""
 
@@ -57,19 +716,20 @@ class SimpleTemplateLayout(object):
             placeholders, \
             "At least one placeholder must be configured."
 
-        placeholder_configs = {}
-        for name, parameters in placeholders.items():
-            ph = self._parse_and_validate_placeholder(
-                    name,
-                    parameters,
-                    placeholder_configs)
+        with templatelayer.instrumentation.measure(
+                templatelayer.instrumentation.STAGE_CONFIG_PARSE):
+            placeholder_configs = {}
+            for name, parameters in placeholders.items():
+                ph = self._parse_and_validate_placeholder(name, parameters)
+                placeholder_configs[name] = ph
 
-            placeholder_configs[name] = ph
+        with templatelayer.instrumentation.measure(
+                templatelayer.instrumentation.STAGE_OVERLAP_VALIDATION):
+            self._assert_no_overlaps(list(placeholder_configs.values()))
 
-        return placeholder_configs
+        return PlaceholderTable.from_placeholders(placeholder_configs.values())
 
-    def _parse_and_validate_placeholder(
-            self, name, parameters, placeholder_configs):
+    def _parse_and_validate_placeholder(self, name, parameters):
         """Validates and loads a single placeholder definition from the config.
         """
 
@@ -80,53 +740,57 @@ class SimpleTemplateLayout(object):
                     top=parameters['top'],
                     left=parameters['left'],
                     height=parameters['height'],
-                    width=parameters['width'])
+                    width=parameters['width'],
+                    mask=parameters.get('mask'),
+                    fit=parameters.get('fit'))
         except KeyError:
             _LOGGER.exception("One or more placeholder parameters are missing "
                               "for [{}].".format(name))
 
             raise
 
-        # Check for overlaps.
+        assert \
+            ph.mask is None or issubclass(ph.mask.__class__, str) is True, \
+            "Placeholder [{}] mask must be [{}] or a file-path.".format(
+            name, MASK_ALPHA)
 
-        for other_ph in placeholder_configs.values():
-            self._assert_no_overlap(ph, other_ph)
+        assert \
+            ph.fit is None or ph.fit in templatelayer.fit.FIT_MODES, \
+            "Placeholder [{}] fit must be one of: {}".format(
+            name, ', '.join(templatelayer.fit.FIT_MODES))
 
         return ph
 
-    def _assert_no_overlap(self, ph, other_ph):
-        """Make sure the given placeholder-config doesn't overlap with any
-        previous placeholder-configurations.
+    @staticmethod
+    def _assert_no_overlaps(placeholders):
+        """Make sure that none of the given placeholder-configs overlap (see
+        `_assert_no_overlaps_in_columns()`).
         """
 
-        # Check horizontal position.
-
-        is_in_left_right_boundaries = False
-
-        other_right = other_ph.left + other_ph.width
-
-        left_is_in_range = ph.left >= other_ph.left and ph.left < other_right
-        if left_is_in_range is True:
-            is_in_left_right_boundaries = True
-
-        right = ph.left + ph.width
-        right_is_in_range = right > other_ph.left and right < other_right
-        if right_is_in_range is True:
-            is_in_left_right_boundaries = True
-
-        # Check vertical_position.
-
-        is_in_top_bottom_boundaries = False
+        _assert_no_overlaps_in_columns(
+            [ph.name for ph in placeholders],
+            [ph.left for ph in placeholders],
+            [ph.top for ph in placeholders],
+            [ph.width for ph in placeholders],
+            [ph.height for ph in placeholders])
+
+    @staticmethod
+    def _assert_no_overlap(ph, other_ph):
+        """Make sure the given placeholder-config doesn't overlap with another
+        placeholder-configuration. Right and bottom edges are exclusive.
+        """
 
-        other_bottom = other_ph.top + other_ph.height
+        if ph.width <= 0 or ph.height <= 0 or \
+           other_ph.width <= 0 or other_ph.height <= 0:
+            return
 
-        top_is_in_range = ph.top >= other_ph.top and ph.top < other_bottom
-        if top_is_in_range is True:
-            is_in_top_bottom_boundaries = True
+        is_in_left_right_boundaries = \
+            ph.left < other_ph.left + other_ph.width and \
+            other_ph.left < ph.left + ph.width
 
-        bottom = ph.top + ph.height
-        if bottom > other_ph.top and bottom < other_bottom:
-            is_in_top_bottom_boundaries = True
+        is_in_top_bottom_boundaries = \
+            ph.top < other_ph.top + other_ph.height and \
+            other_ph.top < ph.top + ph.height
 
         if is_in_left_right_boundaries is True and \
            is_in_top_bottom_boundaries is True:
@@ -146,36 +810,136 @@ class SimpleTemplateLayout(object):
 
     def validate_image_for_placeholder(self, name, im):
         """Check whether the given image is compatible with the given
-        placeholder.
+        placeholder. Images of any size are compatible with placeholders that
+        have a fit mode other than "exact".
         """
 
         config = self.get_placeholder_config(name)
 
+        if config.fit is not None and config.fit != templatelayer.fit.FIT_EXACT:
+            return config
+
         if config.width != im.width or config.height != im.height:
             raise PlaceholderNotCompatibleException(
                 "Image with size ({}, {}) not compatible with placeholder "
                 "[{}] size ({}, {}).".format(
-                im.width, im.height, config.width, config.height))
+                im.width, im.height, name, config.width, config.height))
 
         return config
 
+    def get_mask(self, name):
+        """Return the mask image (mode "L") configured for the given
+        placeholder, or None if the placeholder has no mask image. The mask
+        is loaded once and then reused.
+        """
+
+        config = self.get_placeholder_config(name)
+
+        if config.mask is None or config.mask == MASK_ALPHA:
+            return None
+
+        try:
+            return self._masks[name]
+        except KeyError:
+            pass
+
+        mask_im = load_mask(config)
+        self._masks[name] = mask_im
+
+        return mask_im
+
+    def fit_component(self, name, overlay_im):
+        """Fit the given image to the placeholder and return a 2-tuple of the
+        fitted image and its offset within the placeholder.
+        """
+
+        config = self.validate_image_for_placeholder(name, overlay_im)
+
+        if self._fit_cache is not None:
+            fit_image = self._fit_cache.fit_image
+        else:
+            fit_image = templatelayer.fit.fit_image
+
+        return fit_image(overlay_im, config.width, config.height, config.fit)
+
     def apply_component(self, name, overlay_im):
         """Overlay the given image to the specific configured area of the
-        placeholder.
+        placeholder. If the placeholder has a fit mode, the image is resized
+        first. If the placeholder has a mask, only the masked part of the
+        image is blended into the template.
         """
 
-# TODO(dustin): Add support for masking (for irregular shapes) later, if/when it comes up.
+        i = self._placeholder_configs.get_index(name)
 
         assert \
-            name not in self._applied_placeholders_s, \
+            i is None or self._is_applied(i) is False, \
             "Placeholder name not unique: [{}]".format(name)
 
         config = self.validate_image_for_placeholder(name, overlay_im)
 
-        offset = (config.left, config.top)
-        self._base_im.paste(overlay_im, offset)
+        with templatelayer.instrumentation.measure(
+                templatelayer.instrumentation.STAGE_PASTE,
+                name) as measurement:
+            x, y = 0, 0
+            if config.fit is not None:
+                overlay_im, (x, y) = self.fit_component(name, overlay_im)
+
+            self._paste(config, overlay_im, x, y)
+
+            measurement.pixels = overlay_im.width * overlay_im.height
+
+        self._applied[i >> 3] |= 1 << (i & 7)
+        self._applied_count += 1
+
+    def apply_fitted_component(self, name, fitted_im, offset):
+        """Like `apply_component()` but for an image that was already fit to
+        the placeholder (see `fit_component()`), at the given offset within
+        the placeholder. This allows one fitted image to be applied to many
+        layouts.
+        """
+
+        i = self._placeholder_configs.get_index(name)
+
+        assert \
+            i is None or self._is_applied(i) is False, \
+            "Placeholder name not unique: [{}]".format(name)
+
+        config = self.get_placeholder_config(name)
+        x, y = offset
+
+        with templatelayer.instrumentation.measure(
+                templatelayer.instrumentation.STAGE_PASTE,
+                name) as measurement:
+            self._paste(config, fitted_im, x, y)
+
+            measurement.pixels = fitted_im.width * fitted_im.height
+
+        self._applied[i >> 3] |= 1 << (i & 7)
+        self._applied_count += 1
+
+    def _paste(self, config, overlay_im, x, y):
+        """Paste the (fitted) image at the given offset within the
+        placeholder, through the mask of the placeholder if it has one.
+        """
+
+        offset = (config.left + x, config.top + y)
 
-        self._applied_placeholders_s.add(name)
+        if config.mask is None:
+            self._base_im.paste(overlay_im, offset)
+            return
+
+        mask_im = self.get_mask(config.name)
+
+        # A contained component may not fill the placeholder.
+        if mask_im is not None and mask_im.size != overlay_im.size:
+            mask_im = \
+                mask_im.crop((
+                    x,
+                    y,
+                    x + overlay_im.width,
+                    y + overlay_im.height))
+
+        paste_masked(self._base_im, overlay_im, offset, mask_im)
 
     def apply_components(self, im_mapping):
         """Apply multiple overlays."""
@@ -183,11 +947,50 @@ class SimpleTemplateLayout(object):
         for name, overlay_im in im_mapping.items():
             self.apply_component(name, overlay_im)
 
+    def _is_applied(self, i):
+        return self._applied[i >> 3] & (1 << (i & 7)) != 0
+
+    def _get_names_by_applied(self, is_applied):
+        """Return the names of the placeholders that have (or haven't) been
+        applied, in position order. Bytes whose bits are all the same are
+        skipped as a whole.
+        """
+
+        names = self._placeholder_configs.names
+        count = len(names)
+
+        skipped_byte = 0x00 if is_applied is True else 0xff
+
+        found = []
+        for j, byte in enumerate(self._applied):
+            if byte == skipped_byte:
+                continue
+
+            for i in range(j * 8, min(j * 8 + 8, count)):
+                if (byte & (1 << (i & 7)) != 0) is is_applied:
+                    found.append(names[i])
+
+        return found
+
+    def placeholder_at(self, x, y):
+        """Return the placeholder-config that contains the given template
+        pixel, or None if the pixel isn't in a placeholder.
+        """
+
+        return self._placeholder_configs.get_placeholder_at(x, y)
+
+    def placeholders_in(self, rect):
+        """Return the placeholder-configs that intersect the given rectangle
+        (a `_REGION` or a (top, left, height, width) tuple), in config order.
+        """
+
+        return self._placeholder_configs.get_placeholders_in(rect)
+
     @property
     def supported_placeholder_names(self):
         """Return the names of all config-supported placeholder."""
 
-        return list(self._placeholder_configs.keys())
+        return list(self._placeholder_configs.names)
 
     @property
     def applied_placeholder_names(self):
@@ -195,7 +998,10 @@ class SimpleTemplateLayout(object):
         them.
         """
 
-        return list(self._applied_placeholders_s)
+        if self._applied_count == 0:
+            return []
+
+        return self._get_names_by_applied(True)
 
     @property
     def unapplied_placeholder_names(self):
@@ -203,44 +1009,59 @@ class SimpleTemplateLayout(object):
         applied to them.
         """
 
-        all_placeholders_s = set(self._placeholder_configs.keys())
-        return list(all_placeholders_s - self._applied_placeholders_s)
+        if self._applied_count == 0:
+            return self.supported_placeholder_names
+
+        return self._get_names_by_applied(False)
 
     @property
     def is_completely_applied(self):
         """Returns whether all placeholders have been overlayed."""
 
-        has_unapplied_placeholders = bool(self.unapplied_placeholder_names)
-        return has_unapplied_placeholders is False
+        return self._applied_count == len(self._placeholder_configs)
 
     @property
     def resource(self):
         return self._base_im
 
+    @property
+    def placeholder_configs(self):
+        """Return the parsed placeholder-configs. These may be shared with
+        other instances via `from_placeholder_configs()` and must not be
+        modified.
+        """
+
+        return self._placeholder_configs
+
     @property
     def placeholder_total_coverage(self):
         """Returns a 2-tuple describing a rational of how much of the template
-        image is covered by placeholders (in terms of box overlays).
+        image is covered by placeholders (in terms of exact pixel area).
         """
 
-        configs = self._placeholder_configs.copy()
-        _, first_ph = configs.popitem()
-
-        left = first_ph.left
-        right = first_ph.left + first_ph.width
-        top = first_ph.top
-        bottom = first_ph.top + first_ph.height
-        for ph in configs.values():
-            left = min(left, ph.left)
-            right = max(right, ph.left + ph.width)
-            top = min(top, ph.top)
-            bottom = max(bottom, ph.top + ph.height)
+        placeholder_size = \
+            self._placeholder_configs.get_covered_area(
+                self._base_im.width,
+                self._base_im.height)
 
-        placeholder_size = (right - left) * (bottom - top)
         template_size = self._base_im.width * self._base_im.height
 
         return (placeholder_size, template_size)
 
+    @property
+    def uncovered_regions(self):
+        """Returns a list of `_REGION` rectangles that together cover every
+        pixel of the template that isn't covered by a placeholder.
+        """
+
+        regions = \
+            get_uncovered_regions(
+                self._placeholder_configs.values(),
+                self._base_im.width,
+                self._base_im.height)
+
+        return regions
+
     @property
     def is_covered(self):
         """Returns whether every pixel of the template is covered by
@@ -249,3 +1070,148 @@ class SimpleTemplateLayout(object):
 
         placeholder_coverage, template_size = self.placeholder_total_coverage
         return placeholder_coverage == template_size
+
+
+class CompiledTemplate(object):
+    """Holds a parsed and validated layout along with the decoded template
+    pixels. Neither is modified after construction. Every render gets its own
+    copy of the template and its own applied-state, so one instance can
+    produce any number of outputs. Animated templates are rejected with
+    `AnimatedTemplateError` (see `templatelayer.animation`).
+    """
+
+    def __init__(self, template_im, config, layout_cache=None,
+                 canvas_mode=None, fit_cache=None, validate_bounds=False):
+        """`canvas_mode` is the mode of the images handed out for rendering and
+        defaults to the mode of the template. `fit_cache` is an optional
+        `FitCache` that is shared by every layout. If `validate_bounds` is
+        True, the placeholders are checked against the template here, once,
+        rather than for every render.
+        """
+
+        # Only the current frame would ever be rendered.
+        frame_count = getattr(template_im, 'n_frames', 1)
+        if frame_count > 1:
+            raise AnimatedTemplateError(
+                "Template has ({}) frames. Animated templates must be "
+                "rendered with templatelayer.animation.AnimatedRenderer.".format(
+                frame_count))
+
+        tl = SimpleTemplateLayout(
+                template_im,
+                config,
+                layout_cache=layout_cache,
+                validate_bounds=validate_bounds)
+
+        self._placeholder_configs = tl.placeholder_configs
+
+        # Keep a private, decoded copy so that later changes to the image that
+        # we were given can't leak into renders. Read-only images (like
+        # memory-mapped raw templates) can't change, so they're shared.
+
+        if template_im.readonly:
+            self._template_im = template_im
+        else:
+            self._template_im = template_im.copy()
+
+        if canvas_mode is None:
+            canvas_mode = template_im.mode
+
+        self._canvas_mode = canvas_mode
+        self._fit_cache = fit_cache
+
+        # Load every mask image once, up front, so that renders never have to.
+
+        self._masks = {}
+        for name, ph in self._placeholder_configs.items():
+            if ph.mask is not None and ph.mask != MASK_ALPHA:
+                self._masks[name] = load_mask(ph)
+
+    def _new_canvas(self):
+        if self._template_im.mode == self._canvas_mode:
+            return self._template_im.copy()
+
+        return self._template_im.convert(self._canvas_mode)
+
+    def new_layout(self, canvas_im=None):
+        """Return a new layout over a fresh copy of the template or, if
+        given, over `canvas_im` (e.g. a previous render that is being
+        updated).
+        """
+
+        if canvas_im is None:
+            canvas_im = self._new_canvas()
+
+        tl = \
+            SimpleTemplateLayout.from_placeholder_configs(
+                canvas_im,
+                self._placeholder_configs,
+                masks=self._masks,
+                fit_cache=self._fit_cache)
+
+        return tl
+
+    def restore_placeholder(self, canvas_im, name):
+        """Copy the template pixels under the given placeholder back into the
+        canvas, undoing whatever was applied there.
+        """
+
+        ph = self._placeholder_configs[name]
+        box = (ph.left, ph.top, ph.left + ph.width, ph.top + ph.height)
+
+        region_im = self._template_im.crop(box)
+        if region_im.mode != canvas_im.mode:
+            region_im = region_im.convert(canvas_im.mode)
+
+        canvas_im.paste(region_im, (ph.left, ph.top))
+
+    def render(self, im_mapping):
+        """Apply the given overlays to a fresh copy of the template and
+        return the image.
+        """
+
+        tl = self.new_layout()
+        tl.apply_components(im_mapping)
+
+        return tl.resource
+
+    def placeholder_at(self, x, y):
+        """See `SimpleTemplateLayout.placeholder_at()`."""
+
+        return self._placeholder_configs.get_placeholder_at(x, y)
+
+    def placeholders_in(self, rect):
+        """See `SimpleTemplateLayout.placeholders_in()`."""
+
+        return self._placeholder_configs.get_placeholders_in(rect)
+
+    @property
+    def placeholder_configs(self):
+        return self._placeholder_configs
+
+    @property
+    def size(self):
+        return self._template_im.size
+
+    @property
+    def mode(self):
+        return self._canvas_mode
+
+    @property
+    def masks(self):
+        """The loaded mask images, keyed by placeholder name. These must not
+        be modified.
+        """
+
+        return self._masks
+
+    @property
+    def image_bytes(self):
+        """The number of bytes held by the decoded template and masks."""
+
+        image_bytes = templatelayer.template_cache.get_image_bytes(self._template_im)
+
+        for mask_im in self._masks.values():
+            image_bytes += templatelayer.template_cache.get_image_bytes(mask_im)
+
+        return image_bytes
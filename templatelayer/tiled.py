@@ -0,0 +1,250 @@
+import logging
+import struct
+import zlib
+
+import templatelayer.template_layout
+import templatelayer.component_loader
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_STRIP_HEIGHT = 256
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Mode -> PNG color-type. Only 8-bit channels are written.
+_PNG_COLOR_TYPES = {
+    'L': 0,
+    'RGB': 2,
+    'LA': 4,
+    'RGBA': 6,
+}
+
+# Compressed data is written in IDAT chunks of at least this size.
+_IDAT_CHUNK_SIZE = 256 * 1024
+
+
+class TiledRenderException(templatelayer.template_layout.TemplateLayoutException):
+    pass
+
+
+class _PngStreamWriter(object):
+    """Writes a PNG one group of rows at a time. Rows are not filtered, so
+    nothing has to be kept from one group to the next.
+    """
+
+    def __init__(self, f, width, height, mode, compress_level=6):
+        try:
+            color_type = _PNG_COLOR_TYPES[mode]
+        except KeyError:
+            raise TiledRenderException(
+                "Mode can not be streamed as PNG: [{}]".format(mode))
+
+        self._f = f
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_size = 0
+
+        self._f.write(_PNG_SIGNATURE)
+
+        ihdr = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+        self._write_chunk(b'IHDR', ihdr)
+
+    def _write_chunk(self, chunk_type, data):
+        self._f.write(struct.pack('>I', len(data)))
+        self._f.write(chunk_type)
+        self._f.write(data)
+
+        crc = zlib.crc32(chunk_type)
+        crc = zlib.crc32(data, crc) & 0xffffffff
+        self._f.write(struct.pack('>I', crc))
+
+    def _flush_pending(self):
+        if self._pending_size == 0:
+            return
+
+        self._write_chunk(b'IDAT', b''.join(self._pending))
+
+        self._pending = []
+        self._pending_size = 0
+
+    def _add_compressed(self, data):
+        if not data:
+            return
+
+        self._pending.append(data)
+        self._pending_size += len(data)
+
+        if self._pending_size >= _IDAT_CHUNK_SIZE:
+            self._flush_pending()
+
+    def write_image(self, im):
+        """Write every row of the given image."""
+
+        data = im.tobytes()
+        row_size = len(data) // im.height
+
+        # Every row starts with the filter-type (0 is "None").
+
+        rows = []
+        for i in range(im.height):
+            rows.append(b'\0')
+            rows.append(data[i * row_size:(i + 1) * row_size])
+
+        self._add_compressed(self._compressor.compress(b''.join(rows)))
+
+    def close(self):
+        self._add_compressed(self._compressor.flush())
+        self._flush_pending()
+
+        self._write_chunk(b'IEND', b'')
+
+
+class TiledRenderer(object):
+    """Renders the output in horizontal strips and streams each strip to a PNG
+    encoder as soon as it's complete.
+
+    Only the placeholders that intersect the current strip have their
+    components loaded, and each component is released once the strip has
+    moved past its placeholder. Peak memory is therefore bounded by the strip
+    and the components crossing it rather than the whole output. Pair this
+    with a raw template (see `templatelayer.raw_template`) so that cropping a
+    strip out of the template only touches the rows that are needed.
+    """
+
+    def __init__(self, template_im, placeholder_configs, canvas_mode=None,
+                 strip_height=DEFAULT_STRIP_HEIGHT, masks=None):
+        if canvas_mode is None:
+            canvas_mode = template_im.mode
+
+        if masks is None:
+            masks = {}
+
+        self._template_im = template_im
+        self._placeholder_configs = placeholder_configs
+        self._masks = masks
+        self._canvas_mode = canvas_mode
+        self._strip_height = strip_height
+
+    def _open_component(self, loader, tl, name, filepath):
+        """Open and fit the component. Return a 2-tuple of the image and
+        its offset within the placeholder.
+        """
+
+        im = loader.load(name, filepath)
+
+        try:
+            fitted_im, offset = tl.fit_component(name, im)
+        except Exception:
+            im.close()
+            raise
+
+        if fitted_im is not im:
+            im.close()
+
+        return fitted_im, offset
+
+    def render(self, components, f, compress_level=6):
+        """Render the given components (a mapping of placeholder names to
+        file-paths) and write the output to the file-like resource as PNG.
+        """
+
+        # The layout is only used to check components. Nothing is pasted into
+        # the template.
+
+        tl = \
+            templatelayer.template_layout.SimpleTemplateLayout.from_placeholder_configs(
+                self._template_im,
+                self._placeholder_configs,
+                masks=self._masks)
+
+        loader = templatelayer.component_loader.ComponentLoader(tl)
+
+        pending = []
+        for name, filepath in components.items():
+            ph = tl.get_placeholder_config(name)
+            pending.append((ph.top, name, filepath))
+
+        pending.sort(reverse=True)
+
+        width, height = self._template_im.size
+
+        writer = \
+            _PngStreamWriter(
+                f,
+                width,
+                height,
+                self._canvas_mode,
+                compress_level=compress_level)
+
+        # name -> (open component image, offset within the placeholder)
+        active = {}
+
+        try:
+            for strip_top in range(0, height, self._strip_height):
+                strip_bottom = min(strip_top + self._strip_height, height)
+
+                # Load the components that start in this strip.
+
+                while pending and pending[-1][0] < strip_bottom:
+                    _, name, filepath = pending.pop()
+                    active[name] = \
+                        self._open_component(loader, tl, name, filepath)
+
+                strip_im = \
+                    self._template_im.crop(
+                        (0, strip_top, width, strip_bottom))
+
+                if strip_im.mode != self._canvas_mode:
+                    strip_im = strip_im.convert(self._canvas_mode)
+
+                for name, (component_im, (x, y)) in list(active.items()):
+                    ph = tl.get_placeholder_config(name)
+
+                    component_left = ph.left + x
+                    component_top = ph.top + y
+
+                    top = max(component_top, strip_top)
+                    bottom = \
+                        min(
+                            component_top + component_im.height,
+                            strip_bottom)
+
+                    if top < bottom:
+                        region_box = (
+                            0,
+                            top - component_top,
+                            component_im.width,
+                            bottom - component_top,
+                        )
+
+                        region_im = component_im.crop(region_box)
+                        offset = (component_left, top - strip_top)
+
+                        if ph.mask is None:
+                            strip_im.paste(region_im, offset)
+                        else:
+                            mask_im = tl.get_mask(name)
+                            if mask_im is not None:
+                                mask_im = \
+                                    mask_im.crop((
+                                        x,
+                                        y + region_box[1],
+                                        x + region_box[2],
+                                        y + region_box[3]))
+
+                            templatelayer.template_layout.paste_masked(
+                                strip_im,
+                                region_im,
+                                offset,
+                                mask_im)
+
+                    if ph.top + ph.height <= strip_bottom:
+                        component_im.close()
+                        del active[name]
+
+                writer.write_image(strip_im)
+        finally:
+            for component_im, _ in active.values():
+                component_im.close()
+
+        writer.close()
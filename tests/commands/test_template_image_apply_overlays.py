@@ -6,8 +6,10 @@ import shutil
 import contextlib
 import json
 import subprocess
+import signal
+import time
 
-import PIL
+import PIL.Image
 
 import templatelayer.testing_common
 
@@ -19,6 +21,26 @@ sys.path.insert(0, _APP_PATH)
 
 
 class TestCommand(unittest.TestCase):
+    def setUp(self):
+        # The tool caches validated layouts; keep them out of the home
+        # directory. Every invocation inherits the environment.
+
+        self._layout_cache_path = tempfile.mkdtemp()
+
+        self._original_layout_cache_path = \
+            os.environ.get('TEMPLATELAYER_LAYOUT_CACHE_PATH')
+
+        os.environ['TEMPLATELAYER_LAYOUT_CACHE_PATH'] = self._layout_cache_path
+
+    def tearDown(self):
+        if self._original_layout_cache_path is None:
+            del os.environ['TEMPLATELAYER_LAYOUT_CACHE_PATH']
+        else:
+            os.environ['TEMPLATELAYER_LAYOUT_CACHE_PATH'] = \
+                self._original_layout_cache_path
+
+        shutil.rmtree(self._layout_cache_path, ignore_errors=True)
+
     def test_run(self):
         small_config = {
             "placeholders": {
@@ -132,3 +154,365 @@ Writing.
 """
 
             self.assertEquals(actual, expected)
+
+    def test_run__manifest(self):
+        small_config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                },
+                "right": {
+                    "left": 2,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path() as temp_path:
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2,
+                    color='blue')
+
+            template_im.save('template.png')
+
+            component_green_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color='green')
+
+            component_green_im.save('green.png')
+
+            component_red_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color='red')
+
+            component_red_im.save('red.png')
+
+            with open('config.json', 'w') as f:
+                json.dump(small_config, f)
+
+            with open('manifest.csv', 'w') as f:
+                f.write("output,left,right\n")
+                f.write("output1.png,green.png,red.png\n")
+                f.write("output2.png,red.png,\n")
+
+            cmd = [
+                _TOOL_FILEPATH,
+                'config.json',
+                '--template-filepath', 'template.png',
+                '--manifest', 'manifest.csv',
+            ]
+
+            try:
+                actual = \
+                    subprocess.check_output(
+                        cmd,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True)
+            except subprocess.CalledProcessError as cpe:
+                print(cpe.output)
+                raise
+
+            expected = """Rendered: [output1.png]
+Rendered: [output2.png]
+Rendered (2) images.
+"""
+
+            self.assertEquals(actual, expected)
+
+            output_im = PIL.Image.open('output1.png')
+            self.assertEquals(output_im.getpixel((0, 0)), (0, 128, 0))
+            self.assertEquals(output_im.getpixel((3, 0)), (255, 0, 0))
+
+            output_im = PIL.Image.open('output2.png')
+            self.assertEquals(output_im.getpixel((0, 0)), (255, 0, 0))
+            self.assertEquals(output_im.getpixel((3, 0)), (0, 0, 255))
+
+    def test_run__manifest__incremental(self):
+        small_config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path() as temp_path:
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color='blue').save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color='red').save('red.png')
+
+            with open('config.json', 'w') as f:
+                json.dump(small_config, f)
+
+            with open('manifest.csv', 'w') as f:
+                f.write("output,left\n")
+                f.write("output1.png,red.png\n")
+
+            cmd = [
+                _TOOL_FILEPATH,
+                'config.json',
+                '--template-filepath', 'template.png',
+                '--manifest', 'manifest.csv',
+                '--incremental',
+            ]
+
+            outputs = []
+            for _ in range(2):
+                try:
+                    actual = \
+                        subprocess.check_output(
+                            cmd,
+                            stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+                except subprocess.CalledProcessError as cpe:
+                    print(cpe.output)
+                    raise
+
+                outputs.append(actual)
+
+            expected = [
+                """Rendered: [output1.png]
+Rendered (1) images.
+Updated (0) images.
+Skipped (0) images.
+""",
+                """Skipped: [output1.png]
+Rendered (0) images.
+Updated (0) images.
+Skipped (1) images.
+""",
+            ]
+
+            self.assertEquals(outputs, expected)
+
+    def test_run__manifest__output_cache(self):
+        small_config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path() as temp_path:
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color='blue').save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color='red').save('red.png')
+
+            with open('config.json', 'w') as f:
+                json.dump(small_config, f)
+
+            with open('manifest.csv', 'w') as f:
+                f.write("output,left\n")
+                f.write("output1.png,red.png\n")
+                f.write("output2.png,red.png\n")
+
+            cmd = [
+                _TOOL_FILEPATH,
+                'config.json',
+                '--template-filepath', 'template.png',
+                '--manifest', 'manifest.csv',
+                '--output-cache-path', 'cache',
+            ]
+
+            try:
+                actual = \
+                    subprocess.check_output(
+                        cmd,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True)
+            except subprocess.CalledProcessError as cpe:
+                print(cpe.output)
+                raise
+
+            expected = """Rendered: [output1.png]
+Cached: [output2.png]
+Rendered (1) images.
+Cached (1) images.
+Output cache: (1) hits, (1) misses, 50.0% hit-rate.
+"""
+
+            self.assertEquals(actual, expected)
+
+    def test_run__raw_template(self):
+        small_config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                }
+            }
+        }
+
+        convert_tool_filepath = \
+            os.path.join(_SCRIPT_PATH, 'template_image_convert_raw')
+
+        with templatelayer.testing_common.temp_path() as temp_path:
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color='blue').save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color='red').save('red.png')
+
+            with open('config.json', 'w') as f:
+                json.dump(small_config, f)
+
+            with open('manifest.jsonl', 'w') as f:
+                for i in range(2):
+                    job = {
+                        'output': 'output{}.png'.format(i),
+                        'components': { 'left': 'red.png' },
+                    }
+
+                    f.write(json.dumps(job) + '\n')
+
+            cmd = [
+                convert_tool_filepath,
+                'template.png',
+                'template.raw',
+            ]
+
+            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+
+            cmd = [
+                _TOOL_FILEPATH,
+                'config.json',
+                '--template-filepath', 'template.raw',
+                '--manifest', 'manifest.jsonl',
+                '--workers', '2',
+            ]
+
+            try:
+                subprocess.check_output(
+                    cmd,
+                    stderr=subprocess.STDOUT,
+                    universal_newlines=True)
+            except subprocess.CalledProcessError as cpe:
+                print(cpe.output)
+                raise
+
+            for i in range(2):
+                output_im = PIL.Image.open('output{}.png'.format(i))
+                self.assertEquals(output_im.mode, 'RGB')
+                self.assertEquals(output_im.getpixel((0, 0)), (255, 0, 0))
+                self.assertEquals(output_im.getpixel((3, 0)), (0, 0, 255))
+
+    def test_run__serve(self):
+        small_config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2
+                }
+            }
+        }
+
+        client_tool_filepath = \
+            os.path.join(_SCRIPT_PATH, 'template_image_render_client')
+
+        with templatelayer.testing_common.temp_path() as temp_path:
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color='blue').save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color='red').save('red.png')
+
+            with open('config.json', 'w') as f:
+                json.dump(small_config, f)
+
+            socket_path = os.path.join(temp_path, 'server.sock')
+
+            cmd = [
+                _TOOL_FILEPATH,
+                '--serve', socket_path,
+                '--no-layout-cache',
+            ]
+
+            p = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    universal_newlines=True)
+
+            try:
+                line = p.stdout.readline()
+                self.assertEquals(line, "Serving: [{}]\n".format(socket_path))
+
+                deadline = time.time() + 10
+
+                while os.path.exists(socket_path) is False:
+                    if p.poll() is not None:
+                        raise Exception("Server stopped before listening.")
+
+                    if time.time() > deadline:
+                        raise Exception("Server did not start listening.")
+
+                    time.sleep(0.01)
+
+                cmd = [
+                    client_tool_filepath,
+                    'config.json',
+                    '--socket', socket_path,
+                    '--template-filepath', 'template.png',
+                    '--component-filepath', 'left', 'red.png',
+                    '--output-filepath', 'output.png',
+                ]
+
+                try:
+                    subprocess.check_output(
+                        cmd,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True)
+                except subprocess.CalledProcessError as cpe:
+                    print(cpe.output)
+                    raise
+            finally:
+                p.send_signal(signal.SIGINT)
+                p.communicate()
+
+            output_im = PIL.Image.open('output.png')
+            self.assertEquals(output_im.getpixel((0, 0)), (255, 0, 0))
+            self.assertEquals(output_im.getpixel((3, 0)), (0, 0, 255))
+
+            self.assertFalse(os.path.exists(socket_path))
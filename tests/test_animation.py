@@ -0,0 +1,235 @@
+import unittest
+import io
+import os
+import stat
+import json
+
+import PIL.Image
+
+import templatelayer.animation
+import templatelayer.encoding
+import templatelayer.batch
+import templatelayer.render_server
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "static": {
+            "left": 0,
+            "top": 0,
+            "width": 10,
+            "height": 10
+        },
+        "animated": {
+            "left": 10,
+            "top": 0,
+            "width": 10,
+            "height": 10
+        }
+    }
+}
+
+_TEMPLATE_COLORS = [(255, 0, 0), (0, 0, 255), (255, 255, 0)]
+_COMPONENT_COLORS = [(255, 255, 255), (0, 0, 0), (0, 255, 255)]
+_DURATIONS = [100, 200, 300]
+
+
+def _save_animation(filepath, width, height, colors, format_='GIF'):
+    frames = [
+        templatelayer.testing_common.get_new_image(width, height, color=color)
+        for color
+        in colors
+    ]
+
+    frames[0].save(
+        filepath,
+        format_,
+        save_all=True,
+        append_images=frames[1:],
+        duration=_DURATIONS[:len(frames)],
+        loop=0)
+
+
+class TestAnimatedRenderer(unittest.TestCase):
+    def _get_frames(self, data):
+        """Return (pixels, duration) for every frame, where pixels are those
+        of the two placeholders and of the uncovered part of the template.
+        """
+
+        im = PIL.Image.open(io.BytesIO(data))
+
+        frames = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            frame_im = im.convert('RGB')
+
+            pixels = (
+                frame_im.getpixel((0, 0)),
+                frame_im.getpixel((10, 0)),
+                frame_im.getpixel((0, 15)),
+            )
+
+            frames.append((pixels, int(im.info['duration'])))
+
+        return frames
+
+    def _render(self, template_filepath, workers=1, format_=None):
+        template_im = PIL.Image.open(template_filepath)
+
+        ar = \
+            templatelayer.animation.AnimatedRenderer(
+                template_im,
+                _TEST_LAYOUT_CONFIG,
+                workers=workers)
+
+        self.assertEquals(ar.frame_count, 3)
+
+        components = {
+            'static': 'static.png',
+            'animated': 'animated.gif',
+        }
+
+        f = io.BytesIO()
+        ar.render(components, f, format_=format_)
+
+        return f.getvalue()
+
+    def test_render(self):
+        with templatelayer.testing_common.temp_path():
+            _save_animation('template.gif', 20, 20, _TEMPLATE_COLORS)
+            _save_animation('template.png', 20, 20, _TEMPLATE_COLORS, format_='PNG')
+            _save_animation('animated.gif', 10, 10, _COMPONENT_COLORS)
+
+            static_im = \
+                templatelayer.testing_common.get_new_image(
+                    10,
+                    10,
+                    color=(0, 255, 0))
+
+            static_im.save('static.png')
+
+            expected = [
+                ((0, 255, 0), component_color, template_color)
+                for template_color, component_color
+                in zip(_TEMPLATE_COLORS, _COMPONENT_COLORS)
+            ]
+
+            expected = list(zip(expected, _DURATIONS))
+
+            # GIF (the template format), APNG, and across several threads.
+
+            self.assertEquals(
+                self._get_frames(self._render('template.gif')),
+                expected)
+
+            self.assertEquals(
+                self._get_frames(self._render('template.png')),
+                expected)
+
+            self.assertEquals(
+                self._get_frames(self._render('template.gif', format_='PNG')),
+                expected)
+
+            self.assertEquals(
+                self._get_frames(self._render('template.gif', workers=3)),
+                expected)
+
+    def test_render__replaces_linked_output(self):
+        with templatelayer.testing_common.temp_path():
+            _save_animation('template.gif', 20, 20, _TEMPLATE_COLORS)
+
+            with open('entry.output', 'wb') as f:
+                f.write(b'cached')
+
+            os.chmod('entry.output', stat.S_IRUSR)
+            os.link('entry.output', 'output.gif')
+
+            ar = \
+                templatelayer.animation.AnimatedRenderer(
+                    PIL.Image.open('template.gif'),
+                    _TEST_LAYOUT_CONFIG)
+
+            ar.render({}, 'output.gif')
+
+            with open('entry.output', 'rb') as f:
+                self.assertEquals(f.read(), b'cached')
+
+            self.assertEquals(PIL.Image.open('output.gif').n_frames, 3)
+
+    def test_render__frame_count_mismatch(self):
+        with templatelayer.testing_common.temp_path():
+            _save_animation('template.gif', 20, 20, _TEMPLATE_COLORS)
+            _save_animation('animated.gif', 10, 10, _COMPONENT_COLORS[:2])
+
+            template_im = PIL.Image.open('template.gif')
+
+            ar = \
+                templatelayer.animation.AnimatedRenderer(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            try:
+                ar.render({'animated': 'animated.gif'}, io.BytesIO())
+            except templatelayer.animation.AnimationRenderException as e:
+                self.assertEquals(
+                    str(e),
+                    "Component [animated] has (2) frames but the template "
+                    "has (3).")
+            else:
+                raise Exception("Expected frame-count error.")
+
+    def test_compiled__animated_template(self):
+        with templatelayer.testing_common.temp_path():
+            _save_animation('template.gif', 20, 20, _TEMPLATE_COLORS)
+
+            with open('template.gif', 'rb') as f:
+                template = f.read()
+
+            with open('layout.json', 'w') as f:
+                json.dump(_TEST_LAYOUT_CONFIG, f)
+
+            # Batches (in this process and in workers) and the render server
+            # compile the template, which must not quietly take the first
+            # frame.
+
+            template_im, _ = templatelayer.batch.open_template(template)
+
+            callbacks = [
+                lambda: templatelayer.batch.BatchRenderer(
+                            template_im,
+                            _TEST_LAYOUT_CONFIG),
+                lambda: templatelayer.batch.ParallelBatchRenderer(
+                            template,
+                            _TEST_LAYOUT_CONFIG,
+                            2),
+                lambda: templatelayer.render_server.RenderServer(
+                            'unused.sock').get_compiled_template(
+                                'template.gif',
+                                'layout.json'),
+            ]
+
+            for callback in callbacks:
+                try:
+                    callback()
+                except templatelayer.template_layout.AnimatedTemplateError as e:
+                    self.assertEquals(
+                        str(e),
+                        "Template has (3) frames. Animated templates must be "
+                        "rendered with "
+                        "templatelayer.animation.AnimatedRenderer.")
+                else:
+                    raise Exception("Expected animated-template error.")
+
+    def test_save_all__not_animated_format(self):
+        frames = [
+            templatelayer.testing_common.get_new_image(1, 1),
+            templatelayer.testing_common.get_new_image(1, 1),
+        ]
+
+        try:
+            templatelayer.encoding.save_all(frames, io.BytesIO(), format_='JPEG')
+        except templatelayer.encoding.EncodingException:
+            pass
+        else:
+            raise Exception("Expected encoding error.")
@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+import io
+
+import PIL.Image
+
+import templatelayer.async_render
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+
+class TestAsyncRenderer(unittest.TestCase):
+    def _get_encoded(self, im):
+        f = io.BytesIO()
+        im.save(f, 'PNG')
+
+        return f.getvalue()
+
+    def test_render(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color=(9, 9, 9)).save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('left.png')
+
+            right_data = \
+                self._get_encoded(
+                    templatelayer.testing_common.get_new_image(
+                        2,
+                        2,
+                        color=(2, 2, 2)))
+
+            async def render_all(ar):
+                ct = await ar.compile('template.png', _TEST_LAYOUT_CONFIG)
+
+                renders = [
+                    ar.render(ct, { 'left': 'left.png', 'right': right_data }),
+                    ar.render(ct, { 'left': 'left.png' }, 'JPEG', quality=90),
+                ]
+
+                return await asyncio.gather(*renders)
+
+            ar = templatelayer.async_render.AsyncRenderer(max_concurrency=1)
+
+            try:
+                png_data, jpeg_data = asyncio.run(render_all(ar))
+            finally:
+                ar.close()
+
+            im = PIL.Image.open(io.BytesIO(png_data))
+            self.assertEquals(im.format, 'PNG')
+
+            self.assertEquals(
+                list(im.getdata()),
+                [(1, 1, 1)] * 2 + [(2, 2, 2)] * 2 +
+                [(1, 1, 1)] * 2 + [(2, 2, 2)] * 2)
+
+            im = PIL.Image.open(io.BytesIO(jpeg_data))
+            self.assertEquals(im.format, 'JPEG')
+
+    def test_render__not_compatible(self):
+        template_data = \
+            self._get_encoded(
+                templatelayer.testing_common.get_new_image(4, 2))
+
+        component_data = \
+            self._get_encoded(
+                templatelayer.testing_common.get_new_image(5, 5))
+
+        async def render(ar):
+            ct = await ar.compile(template_data, _TEST_LAYOUT_CONFIG)
+            return await ar.render(ct, { 'left': component_data })
+
+        ar = templatelayer.async_render.AsyncRenderer()
+
+        try:
+            asyncio.run(render(ar))
+        except templatelayer.template_layout.PlaceholderNotCompatibleException:
+            pass
+        else:
+            raise Exception("Expected compatibility exception.")
+        finally:
+            ar.close()
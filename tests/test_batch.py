@@ -0,0 +1,618 @@
+import unittest
+import os
+import io
+import time
+
+import PIL.Image
+
+import templatelayer.batch
+import templatelayer.incremental
+import templatelayer.output_cache
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+
+class TestManifest(unittest.TestCase):
+    def test_get_manifest_format(self):
+        self.assertEquals(
+            templatelayer.batch.get_manifest_format('jobs.csv'),
+            'csv')
+
+        self.assertEquals(
+            templatelayer.batch.get_manifest_format('jobs.CSV'),
+            'csv')
+
+        self.assertEquals(
+            templatelayer.batch.get_manifest_format('jobs.jsonl'),
+            'jsonl')
+
+    def test_read_manifest__jsonl(self):
+        f = io.StringIO(u"""\
+{"output": "out1.png", "components": {"right": "b.png", "left": "a.png"}}
+
+{"output": "out2.png", "components": {"left": "c.png"}}
+""")
+
+        actual = list(templatelayer.batch.read_manifest(f, 'jsonl'))
+
+        expected = [
+            templatelayer.batch._BATCH_JOB(
+                output_filepath='out1.png',
+                components=[('left', 'a.png'), ('right', 'b.png')]),
+            templatelayer.batch._BATCH_JOB(
+                output_filepath='out2.png',
+                components=[('left', 'c.png')]),
+        ]
+
+        self.assertEquals(actual, expected)
+
+    def test_read_manifest__jsonl__invalid(self):
+        f = io.StringIO(u"""{"output": "out1.png"}\n""")
+
+        try:
+            list(templatelayer.batch.read_manifest(f, 'jsonl'))
+        except templatelayer.batch.ManifestError as e:
+            self.assertEquals(str(e), "Manifest line (1) is not valid.")
+        else:
+            raise Exception("Expected manifest error.")
+
+    def test_read_manifest__csv(self):
+        f = io.StringIO(u"""\
+output,left,right
+out1.png,a.png,b.png
+out2.png,,c.png
+""")
+
+        actual = list(templatelayer.batch.read_manifest(f, 'csv'))
+
+        expected = [
+            templatelayer.batch._BATCH_JOB(
+                output_filepath='out1.png',
+                components=[('left', 'a.png'), ('right', 'b.png')]),
+            templatelayer.batch._BATCH_JOB(
+                output_filepath='out2.png',
+                components=[('right', 'c.png')]),
+        ]
+
+        self.assertEquals(actual, expected)
+
+    def test_read_manifest__csv__no_output_column(self):
+        f = io.StringIO(u"""left,right\na.png,b.png\n""")
+
+        try:
+            list(templatelayer.batch.read_manifest(f, 'csv'))
+        except templatelayer.batch.ManifestError:
+            pass
+        else:
+            raise Exception("Expected manifest error.")
+
+
+class TestBatchRenderer(unittest.TestCase):
+    def test_render_all(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('one.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(2, 2, 2)).save('two.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            br = templatelayer.batch.BatchRenderer(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            jobs = [
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out1.png',
+                    components=[('left', 'one.png'), ('right', 'two.png')]),
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out2.png',
+                    components=[('left', 'two.png')]),
+            ]
+
+            results = list(br.render_all(jobs))
+
+            expected = [
+                templatelayer.batch._BATCH_RESULT(job=job, error=None)
+                for job
+                in jobs
+            ]
+
+            self.assertEquals(results, expected)
+
+            actual = list(PIL.Image.open('out1.png').getdata())
+            expected = [
+                (1, 1, 1), (1, 1, 1), (2, 2, 2), (2, 2, 2),
+                (1, 1, 1), (1, 1, 1), (2, 2, 2), (2, 2, 2),
+            ]
+
+            self.assertEquals(actual, expected)
+
+            # The template must not have been modified by the first job.
+
+            actual = list(PIL.Image.open('out2.png').getdata())
+            expected = [
+                (2, 2, 2), (2, 2, 2), (0, 0, 0), (0, 0, 0),
+                (2, 2, 2), (2, 2, 2), (0, 0, 0), (0, 0, 0),
+            ]
+
+            self.assertEquals(actual, expected)
+
+    def test_render_all__output_cache(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            for name, color in (('one', (1, 1, 1)), ('two', (2, 2, 2))):
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color=color).save(name + '.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            oc = \
+                templatelayer.output_cache.OutputCache(
+                    path=os.path.join(temp_path, 'cache'))
+
+            br = templatelayer.batch.BatchRenderer(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG,
+                    output_cache=oc,
+                    template_digest='template')
+
+            jobs = [
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out1.png',
+                    components=[('left', 'one.png'), ('right', 'two.png')]),
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out2.png',
+                    components=[('left', 'one.png'), ('right', 'two.png')]),
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out3.png',
+                    components=[('left', 'two.png'), ('right', 'one.png')]),
+            ]
+
+            actions = [result.action for result in br.render_all(jobs)]
+
+            expected = [
+                None,
+                templatelayer.output_cache.ACTION_CACHED,
+                None,
+            ]
+
+            self.assertEquals(actions, expected)
+
+            with open('out1.png', 'rb') as f:
+                data = f.read()
+
+            with open('out2.png', 'rb') as f:
+                self.assertEquals(f.read(), data)
+
+            # The output format is part of the key.
+
+            job = \
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out4.bmp',
+                    components=[('left', 'one.png'), ('right', 'two.png')])
+
+            self.assertIsNone(br.render(job))
+
+            # Rendering over an output that came from the cache must not
+            # change the cache.
+
+            job = \
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out2.png',
+                    components=[('left', 'two.png'), ('right', 'two.png')])
+
+            self.assertIsNone(br.render(job))
+
+            job = \
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out1.png',
+                    components=[('left', 'one.png'), ('right', 'two.png')])
+
+            self.assertEquals(
+                br.render(job),
+                templatelayer.output_cache.ACTION_CACHED)
+
+            with open('out1.png', 'rb') as f:
+                self.assertEquals(f.read(), data)
+
+            # Neither must rendering over it without the cache.
+
+            uncached_br = \
+                templatelayer.batch.BatchRenderer(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            uncached_job = \
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out1.png',
+                    components=[('left', 'two.png'), ('right', 'two.png')])
+
+            uncached_br.render(uncached_job)
+
+            self.assertEquals(
+                br.render(job),
+                templatelayer.output_cache.ACTION_CACHED)
+
+            with open('out1.png', 'rb') as f:
+                self.assertEquals(f.read(), data)
+
+    def test_render_all__failure(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                3,
+                3).save('wrong_size.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2).save('right_size.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            br = templatelayer.batch.BatchRenderer(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            jobs = [
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out1.png',
+                    components=[('left', 'wrong_size.png')]),
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out2.png',
+                    components=[('left', 'right_size.png')]),
+            ]
+
+            results = list(br.render_all(jobs))
+
+            self.assertEquals(
+                results[0].error,
+                "PlaceholderNotCompatibleException: Image with size (3, 3) "
+                "not compatible with placeholder [left] size (2, 2).")
+
+            self.assertIsNone(results[1].error)
+
+
+class TestIncrementalBatchRenderer(unittest.TestCase):
+    def _get_renderer(self, template_digest='template', template_color=(0, 0, 0)):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color=template_color)
+
+        br = templatelayer.batch.IncrementalBatchRenderer(
+                template_im,
+                _TEST_LAYOUT_CONFIG,
+                template_digest)
+
+        return br
+
+    def _render(self, br, output_filepath, components):
+        job = \
+            templatelayer.batch._BATCH_JOB(
+                output_filepath=output_filepath,
+                components=components)
+
+        result = list(br.render_all([job]))[0]
+        self.assertIsNone(result.error)
+
+        return result.action
+
+    def _get_row(self, filepath):
+        im = PIL.Image.open(filepath)
+        return [im.getpixel((x, 0)) for x in range(im.width)]
+
+    def test_render(self):
+        with templatelayer.testing_common.temp_path():
+            for name, color in (('one', (1, 1, 1)), ('two', (2, 2, 2))):
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color=color).save(name + '.png')
+
+            components = [('left', 'one.png'), ('right', 'two.png')]
+
+            br = self._get_renderer()
+
+            self.assertEquals(
+                self._render(br, 'out.png', components),
+                templatelayer.incremental.ACTION_RENDERED)
+
+            # Nothing changed.
+
+            self.assertEquals(
+                self._render(br, 'out.png', components),
+                templatelayer.incremental.ACTION_SKIPPED)
+
+            # One component changed.
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(3, 3, 3)).save('one.png')
+
+            # Make sure that the modification-time changes.
+            future_time = time.time() + 10
+            os.utime('one.png', (future_time, future_time))
+
+            self.assertEquals(
+                self._render(br, 'out.png', components),
+                templatelayer.incremental.ACTION_UPDATED)
+
+            self.assertEquals(
+                self._get_row('out.png'),
+                [(3, 3, 3), (3, 3, 3), (2, 2, 2), (2, 2, 2)])
+
+            # A component was removed, so the template is restored under it.
+
+            self.assertEquals(
+                self._render(br, 'out.png', [('left', 'one.png')]),
+                templatelayer.incremental.ACTION_UPDATED)
+
+            self.assertEquals(
+                self._get_row('out.png'),
+                [(3, 3, 3), (3, 3, 3), (0, 0, 0), (0, 0, 0)])
+
+            # The template changed.
+
+            br = self._get_renderer(template_digest='other', template_color=(9, 9, 9))
+
+            self.assertEquals(
+                self._render(br, 'out.png', [('left', 'one.png')]),
+                templatelayer.incremental.ACTION_RENDERED)
+
+            self.assertEquals(
+                self._get_row('out.png'),
+                [(3, 3, 3), (3, 3, 3), (9, 9, 9), (9, 9, 9)])
+
+    def test_render__lossy(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('one.png')
+
+            components = [('left', 'one.png')]
+
+            br = self._get_renderer()
+
+            self.assertEquals(
+                self._render(br, 'out.jpg', components),
+                templatelayer.incremental.ACTION_RENDERED)
+
+            self.assertEquals(
+                self._render(br, 'out.jpg', components),
+                templatelayer.incremental.ACTION_SKIPPED)
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(3, 3, 3)).save('one.png')
+
+            # Make sure that the modification-time changes.
+            future_time = time.time() + 10
+            os.utime('one.png', (future_time, future_time))
+
+            # The previous output isn't reused because it's lossy.
+
+            self.assertEquals(
+                self._render(br, 'out.jpg', components),
+                templatelayer.incremental.ACTION_RENDERED)
+
+    def test_render__output_removed(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('one.png')
+
+            components = [('left', 'one.png')]
+
+            br = self._get_renderer()
+            self._render(br, 'out.png', components)
+
+            os.unlink('out.png')
+
+            self.assertEquals(
+                self._render(br, 'out.png', components),
+                templatelayer.incremental.ACTION_RENDERED)
+
+
+    def test_render__mask_changed(self):
+        config = {
+            "placeholders": {
+                "left": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "mask.png"
+                }
+            }
+        }
+
+        template_im = templatelayer.testing_common.get_new_image(4, 2)
+
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('one.png')
+
+            components = [('left', 'one.png')]
+
+            for color in (255, 0):
+                PIL.Image.new('L', (2, 2), color=color).save('mask.png')
+
+                br = \
+                    templatelayer.batch.IncrementalBatchRenderer(
+                        template_im,
+                        config,
+                        'template')
+
+                # The output is rendered again (rather than being skipped)
+                # when the mask changes.
+
+                self.assertEquals(
+                    self._render(br, 'out.png', components),
+                    templatelayer.incremental.ACTION_RENDERED)
+
+                self.assertEquals(
+                    self._render(br, 'out.png', components),
+                    templatelayer.incremental.ACTION_SKIPPED)
+
+            self.assertEquals(
+                self._get_row('out.png'),
+                [(0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0)])
+
+
+class TestParallelBatchRenderer(unittest.TestCase):
+    def test_render_all(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('one.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            b = io.BytesIO()
+            template_im.save(b, format='PNG')
+
+            br = templatelayer.batch.ParallelBatchRenderer(
+                    b.getvalue(),
+                    _TEST_LAYOUT_CONFIG,
+                    2)
+
+            jobs = [
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out{}.png'.format(i),
+                    components=[('left', 'one.png')])
+                for i
+                in range(4)
+            ]
+
+            jobs.append(
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='missing.png',
+                    components=[('right', 'missing_component.png')]))
+
+            results = list(br.render_all(jobs))
+
+            failed = sorted(
+                result.job.output_filepath
+                for result
+                in results
+                if result.error is not None)
+
+            self.assertEquals(failed, ['missing.png'])
+            self.assertEquals(len(results), 5)
+
+            for i in range(4):
+                actual = PIL.Image.open('out{}.png'.format(i)).getpixel((0, 0))
+                self.assertEquals(actual, (1, 1, 1))
+
+    def test_render_all__worker_initialization_failure(self):
+        config = {
+            "placeholders": {
+                "masked": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "mask.png"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            PIL.Image.new('L', (2, 2), 255).save('mask.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2)
+
+            b = io.BytesIO()
+            template_im.save(b, format='PNG')
+
+            br = templatelayer.batch.ParallelBatchRenderer(
+                    b.getvalue(),
+                    config,
+                    2)
+
+            # The workers won't find the mask.
+            os.unlink('mask.png')
+
+            job = \
+                templatelayer.batch._BATCH_JOB(
+                    output_filepath='out.png',
+                    components=[])
+
+            try:
+                list(br.render_all([job]))
+            except templatelayer.batch.WorkerInitializationError:
+                pass
+            else:
+                raise Exception("Expected worker initialization error.")
+
+    def test_init__mask_missing(self):
+        config = {
+            "placeholders": {
+                "masked": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "missing_mask.png"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            b = io.BytesIO()
+            templatelayer.testing_common.get_new_image(2, 2).save(b, format='PNG')
+
+            try:
+                templatelayer.batch.ParallelBatchRenderer(
+                    b.getvalue(),
+                    config,
+                    2)
+            except (IOError, OSError):
+                pass
+            else:
+                raise Exception("Expected missing-mask error.")
@@ -0,0 +1,105 @@
+import unittest
+
+import templatelayer.component_loader
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "exact": {
+            "left": 0,
+            "top": 0,
+            "width": 10,
+            "height": 10
+        },
+        "fitted": {
+            "left": 10,
+            "top": 0,
+            "width": 10,
+            "height": 10,
+            "fit": "cover"
+        }
+    }
+}
+
+
+class TestComponentLoader(unittest.TestCase):
+    def _get_layout(self):
+        template_im = templatelayer.testing_common.get_new_image(20, 10)
+
+        tl = \
+            templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        return tl
+
+    def test_open(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                10,
+                10,
+                color=(1, 2, 3)).save('exact.png')
+
+            loader = \
+                templatelayer.component_loader.ComponentLoader(
+                    self._get_layout())
+
+            with loader.open('exact', 'exact.png') as im:
+                self.assertEquals(im.getpixel((0, 0)), (1, 2, 3))
+
+            # The file is closed once we're done with it.
+            self.assertIsNone(im.fp)
+
+            stats = loader.stats
+            self.assertEquals(len(stats), 1)
+
+            ds = stats[0]
+            self.assertEquals(ds.name, 'exact')
+            self.assertEquals(ds.filepath, 'exact.png')
+            self.assertEquals(ds.source_size, (10, 10))
+            self.assertEquals(ds.decoded_size, (10, 10))
+            self.assertEquals(ds.decoded_bytes, 400)
+            self.assertEquals(ds.full_bytes, 400)
+
+    def test_open__draft(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                160,
+                80).save('fitted.jpg')
+
+            loader = \
+                templatelayer.component_loader.ComponentLoader(
+                    self._get_layout())
+
+            with loader.open('fitted', 'fitted.jpg') as im:
+                self.assertEquals(im.size, (20, 10))
+
+            # The JPEG was decoded at an eighth of its size, which still
+            # covers the placeholder.
+
+            ds = loader.stats[0]
+            self.assertEquals(ds.source_size, (160, 80))
+            self.assertEquals(ds.decoded_size, (20, 10))
+            self.assertEquals(ds.decoded_bytes, 800)
+            self.assertEquals(ds.full_bytes, 51200)
+
+    def test_open__not_compatible(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                5,
+                5).save('wrong.png')
+
+            loader = \
+                templatelayer.component_loader.ComponentLoader(
+                    self._get_layout())
+
+            try:
+                with loader.open('exact', 'wrong.png'):
+                    pass
+            except templatelayer.template_layout.PlaceholderNotCompatibleException:
+                pass
+            else:
+                raise Exception("Expected compatibility exception.")
+
+            self.assertEquals(loader.stats, [])
@@ -0,0 +1,63 @@
+import unittest
+import os
+import time
+
+import templatelayer.disk_cache
+import templatelayer.testing_common
+
+
+class TestDiskCacheBudget(unittest.TestCase):
+    def _write(self, filename, age_s):
+        with open(filename, 'wb') as f:
+            f.write(b'data')
+
+        mtime = time.time() - age_s
+        os.utime(filename, (mtime, mtime))
+
+    def test_add(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            dcb = \
+                templatelayer.disk_cache.DiskCacheBudget(
+                    temp_path,
+                    '.entry',
+                    8)
+
+            self._write('one.entry', 300)
+            self._write('two.entry', 200)
+            self._write('other.tmp', 400)
+
+            # The first entry lists the directory.
+            self.assertEquals(dcb.add(4), 0)
+
+            # Going over budget removes the least-recently-used entry.
+
+            self._write('three.entry', 100)
+            self.assertEquals(dcb.add(4), 1)
+
+            self.assertEquals(
+                sorted(os.listdir(temp_path)),
+                ['other.tmp', 'three.entry', 'two.entry'])
+
+            # An entry that was removed elsewhere is accounted for once the
+            # running total goes over budget.
+
+            os.unlink('two.entry')
+
+            self._write('four.entry', 0)
+            self.assertEquals(dcb.add(4), 0)
+
+            self.assertEquals(
+                sorted(os.listdir(temp_path)),
+                ['four.entry', 'other.tmp', 'three.entry'])
+
+    def test_get_entries(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            self._write('new.entry', 0)
+            self._write('old.entry', 100)
+            self._write('other.tmp', 200)
+
+            entries = templatelayer.disk_cache.get_entries(temp_path, '.entry')
+
+            self.assertEquals(
+                [(size, os.path.basename(filepath)) for _, size, filepath in entries],
+                [(4, 'old.entry'), (4, 'new.entry')])
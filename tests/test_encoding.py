@@ -0,0 +1,93 @@
+import unittest
+import io
+
+import PIL.Image
+
+import templatelayer.encoding
+import templatelayer.testing_common
+
+
+class TestEncoding(unittest.TestCase):
+    def test_get_format(self):
+        self.assertEquals(templatelayer.encoding.get_format('a/b.png'), 'PNG')
+        self.assertEquals(templatelayer.encoding.get_format('b.JPG'), 'JPEG')
+        self.assertEquals(templatelayer.encoding.get_format('b.webp'), 'WEBP')
+
+        self.assertIsNone(templatelayer.encoding.get_format('b'))
+        self.assertIsNone(templatelayer.encoding.get_format(io.BytesIO()))
+
+        self.assertEquals(
+            templatelayer.encoding.get_format(io.BytesIO(), default='PNG'),
+            'PNG')
+
+    def test_get_save_options(self):
+        actual = \
+            templatelayer.encoding.get_save_options(
+                'JPEG',
+                preset=templatelayer.encoding.PRESET_SMALLEST,
+                quality=90,
+                optimize=None,
+                compress_level=1)
+
+        expected = {
+            'quality': 90,
+            'subsampling': 2,
+            'optimize': True,
+            'progressive': True,
+        }
+
+        self.assertEquals(actual, expected)
+
+    def test_get_save_options__no_preset(self):
+        actual = \
+            templatelayer.encoding.get_save_options(
+                'PNG',
+                compress_level=1,
+                quality=90)
+
+        self.assertEquals(actual, { 'compress_level': 1 })
+
+    def test_get_save_options__invalid_preset(self):
+        try:
+            templatelayer.encoding.get_save_options('PNG', preset='tiny')
+        except templatelayer.encoding.EncodingException:
+            pass
+        else:
+            raise Exception("Expected exception for invalid preset.")
+
+    def test_save(self):
+        im = PIL.Image.new('RGBA', (2, 2), (1, 2, 3, 4))
+
+        with templatelayer.testing_common.temp_path():
+            templatelayer.encoding.save(
+                im,
+                'output.jpg',
+                preset=templatelayer.encoding.PRESET_FAST)
+
+            saved_im = PIL.Image.open('output.jpg')
+            self.assertEquals(saved_im.format, 'JPEG')
+            self.assertEquals(saved_im.mode, 'RGB')
+
+        f = io.BytesIO()
+
+        templatelayer.encoding.save(
+            im,
+            f,
+            format_='PNG',
+            preset=templatelayer.encoding.PRESET_FAST)
+
+        f.seek(0)
+        saved_im = PIL.Image.open(f)
+
+        self.assertEquals(saved_im.format, 'PNG')
+        self.assertEquals(saved_im.getpixel((0, 0)), (1, 2, 3, 4))
+
+    def test_save__unknown_format(self):
+        im = templatelayer.testing_common.get_new_image(2, 2)
+
+        try:
+            templatelayer.encoding.save(im, io.BytesIO())
+        except templatelayer.encoding.EncodingException:
+            pass
+        else:
+            raise Exception("Expected exception for unknown format.")
@@ -0,0 +1,155 @@
+import unittest
+import io
+
+import PIL.Image
+
+import templatelayer.fit
+import templatelayer.testing_common
+
+
+class TestFit(unittest.TestCase):
+    def test_get_fit_geometry__contain(self):
+        geometry = \
+            templatelayer.fit.get_fit_geometry(
+                (400, 100),
+                (100, 100),
+                templatelayer.fit.FIT_CONTAIN)
+
+        self.assertEquals(geometry.size, (100, 25))
+        self.assertEquals(geometry.box, (0, 0, 400, 100))
+        self.assertEquals(geometry.offset, (0, 37))
+
+    def test_get_fit_geometry__cover(self):
+        geometry = \
+            templatelayer.fit.get_fit_geometry(
+                (400, 100),
+                (100, 100),
+                templatelayer.fit.FIT_COVER)
+
+        self.assertEquals(geometry.size, (100, 100))
+        self.assertEquals(geometry.box, (150, 0, 250, 100))
+        self.assertEquals(geometry.offset, (0, 0))
+
+    def test_get_fit_geometry__stretch(self):
+        geometry = \
+            templatelayer.fit.get_fit_geometry(
+                (400, 100),
+                (100, 100),
+                templatelayer.fit.FIT_STRETCH)
+
+        self.assertEquals(geometry.size, (100, 100))
+        self.assertEquals(geometry.box, (0, 0, 400, 100))
+        self.assertEquals(geometry.offset, (0, 0))
+
+    def test_get_fit_geometry__invalid(self):
+        try:
+            templatelayer.fit.get_fit_geometry((1, 2), (3, 4), 'invalid')
+        except ValueError:
+            pass
+        else:
+            raise Exception("Expected exception for invalid fit.")
+
+    def test_fit_image__exact(self):
+        im = templatelayer.testing_common.get_new_image(4, 4)
+
+        fitted_im, offset = \
+            templatelayer.fit.fit_image(
+                im,
+                2,
+                2,
+                templatelayer.fit.FIT_EXACT)
+
+        self.assertIs(fitted_im, im)
+        self.assertEquals(offset, (0, 0))
+
+    def test_fit_image__cover(self):
+        # Red on the left and right, which should be cropped away.
+
+        im = templatelayer.testing_common.get_new_image(30, 10, color=(255, 0, 0))
+        im.paste((0, 0, 255), (10, 0, 20, 10))
+
+        fitted_im, offset = \
+            templatelayer.fit.fit_image(
+                im,
+                5,
+                5,
+                templatelayer.fit.FIT_COVER,
+                resample=PIL.Image.NEAREST)
+
+        self.assertEquals(fitted_im.size, (5, 5))
+        self.assertEquals(offset, (0, 0))
+        self.assertEquals(set(fitted_im.getdata()), set([(0, 0, 255)]))
+
+    def test_fit_image__draft(self):
+        im = templatelayer.testing_common.get_new_image(800, 800)
+
+        f = io.BytesIO()
+        im.save(f, 'JPEG')
+        f.seek(0)
+
+        jpeg_im = PIL.Image.open(f)
+
+        fitted_im, offset = \
+            templatelayer.fit.fit_image(
+                jpeg_im,
+                100,
+                50,
+                templatelayer.fit.FIT_CONTAIN)
+
+        # The JPEG was decoded at an eighth of its size.
+        self.assertEquals(jpeg_im.size, (100, 100))
+
+        self.assertEquals(fitted_im.size, (50, 50))
+        self.assertEquals(offset, (25, 0))
+
+
+class TestFitCache(unittest.TestCase):
+    def test_fit_image(self):
+        fc = templatelayer.fit.FitCache()
+
+        im = templatelayer.testing_common.get_new_image(20, 10)
+
+        fitted_im, offset = \
+            fc.fit_image(
+                im,
+                10,
+                10,
+                templatelayer.fit.FIT_CONTAIN)
+
+        self.assertEquals(fitted_im.size, (10, 5))
+        self.assertEquals(offset, (0, 2))
+
+        # A different image with the same pixels is a hit.
+
+        cached_im, cached_offset = \
+            fc.fit_image(
+                im.copy(),
+                10,
+                10,
+                templatelayer.fit.FIT_CONTAIN)
+
+        self.assertIs(cached_im, fitted_im)
+        self.assertEquals(cached_offset, offset)
+
+        # A different target is a miss.
+
+        fc.fit_image(im, 10, 10, templatelayer.fit.FIT_STRETCH)
+
+        stats = fc.stats
+        self.assertEquals(stats.hits, 1)
+        self.assertEquals(stats.misses, 2)
+        self.assertEquals(stats.count, 2)
+        self.assertEquals(stats.bytes, 600)
+
+    def test_fit_image__evict(self):
+        fc = templatelayer.fit.FitCache(max_bytes=500)
+
+        im = templatelayer.testing_common.get_new_image(20, 20)
+
+        fc.fit_image(im, 10, 10, templatelayer.fit.FIT_STRETCH)
+        fc.fit_image(im, 10, 5, templatelayer.fit.FIT_STRETCH)
+
+        stats = fc.stats
+        self.assertEquals(stats.evictions, 1)
+        self.assertEquals(stats.count, 1)
+        self.assertEquals(stats.bytes, 200)
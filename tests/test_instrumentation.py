@@ -0,0 +1,114 @@
+import unittest
+import os
+import io
+import pstats
+
+import templatelayer.instrumentation
+import templatelayer.template_layout
+import templatelayer.encoding
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+
+class TestInstrumentation(unittest.TestCase):
+    def _render(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                2)
+
+        tl = templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        for name in ('left', 'right'):
+            component_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color=(1, 1, 1))
+
+            tl.apply_component(name, component_im)
+
+        f = io.BytesIO()
+        templatelayer.encoding.save(tl.resource, f, format_='PNG')
+
+        return f.getvalue()
+
+    def test_collector(self):
+        collector = templatelayer.instrumentation.Collector()
+
+        with templatelayer.instrumentation.hooked(collector):
+            data = self._render()
+
+        actual = [
+            (record.stage, record.name, record.pixels)
+            for record
+            in collector.records
+        ]
+
+        expected = [
+            (templatelayer.instrumentation.STAGE_CONFIG_PARSE, None, None),
+            (templatelayer.instrumentation.STAGE_OVERLAP_VALIDATION, None, None),
+            (templatelayer.instrumentation.STAGE_PASTE, 'left', 4),
+            (templatelayer.instrumentation.STAGE_PASTE, 'right', 4),
+            (templatelayer.instrumentation.STAGE_ENCODE, None, 8),
+        ]
+
+        self.assertEquals(actual, expected)
+        self.assertEquals(collector.records[-1].bytes, len(data))
+
+        actual = [
+            (ss.stage, ss.count, ss.pixels)
+            for ss
+            in collector.get_summary()
+        ]
+
+        expected = [
+            (templatelayer.instrumentation.STAGE_CONFIG_PARSE, 1, 0),
+            (templatelayer.instrumentation.STAGE_OVERLAP_VALIDATION, 1, 0),
+            (templatelayer.instrumentation.STAGE_PASTE, 2, 8),
+            (templatelayer.instrumentation.STAGE_ENCODE, 1, 8),
+        ]
+
+        self.assertEquals(actual, expected)
+
+        # Nothing is recorded once the hook is removed.
+
+        self._render()
+        self.assertEquals(len(collector.records), 5)
+
+    def test_profile(self):
+        with templatelayer.testing_common.temp_path():
+            with templatelayer.instrumentation.profile('render.prof'):
+                self._render()
+
+            self.assertTrue(os.path.exists('render.prof'))
+
+            # The output can be read with pstats.
+            pstats.Stats('render.prof')
+
+    def test_profile__invalid(self):
+        try:
+            with templatelayer.instrumentation.profile('render.prof', 'other'):
+                pass
+        except ValueError:
+            pass
+        else:
+            raise Exception("Expected failure for invalid profiler.")
@@ -0,0 +1,123 @@
+import unittest
+import os
+import json
+
+import templatelayer.layout_cache
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+
+class _FailingParseLayout(templatelayer.template_layout.SimpleTemplateLayout):
+    def _parse_and_validate(self, layout):
+        raise Exception("Layout should have come from the cache.")
+
+
+class TestLayoutCache(unittest.TestCase):
+    def test_get_config_hash(self):
+        reordered_config = json.loads(json.dumps(_TEST_LAYOUT_CONFIG))
+        right = reordered_config['placeholders'].pop('right')
+        reordered_config['placeholders'] = {
+            'right': right,
+            'left': reordered_config['placeholders']['left'],
+        }
+
+        self.assertEquals(
+            templatelayer.layout_cache.get_config_hash(_TEST_LAYOUT_CONFIG),
+            templatelayer.layout_cache.get_config_hash(reordered_config))
+
+    def test_get_and_set(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path)
+
+            self.assertIsNone(lc.get(_TEST_LAYOUT_CONFIG))
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            tl = templatelayer.template_layout.SimpleTemplateLayout(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG,
+                    layout_cache=lc)
+
+            self.assertEquals(lc.get(_TEST_LAYOUT_CONFIG), tl.placeholder_configs)
+
+            # The second load must not validate again.
+
+            tl2 = _FailingParseLayout(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG,
+                    layout_cache=lc)
+
+            self.assertEquals(tl2.placeholder_configs, tl.placeholder_configs)
+
+    def test_get__corrupt(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path)
+
+            config_hash = \
+                templatelayer.layout_cache.get_config_hash(
+                    _TEST_LAYOUT_CONFIG)
+
+            filepath = os.path.join(temp_path, config_hash + '.layout')
+            with open(filepath, 'wb') as f:
+                f.write(b'not a layout')
+
+            self.assertIsNone(lc.get(_TEST_LAYOUT_CONFIG))
+
+    def test_set__not_compact(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path)
+
+            placeholder_configs = {
+                'float': templatelayer.template_layout._PLACEHOLDER(name='float', top=0.5, left=0, height=1, width=1),
+            }
+
+            lc.set({}, placeholder_configs)
+            self.assertIsNone(lc.get({}))
+
+    def test_evict(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path, max_bytes=0)
+
+            placeholder_configs = {
+                'ph': templatelayer.template_layout._PLACEHOLDER(name='ph', top=0, left=0, height=1, width=1),
+            }
+
+            lc.set({}, placeholder_configs)
+            self.assertEquals(os.listdir(temp_path), [])
+
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path, max_bytes=1024 * 1024)
+
+            lc.set({}, placeholder_configs)
+            self.assertEquals(lc.get({}), placeholder_configs)
+
+    def test_get_and_set__options(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            lc = templatelayer.layout_cache.LayoutCache(path=temp_path)
+
+            placeholder_configs = {
+                'masked': templatelayer.template_layout._PLACEHOLDER(name='masked', top=0, left=0, height=1, width=1, mask='alpha'),
+                'plain': templatelayer.template_layout._PLACEHOLDER(name='plain', top=0, left=1, height=1, width=1),
+            }
+
+            lc.set({}, placeholder_configs)
+            self.assertEquals(lc.get({}), placeholder_configs)
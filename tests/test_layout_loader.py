@@ -0,0 +1,206 @@
+import unittest
+import io
+import json
+
+import templatelayer.layout_loader
+import templatelayer.layout_cache
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "name": "test layout",
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2,
+            "extra": [1, {"a": "}"}]
+        },
+        "right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2,
+            "mask": "alpha",
+            "fit": "contain"
+        }
+    },
+    "description": "trailing"
+}
+
+
+class TestLayoutLoader(unittest.TestCase):
+    def _get_expected(self):
+        template_im = templatelayer.testing_common.get_new_image(4, 2)
+
+        tl = templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        return tl.placeholder_configs
+
+    def _write(self, filename, content):
+        with open(filename, 'w') as f:
+            f.write(content)
+
+    def _assert_load_error(self, filename, format_=None):
+        try:
+            templatelayer.layout_loader.load_layout(filename, format_=format_)
+        except templatelayer.layout_loader.LayoutLoadError:
+            pass
+        else:
+            raise Exception("Expected load error: [{}]".format(filename))
+
+    def test_get_layout_format(self):
+        self.assertEquals(
+            templatelayer.layout_loader.get_layout_format('a/b.JSONL'),
+            templatelayer.layout_loader.FORMAT_NDJSON)
+
+        self.assertEquals(
+            templatelayer.layout_loader.get_layout_format('b.layout'),
+            templatelayer.layout_loader.FORMAT_BINARY)
+
+        self.assertEquals(
+            templatelayer.layout_loader.get_layout_format('b.json'),
+            templatelayer.layout_loader.FORMAT_JSON)
+
+    def test_iterate_json_placeholders__chunked(self):
+        content = json.dumps(_TEST_LAYOUT_CONFIG, indent=4)
+
+        # Split values across every possible boundary.
+
+        for chunk_size in (1, 2, 3, 7, 64):
+            stream = \
+                templatelayer.layout_loader._JsonStream(
+                    io.StringIO(content),
+                    chunk_size=chunk_size)
+
+            placeholders = {}
+            for key in templatelayer.layout_loader._iterate_json_object(stream):
+                if key != 'placeholders':
+                    stream.read_value()
+                    continue
+
+                for name in templatelayer.layout_loader._iterate_json_object(stream):
+                    placeholders[name] = stream.read_value()
+
+            self.assertEquals(placeholders, _TEST_LAYOUT_CONFIG['placeholders'])
+            self.assertEquals(stream.read_character(), '')
+
+    def test_load_layout__json(self):
+        with templatelayer.testing_common.temp_path():
+            self._write('layout.json', json.dumps(_TEST_LAYOUT_CONFIG))
+
+            pt = templatelayer.layout_loader.load_layout('layout.json')
+
+            self.assertTrue(
+                isinstance(pt, templatelayer.template_layout.PlaceholderTable))
+
+            self.assertEquals(pt, self._get_expected())
+
+    def test_load_layout__ndjson(self):
+        with templatelayer.testing_common.temp_path():
+            lines = [
+                json.dumps(dict(parameters, name=name))
+                for name, parameters
+                in _TEST_LAYOUT_CONFIG['placeholders'].items()
+            ]
+
+            self._write('layout.ndjson', '\n'.join(lines) + '\n\n')
+
+            pt = templatelayer.layout_loader.load_layout('layout.ndjson')
+            self.assertEquals(pt, self._get_expected())
+
+    def test_write_layout(self):
+        expected = self._get_expected()
+
+        with templatelayer.testing_common.temp_path():
+            with open('layout.layout', 'wb') as f:
+                templatelayer.layout_loader.write_layout(
+                    expected,
+                    f,
+                    templatelayer.layout_loader.FORMAT_BINARY)
+
+            with open('layout.ndjson', 'w') as f:
+                templatelayer.layout_loader.write_layout(
+                    expected,
+                    f,
+                    templatelayer.layout_loader.FORMAT_NDJSON)
+
+            self.assertEquals(
+                templatelayer.layout_loader.load_layout('layout.layout'),
+                expected)
+
+            self.assertEquals(
+                templatelayer.layout_loader.load_layout('layout.ndjson'),
+                expected)
+
+    def test_load_layout__not_valid(self):
+        configs = {
+            'missing.json': {"placeholders": {"a": {"left": 0, "top": 0, "width": 1}}},
+            'float.json': {"placeholders": {"a": {"left": 0.5, "top": 0, "width": 1, "height": 1}}},
+            'negative.json': {"placeholders": {"a": {"left": 0, "top": 0, "width": -1, "height": 1}}},
+            'fit.json': {"placeholders": {"a": {"left": 0, "top": 0, "width": 1, "height": 1, "fit": "squash"}}},
+            'empty.json': {"placeholders": {}},
+            'absent.json': {"name": "no placeholders"},
+        }
+
+        with templatelayer.testing_common.temp_path():
+            for filename, config in configs.items():
+                self._write(filename, json.dumps(config))
+                self._assert_load_error(filename)
+
+            self._write('truncated.json', '{"placeholders": {"a": {"left": 0')
+            self._assert_load_error('truncated.json')
+
+            self._write('line.ndjson', '{"left": 0}\n')
+            self._assert_load_error('line.ndjson')
+
+            self._write('binary.layout', 'not a layout')
+            self._assert_load_error('binary.layout')
+
+    def test_load_layout__overlap(self):
+        config = {
+            "placeholders": {
+                "first": {"left": 0, "top": 0, "width": 2, "height": 2},
+                "second": {"left": 1, "top": 1, "width": 2, "height": 2},
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            self._write('layout.json', json.dumps(config))
+
+            try:
+                templatelayer.layout_loader.load_layout('layout.json')
+            except templatelayer.template_layout.PlaceholderOverlapError as e:
+                self.assertEquals(
+                    str(e),
+                    "Placeholder [second] overlaps with placeholder [first].")
+            else:
+                raise Exception("Expected overlap error.")
+
+    def test_get_config_hash(self):
+        with templatelayer.testing_common.temp_path():
+            self._write('layout.json', json.dumps(_TEST_LAYOUT_CONFIG))
+            pt = templatelayer.layout_loader.load_layout('layout.json')
+
+        expected = self._get_expected()
+
+        self.assertEquals(
+            templatelayer.layout_cache.get_config_hash(pt),
+            templatelayer.layout_cache.get_config_hash(expected.to_config()))
+
+    def test_simple_template_layout(self):
+        template_im = templatelayer.testing_common.get_new_image(4, 2)
+
+        with templatelayer.testing_common.temp_path():
+            self._write('layout.json', json.dumps(_TEST_LAYOUT_CONFIG))
+            pt = templatelayer.layout_loader.load_layout('layout.json')
+
+        tl = templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                pt)
+
+        self.assertEquals(tl.placeholder_configs, self._get_expected())
+        self.assertEquals(tl.placeholder_at(3, 1).name, 'right')
@@ -0,0 +1,173 @@
+import unittest
+
+import templatelayer.numpy_backend
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "top-left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "top-right": {
+            "left": 2,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "bottom": {
+            "left": 0,
+            "top": 2,
+            "width": 4,
+            "height": 1
+        },
+        "clipped": {
+            "left": 3,
+            "top": 4,
+            "width": 3,
+            "height": 3
+        }
+    }
+}
+
+
+@unittest.skipUnless(
+    templatelayer.numpy_backend.is_available(),
+    "NumPy is not installed.")
+class TestNumpyCompositor(unittest.TestCase):
+    def _get_compiled_template(self, mode='RGB'):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                6,
+                color=(9, 9, 9)).convert(mode)
+
+        ct = \
+            templatelayer.template_layout.CompiledTemplate(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        return ct
+
+    def _get_components(self, mode='RGB'):
+        im_mapping = {}
+        for i, (name, ph) in enumerate(_TEST_LAYOUT_CONFIG['placeholders'].items()):
+            im = \
+                templatelayer.testing_common.get_new_image(
+                    ph['width'],
+                    ph['height'],
+                    color=(i + 1, i + 2, i + 3))
+
+            im_mapping[name] = im.convert(mode)
+
+        return im_mapping
+
+    def test_render__matches_pil(self):
+        for mode in ('RGB', 'RGBA', 'L'):
+            ct = self._get_compiled_template(mode=mode)
+            im_mapping = self._get_components(mode=mode)
+
+            expected_im = ct.render(im_mapping)
+
+            nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+            actual_im = nc.render(im_mapping)
+
+            self.assertEquals(actual_im.mode, expected_im.mode)
+            self.assertEquals(actual_im.size, expected_im.size)
+            self.assertEquals(actual_im.tobytes(), expected_im.tobytes())
+
+    def test_render__converts_mode(self):
+        ct = self._get_compiled_template(mode='RGB')
+        im_mapping = self._get_components(mode='L')
+
+        expected_im = ct.render(im_mapping)
+
+        nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+        actual_im = nc.render(im_mapping)
+
+        self.assertEquals(actual_im.tobytes(), expected_im.tobytes())
+
+    def test_render__reusable(self):
+        ct = self._get_compiled_template()
+        nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+
+        im_mapping = self._get_components()
+        nc.render(im_mapping)
+
+        im = nc.render({})
+        self.assertEquals(im.getpixel((0, 0)), (9, 9, 9))
+
+    def test_render__not_compatible(self):
+        ct = self._get_compiled_template()
+        nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+
+        im = templatelayer.testing_common.get_new_image(3, 3)
+
+        try:
+            nc.render({ 'top-left': im })
+        except templatelayer.template_layout.PlaceholderNotCompatibleException:
+            pass
+        else:
+            raise Exception("Expected compatibility exception.")
+
+    def test_render__unknown_placeholder(self):
+        ct = self._get_compiled_template()
+        nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+
+        im = templatelayer.testing_common.get_new_image(3, 3)
+
+        try:
+            nc.render({ 'unknown': im })
+        except templatelayer.template_layout.UnknownPlaceholderException:
+            pass
+        else:
+            raise Exception("Expected exception for unknown placeholder.")
+
+    def test_init__mode_not_supported(self):
+        ct = self._get_compiled_template(mode='1')
+
+        try:
+            templatelayer.numpy_backend.NumpyCompositor(ct)
+        except templatelayer.template_layout.TemplateLayoutException as e:
+            self.assertEquals(
+                str(e),
+                "Templates in mode [1] are not supported by the NumPy "
+                "compositor.")
+        else:
+            raise Exception("Expected mode exception.")
+
+    def test_render__palette(self):
+        # Index 0 is blue rather than black.
+        palette = [0, 0, 255, 255, 0, 0] + [0] * (3 * 254)
+
+        for mode in ('P', 'PA'):
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    6).convert('P')
+
+            template_im.putpalette(palette)
+            template_im.info['transparency'] = 1
+
+            ct = \
+                templatelayer.template_layout.CompiledTemplate(
+                    template_im.convert(mode),
+                    _TEST_LAYOUT_CONFIG)
+
+            im_mapping = self._get_components(mode=mode)
+
+            expected_im = ct.render(im_mapping)
+
+            nc = templatelayer.numpy_backend.NumpyCompositor(ct)
+            actual_im = nc.render(im_mapping)
+
+            self.assertEquals(actual_im.tobytes(), expected_im.tobytes())
+            self.assertEquals(actual_im.getpalette(), expected_im.getpalette())
+            self.assertEquals(actual_im.info, expected_im.info)
+
+            self.assertEquals(
+                actual_im.convert('RGB').getpixel((3, 5)),
+                (0, 0, 255))
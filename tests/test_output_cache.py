@@ -0,0 +1,91 @@
+import unittest
+import os
+import time
+
+import templatelayer.output_cache
+import templatelayer.testing_common
+
+
+class TestOutputCache(unittest.TestCase):
+    def test_get_key(self):
+        key = templatelayer.output_cache.get_key('base', {'a': '1', 'b': '2'})
+
+        self.assertEquals(
+            templatelayer.output_cache.get_key(
+                'base',
+                {'b': '2', 'a': '1'}),
+            key)
+
+        self.assertNotEquals(
+            templatelayer.output_cache.get_key('base', {'a': '1', 'b': '3'}),
+            key)
+
+        self.assertNotEquals(
+            templatelayer.output_cache.get_key('other', {'a': '1', 'b': '2'}),
+            key)
+
+    def test_fetch_and_store(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            cache_path = os.path.join(temp_path, 'cache')
+            oc = templatelayer.output_cache.OutputCache(path=cache_path)
+
+            self.assertFalse(oc.fetch('abc', 'output1.bin'))
+            self.assertFalse(os.path.exists('output1.bin'))
+
+            with open('source.bin', 'wb') as f:
+                f.write(b'data')
+
+            oc.store('abc', 'source.bin')
+
+            # An existing output is replaced.
+
+            with open('output1.bin', 'wb') as f:
+                f.write(b'old')
+
+            self.assertTrue(oc.fetch('abc', 'output1.bin'))
+
+            with open('output1.bin', 'rb') as f:
+                self.assertEquals(f.read(), b'data')
+
+            stats = oc.stats
+
+            self.assertEquals(stats.hits, 1)
+            self.assertEquals(stats.misses, 1)
+            self.assertEquals(stats.evictions, 0)
+            self.assertEquals(stats.count, 1)
+            self.assertEquals(stats.bytes, 4)
+
+    def test_evict(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            cache_path = os.path.join(temp_path, 'cache')
+
+            oc = \
+                templatelayer.output_cache.OutputCache(
+                    path=cache_path,
+                    max_bytes=8)
+
+            with open('source.bin', 'wb') as f:
+                f.write(b'data')
+
+            oc.store('one', 'source.bin')
+            oc.store('two', 'source.bin')
+
+            # Make "one" the least-recently-used and then use "two".
+
+            past_time = time.time() - 100
+            os.utime(
+                os.path.join(cache_path, 'one.output'),
+                (past_time, past_time))
+
+            self.assertTrue(oc.fetch('two', 'output.bin'))
+
+            oc.store('three', 'source.bin')
+
+            self.assertFalse(oc.fetch('one', 'output.bin'))
+            self.assertTrue(oc.fetch('two', 'output.bin'))
+            self.assertTrue(oc.fetch('three', 'output.bin'))
+
+            stats = oc.stats
+
+            self.assertEquals(stats.evictions, 1)
+            self.assertEquals(stats.count, 2)
@@ -0,0 +1,120 @@
+import unittest
+
+import templatelayer.raw_template
+import templatelayer.template_layout
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+
+class TestRawTemplate(unittest.TestCase):
+    def test_write_and_open(self):
+        with templatelayer.testing_common.temp_path():
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    300,
+                    color=(1, 2, 3))
+
+            template_im.putpixel((3, 299), (4, 5, 6))
+            template_im.save('template.png')
+
+            templatelayer.raw_template.write_raw_template(
+                template_im,
+                'template.raw')
+
+            self.assertTrue(
+                templatelayer.raw_template.is_raw_template('template.raw'))
+
+            self.assertFalse(
+                templatelayer.raw_template.is_raw_template('template.png'))
+
+            rt = templatelayer.raw_template.RawTemplate('template.raw')
+
+            self.assertEquals(rt.mode, 'RGB')
+            self.assertEquals(rt.size, (4, 300))
+            self.assertEquals(rt.image.mode, 'RGBX')
+            self.assertTrue(rt.image.readonly)
+
+            canvas_im = rt.new_canvas()
+
+            self.assertEquals(canvas_im.mode, 'RGB')
+            self.assertEquals(
+                list(canvas_im.getdata()),
+                list(template_im.getdata()))
+
+    def test_write__rgba(self):
+        with templatelayer.testing_common.temp_path():
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    4,
+                    color=(1, 2, 3)).convert('RGBA')
+
+            templatelayer.raw_template.write_raw_template(
+                template_im,
+                'template.raw')
+
+            rt = templatelayer.raw_template.RawTemplate('template.raw')
+
+            self.assertEquals(rt.mode, 'RGBA')
+            self.assertEquals(rt.new_canvas().getpixel((0, 0)), (1, 2, 3, 255))
+
+    def test_open__not_raw(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                4,
+                4).save('template.png')
+
+            try:
+                templatelayer.raw_template.RawTemplate('template.png')
+            except templatelayer.raw_template.RawTemplateException:
+                pass
+            else:
+                raise Exception("Expected exception for non-raw template.")
+
+    def test_compiled_template(self):
+        with templatelayer.testing_common.temp_path():
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2,
+                    color=(1, 2, 3))
+
+            templatelayer.raw_template.write_raw_template(
+                template_im,
+                'template.raw')
+
+            rt = templatelayer.raw_template.RawTemplate('template.raw')
+
+            ct = \
+                templatelayer.template_layout.CompiledTemplate(
+                    rt.image,
+                    _TEST_LAYOUT_CONFIG,
+                    canvas_mode=rt.mode)
+
+            self.assertEquals(ct.mode, 'RGB')
+
+            component_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    2,
+                    color=(7, 7, 7))
+
+            im = ct.render({ 'left': component_im })
+
+            self.assertEquals(im.mode, 'RGB')
+            self.assertEquals(im.getpixel((0, 0)), (7, 7, 7))
+            self.assertEquals(im.getpixel((3, 0)), (1, 2, 3))
+
+            # The mapped template is unchanged.
+            self.assertEquals(rt.image.getpixel((0, 0)), (1, 2, 3, 255))
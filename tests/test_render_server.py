@@ -0,0 +1,227 @@
+import unittest
+import os
+import stat
+import json
+import time
+import threading
+
+import PIL.Image
+
+import templatelayer.render_server
+import templatelayer.render_client
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        }
+    }
+}
+
+# How long to wait for a server to start listening.
+_START_TIMEOUT_S = 10
+
+
+class TestRenderServer(unittest.TestCase):
+    def _start(self, socket_path):
+        rs = templatelayer.render_server.RenderServer(socket_path)
+
+        # A daemon, so that a server that never starts can't hang the run.
+        t = threading.Thread(target=rs.serve_forever)
+        t.daemon = True
+        t.start()
+
+        deadline = time.time() + _START_TIMEOUT_S
+
+        while os.path.exists(socket_path) is False:
+            if t.is_alive() is False:
+                raise Exception("Server stopped before listening.")
+
+            if time.time() > deadline:
+                raise Exception("Server did not start listening.")
+
+            time.sleep(0.01)
+
+        return rs, t
+
+    def test_render(self):
+        with templatelayer.testing_common.temp_path() as temp_path:
+            with open('layout.json', 'w') as f:
+                json.dump(_TEST_LAYOUT_CONFIG, f)
+
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color=(9, 9, 9)).save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('left.png')
+
+            templatelayer.testing_common.get_new_image(
+                3,
+                3).save('wrong.png')
+
+            socket_path = os.path.join(temp_path, 'server.sock')
+            rs, t = self._start(socket_path)
+
+            try:
+                with templatelayer.render_client.RenderClient(socket_path) as rc:
+                    for i in range(2):
+                        rc.render(
+                            'layout.json',
+                            'template.png',
+                            [('left', 'left.png')],
+                            'output{}.png'.format(i))
+
+                    try:
+                        rc.render(
+                            'layout.json',
+                            'template.png',
+                            [('left', 'wrong.png')],
+                            'output.png')
+                    except templatelayer.render_client.RenderServerException as e:
+                        self.assertTrue(
+                            str(e).startswith(
+                                'PlaceholderNotCompatibleException: '))
+                    else:
+                        raise Exception("Expected render exception.")
+            finally:
+                rs.shutdown()
+                t.join()
+
+            self.assertFalse(os.path.exists(socket_path))
+
+            for i in range(2):
+                im = PIL.Image.open('output{}.png'.format(i))
+                self.assertEquals(im.getpixel((0, 0)), (1, 1, 1))
+                self.assertEquals(im.getpixel((3, 0)), (9, 9, 9))
+
+    def test_get_compiled_template(self):
+        with templatelayer.testing_common.temp_path():
+            with open('layout.json', 'w') as f:
+                json.dump(_TEST_LAYOUT_CONFIG, f)
+
+            templatelayer.testing_common.get_new_image(
+                4,
+                2).save('template.png')
+
+            rs = templatelayer.render_server.RenderServer('unused.sock')
+
+            ct = rs.get_compiled_template('template.png', 'layout.json')
+            self.assertIs(rs.get_compiled_template('template.png', 'layout.json'), ct)
+
+            # A changed template is loaded again.
+
+            templatelayer.testing_common.get_new_image(
+                4,
+                4).save('template.png')
+
+            future_time = time.time() + 10
+            os.utime('template.png', (future_time, future_time))
+
+            updated_ct = \
+                rs.get_compiled_template(
+                    'template.png',
+                    'layout.json')
+
+            self.assertEquals(updated_ct.size, (4, 4))
+
+    def test_get_compiled_template__evicts(self):
+        with templatelayer.testing_common.temp_path():
+            with open('layout.json', 'w') as f:
+                json.dump(_TEST_LAYOUT_CONFIG, f)
+
+            # 4x2 RGB templates take 32 bytes each.
+
+            for filename in ('first.png', 'second.png'):
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2).save(filename)
+
+            rs = \
+                templatelayer.render_server.RenderServer(
+                    'unused.sock',
+                    max_template_bytes=32)
+
+            ct = rs.get_compiled_template('first.png', 'layout.json')
+            self.assertEquals(ct.image_bytes, 32)
+
+            rs.get_compiled_template('second.png', 'layout.json')
+
+            self.assertIsNot(
+                rs.get_compiled_template('first.png', 'layout.json'),
+                ct)
+
+    def test_render__encoding_and_layout_format(self):
+        with templatelayer.testing_common.temp_path():
+            with open('layout.ndjson', 'w') as f:
+                for name, parameters in _TEST_LAYOUT_CONFIG['placeholders'].items():
+                    f.write(json.dumps(dict(parameters, name=name)) + '\n')
+
+            templatelayer.testing_common.get_new_image(
+                4,
+                2,
+                color=(9, 9, 9)).save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(200, 200, 200)).save('left.png')
+
+            rs = \
+                templatelayer.render_server.RenderServer(
+                    'unused.sock',
+                    format_='JPEG',
+                    preset='smallest',
+                    encoder_options={'quality': 50})
+
+            rs.render(
+                'layout.ndjson',
+                'template.png',
+                [('left', 'left.png')],
+                'output.png')
+
+            im = PIL.Image.open('output.png')
+            self.assertEquals(im.format, 'JPEG')
+
+    def test_render__replaces_linked_output(self):
+        with templatelayer.testing_common.temp_path():
+            with open('layout.json', 'w') as f:
+                json.dump(_TEST_LAYOUT_CONFIG, f)
+
+            templatelayer.testing_common.get_new_image(
+                4,
+                2).save('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                2,
+                color=(1, 1, 1)).save('left.png')
+
+            # As an output taken from an output cache would be.
+
+            with open('entry.output', 'wb') as f:
+                f.write(b'cached')
+
+            os.chmod('entry.output', stat.S_IRUSR)
+            os.link('entry.output', 'output.png')
+
+            rs = templatelayer.render_server.RenderServer('unused.sock')
+
+            rs.render(
+                'layout.json',
+                'template.png',
+                [('left', 'left.png')],
+                'output.png')
+
+            with open('entry.output', 'rb') as f:
+                self.assertEquals(f.read(), b'cached')
+
+            im = PIL.Image.open('output.png')
+            self.assertEquals(im.getpixel((0, 0)), (1, 1, 1))
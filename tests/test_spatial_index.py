@@ -0,0 +1,95 @@
+import unittest
+
+import templatelayer.spatial_index
+
+
+class TestGridIndex(unittest.TestCase):
+    def _get_index(self, rectangles):
+        """Rectangles are (left, top, width, height)."""
+
+        gi = \
+            templatelayer.spatial_index.GridIndex(
+                [r[0] for r in rectangles],
+                [r[1] for r in rectangles],
+                [r[2] for r in rectangles],
+                [r[3] for r in rectangles])
+
+        return gi
+
+    def test_get_position_at(self):
+        # One large rectangle surrounded by small ones, and one without area.
+
+        rectangles = [
+            (10, 10, 80, 80),
+            (0, 0, 10, 10),
+            (90, 90, 10, 10),
+            (-5, 50, 5, 5),
+            (0, 95, 0, 5),
+        ]
+
+        gi = self._get_index(rectangles)
+
+        self.assertEquals(gi.get_position_at(50, 50), 0)
+        self.assertEquals(gi.get_position_at(89, 89), 0)
+        self.assertEquals(gi.get_position_at(9, 9), 1)
+        self.assertEquals(gi.get_position_at(99, 99), 2)
+        self.assertEquals(gi.get_position_at(-5, 54), 3)
+
+        self.assertIsNone(gi.get_position_at(0, 95))
+        self.assertIsNone(gi.get_position_at(95, 0))
+        self.assertIsNone(gi.get_position_at(100, 100))
+        self.assertIsNone(gi.get_position_at(-100, -100))
+
+    def test_get_positions_in(self):
+        rectangles = [
+            (10, 10, 80, 80),
+            (0, 0, 10, 10),
+            (90, 90, 10, 10),
+        ]
+
+        gi = self._get_index(rectangles)
+
+        self.assertEquals(gi.get_positions_in(5, 5, 10, 10), [0, 1])
+        self.assertEquals(gi.get_positions_in(0, 0, 100, 100), [0, 1, 2])
+        self.assertEquals(gi.get_positions_in(90, 0, 10, 10), [])
+        self.assertEquals(gi.get_positions_in(0, 0, 0, 0), [])
+
+    def test_empty(self):
+        gi = self._get_index([(0, 0, 0, 0)])
+
+        self.assertIsNone(gi.get_position_at(0, 0))
+        self.assertEquals(gi.get_positions_in(0, 0, 10, 10), [])
+
+    def test_skewed(self):
+        # A dense block of small rectangles in one corner and a few sparse
+        # ones far away. The dense block must still be spread over many
+        # cells.
+
+        rectangles = [
+            (x * 10, y * 10, 10, 10)
+            for y
+            in range(20)
+            for x
+            in range(20)
+        ]
+
+        rectangles += [
+            (10000 + k * 1000, 10000 + k * 1000, 5, 5)
+            for k
+            in range(20)
+        ]
+
+        gi = self._get_index(rectangles)
+
+        for cell in gi._iterate_cells(0, 0, 200, 200):
+            self.assertTrue(len(gi._get_members(cell)) <= 4)
+
+        self.assertEquals(gi.get_position_at(0, 0), 0)
+        self.assertEquals(gi.get_position_at(199, 199), 399)
+        self.assertEquals(gi.get_position_at(15004, 15004), 405)
+
+        self.assertIsNone(gi.get_position_at(200, 200))
+        self.assertIsNone(gi.get_position_at(15005, 15005))
+
+        self.assertEquals(gi.get_positions_in(15, 15, 10, 10), [21, 22, 41, 42])
+        self.assertEquals(gi.get_positions_in(195, 195, 10000, 10000), [399, 400])
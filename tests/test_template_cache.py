@@ -0,0 +1,121 @@
+import unittest
+import os
+import time
+
+import templatelayer.template_cache
+import templatelayer.testing_common
+
+
+class TestTemplateImageCache(unittest.TestCase):
+    def test_get_image_bytes(self):
+        im = templatelayer.testing_common.get_new_image(10, 20)
+        self.assertEquals(templatelayer.template_cache.get_image_bytes(im), 800)
+
+        im = im.convert('L')
+        self.assertEquals(templatelayer.template_cache.get_image_bytes(im), 200)
+
+    def test_get(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                10,
+                10,
+                color=(1, 2, 3)).save('template.png')
+
+            tic = templatelayer.template_cache.TemplateImageCache()
+
+            im = tic.get('template.png')
+            self.assertEquals(im.getpixel((0, 0)), (1, 2, 3))
+
+            # Modifying a copy must not affect the cached image.
+            im.putpixel((0, 0), (9, 9, 9))
+
+            im = tic.get('template.png')
+            self.assertEquals(im.getpixel((0, 0)), (1, 2, 3))
+
+            stats = tic.stats
+            self.assertEquals(stats.hits, 1)
+            self.assertEquals(stats.misses, 1)
+            self.assertEquals(stats.evictions, 0)
+            self.assertEquals(stats.count, 1)
+            self.assertEquals(stats.bytes, 400)
+
+    def test_get__modified(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                10,
+                10,
+                color=(1, 2, 3)).save('template.png')
+
+            tic = templatelayer.template_cache.TemplateImageCache()
+            tic.get('template.png')
+
+            templatelayer.testing_common.get_new_image(
+                10,
+                10,
+                color=(4, 5, 6)).save('template.png')
+
+            # Make sure that the modification-time changes.
+            future_time = time.time() + 10
+            os.utime('template.png', (future_time, future_time))
+
+            im = tic.get('template.png')
+            self.assertEquals(im.getpixel((0, 0)), (4, 5, 6))
+
+            self.assertEquals(tic.stats.misses, 2)
+
+    def test_get__key_by_content(self):
+        with templatelayer.testing_common.temp_path():
+            im = templatelayer.testing_common.get_new_image(10, 10)
+            im.save('template1.png')
+            im.save('template2.png')
+
+            tic = \
+                templatelayer.template_cache.TemplateImageCache(
+                    key_by_content=True)
+
+            tic.get('template1.png')
+            tic.get('template2.png')
+
+            self.assertEquals(tic.stats.hits, 1)
+            self.assertEquals(tic.stats.misses, 1)
+
+    def test_evict(self):
+        with templatelayer.testing_common.temp_path():
+            for i in range(3):
+                templatelayer.testing_common.get_new_image(
+                    10,
+                    10).save('template{}.png'.format(i))
+
+            # Room for two templates.
+            tic = templatelayer.template_cache.TemplateImageCache(max_bytes=800)
+
+            tic.get('template0.png')
+            tic.get('template1.png')
+
+            # Make (0) the most-recently used.
+            tic.get('template0.png')
+
+            tic.get('template2.png')
+
+            stats = tic.stats
+            self.assertEquals(stats.evictions, 1)
+            self.assertEquals(stats.count, 2)
+            self.assertEquals(stats.bytes, 800)
+
+            tic.get('template0.png')
+            self.assertEquals(tic.stats.hits, 2)
+
+            tic.get('template1.png')
+            self.assertEquals(tic.stats.misses, 4)
+
+    def test_get__too_large(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                10,
+                10).save('template.png')
+
+            tic = templatelayer.template_cache.TemplateImageCache(max_bytes=10)
+            im = tic.get('template.png')
+
+            self.assertEquals(im.size, (10, 10))
+            self.assertEquals(tic.stats.count, 0)
@@ -91,13 +91,10 @@ class TestSimpleTemplateLayout(unittest.TestCase):
             "height": 100
         }
 
-        placeholder_configs = {}
-
         actual = \
             tl._parse_and_validate_placeholder(
                 'test-placeholder',
-                parameters,
-                placeholder_configs)
+                parameters)
 
         expected = \
             templatelayer.template_layout._PLACEHOLDER(
@@ -192,6 +189,104 @@ class TestSimpleTemplateLayout(unittest.TestCase):
         else:
             raise Exception("Expected overlap.")
 
+    def test_assert_no_overlap__contains(self):
+        tl = self._get_basic_object()
+
+        ph = templatelayer.template_layout._PLACEHOLDER(name='big', top=0, left=0, height=100, width=100)
+        other_ph = templatelayer.template_layout._PLACEHOLDER(name='small', top=20, left=20, height=20, width=20)
+
+        try:
+            tl._assert_no_overlap(ph, other_ph)
+        except templatelayer.template_layout.PlaceholderOverlapError as e:
+            expected = "Placeholder [big] overlaps with placeholder [small]."
+            if str(e) != expected:
+                raise
+        else:
+            raise Exception("Expected overlap.")
+
+    def test_assert_no_overlaps__ok(self):
+        tl = self._get_basic_object()
+
+        # A 10x10 grid of adjoining placeholders.
+
+        placeholders = [
+            templatelayer.template_layout._PLACEHOLDER(name='{}-{}'.format(i, j), top=i * 10, left=j * 10, height=10, width=10)
+            for i in range(10)
+            for j in range(10)
+        ]
+
+        tl._assert_no_overlaps(placeholders)
+
+    def test_assert_no_overlaps__overlap(self):
+        tl = self._get_basic_object()
+
+        placeholders = [
+            templatelayer.template_layout._PLACEHOLDER(name='{}-{}'.format(i, j), top=i * 10, left=j * 10, height=10, width=10)
+            for i in range(10)
+            for j in range(10)
+        ]
+
+        # Spans two placeholders in the middle of the grid, but shares no
+        # edges with them.
+
+        ph = templatelayer.template_layout._PLACEHOLDER(name='intruder', top=52, left=42, height=5, width=10)
+        placeholders.append(ph)
+
+        try:
+            tl._assert_no_overlaps(placeholders)
+        except templatelayer.template_layout.PlaceholderOverlapError as e:
+            expected = "Placeholder [intruder] overlaps with placeholder [5-4]."
+            if str(e) != expected:
+                raise
+        else:
+            raise Exception("Expected overlap.")
+
+    def test_assert_no_overlaps__vertical_neighbor(self):
+        tl = self._get_basic_object()
+
+        placeholders = [
+            templatelayer.template_layout._PLACEHOLDER(name='tall', top=0, left=0, height=100, width=10),
+            templatelayer.template_layout._PLACEHOLDER(name='wide', top=90, left=5, height=20, width=100),
+        ]
+
+        try:
+            tl._assert_no_overlaps(placeholders)
+        except templatelayer.template_layout.PlaceholderOverlapError as e:
+            expected = "Placeholder [wide] overlaps with placeholder [tall]."
+            if str(e) != expected:
+                raise
+        else:
+            raise Exception("Expected overlap.")
+
+    def test_parse_and_validate__overlap(self):
+        config = u"""\
+{
+    "placeholders": {
+        "top-left": {
+            "left": 0,
+            "top": 0,
+            "width": 60,
+            "height": 100
+        },
+        "top-right": {
+            "left": 50,
+            "top": 0,
+            "width": 50,
+            "height": 100
+        }
+    }
+}
+"""
+
+        try:
+            self._get_basic_object(config=config)
+        except templatelayer.template_layout.PlaceholderOverlapError as e:
+            expected = "Placeholder [top-right] overlaps with placeholder [top-left]."
+            if str(e) != expected:
+                raise
+        else:
+            raise Exception("Expected overlap.")
+
     def test_supported_placeholder_names(self):
         tl = self._get_basic_object()
 
@@ -526,6 +621,209 @@ class TestSimpleTemplateLayout(unittest.TestCase):
 
         self.assertEquals(actual_current_pixels, expected_current_pixels)
 
+    def test_apply_component__mask_alpha(self):
+        config = u"""\
+{
+    "placeholders": {
+        "masked": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 1,
+            "mask": "alpha"
+        }
+    }
+}
+"""
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                2,
+                1,
+                color=(100, 100, 100))
+
+        tl = self._get_basic_object(template_im=template_im, config=config)
+
+        placeholder_im = PIL.Image.new('RGBA', (2, 1), (200, 0, 0, 255))
+        placeholder_im.putpixel((1, 0), (200, 0, 0, 0))
+
+        tl.apply_component('masked', placeholder_im)
+
+        self.assertEquals(tl.resource.getpixel((0, 0)), (200, 0, 0))
+        self.assertEquals(tl.resource.getpixel((1, 0)), (100, 100, 100))
+
+    def test_apply_component__mask_image(self):
+        config = u"""\
+{
+    "placeholders": {
+        "masked": {
+            "left": 1,
+            "top": 0,
+            "width": 2,
+            "height": 1,
+            "mask": "mask.png"
+        }
+    }
+}
+"""
+
+        with templatelayer.testing_common.temp_path():
+            mask_im = PIL.Image.new('L', (2, 1), 0)
+            mask_im.putpixel((0, 0), 255)
+            mask_im.save('mask.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    3,
+                    1,
+                    color=(100, 100, 100))
+
+            tl = self._get_basic_object(template_im=template_im, config=config)
+
+            placeholder_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    1,
+                    color=(200, 0, 0))
+
+            tl.apply_component('masked', placeholder_im)
+
+            actual = list(self._get_pixels(tl.resource))
+            expected = [(100, 100, 100), (200, 0, 0), (100, 100, 100)]
+
+            self.assertEquals(actual, expected)
+
+    def test_apply_component__mask_alpha__transparent_template(self):
+        config = u"""\
+{
+    "placeholders": {
+        "masked": {
+            "left": 0,
+            "top": 0,
+            "width": 1,
+            "height": 1,
+            "mask": "alpha"
+        }
+    }
+}
+"""
+
+        template_im = PIL.Image.new('RGBA', (1, 1), (0, 0, 0, 0))
+        tl = self._get_basic_object(template_im=template_im, config=config)
+
+        placeholder_im = PIL.Image.new('RGBA', (1, 1), (200, 0, 0, 128))
+        tl.apply_component('masked', placeholder_im)
+
+        # Pasting would have just copied the component. Compositing over a
+        # transparent template leaves the component as-is, too, but the
+        # alpha has to come out right.
+        self.assertEquals(tl.resource.getpixel((0, 0)), (200, 0, 0, 128))
+
+    def test_apply_component__fit_contain(self):
+        config = u"""\
+{
+    "placeholders": {
+        "fitted": {
+            "left": 1,
+            "top": 0,
+            "width": 4,
+            "height": 4,
+            "fit": "contain"
+        }
+    }
+}
+"""
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                6,
+                4,
+                color=(100, 100, 100))
+
+        tl = self._get_basic_object(template_im=template_im, config=config)
+
+        placeholder_im = \
+            templatelayer.testing_common.get_new_image(
+                8,
+                4,
+                color=(200, 0, 0))
+
+        tl.apply_component('fitted', placeholder_im)
+
+        # The component is scaled to 4x2 and centered vertically.
+
+        self.assertEquals(tl.resource.getpixel((1, 0)), (100, 100, 100))
+        self.assertEquals(tl.resource.getpixel((1, 1)), (200, 0, 0))
+        self.assertEquals(tl.resource.getpixel((4, 2)), (200, 0, 0))
+        self.assertEquals(tl.resource.getpixel((4, 3)), (100, 100, 100))
+        self.assertEquals(tl.resource.getpixel((5, 1)), (100, 100, 100))
+
+    def test_apply_component__fit_contain__mask(self):
+        config = u"""\
+{
+    "placeholders": {
+        "fitted": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 4,
+            "fit": "contain",
+            "mask": "mask.png"
+        }
+    }
+}
+"""
+
+        with templatelayer.testing_common.temp_path():
+            # Only the bottom half of the placeholder is unmasked.
+
+            mask_im = PIL.Image.new('L', (2, 4), 0)
+            mask_im.paste(255, (0, 2, 2, 4))
+            mask_im.save('mask.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    2,
+                    4,
+                    color=(100, 100, 100))
+
+            tl = self._get_basic_object(template_im=template_im, config=config)
+
+            placeholder_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    4,
+                    color=(200, 0, 0))
+
+            tl.apply_component('fitted', placeholder_im)
+
+            actual = list(self._get_pixels(tl.resource))
+
+            expected = \
+                [(100, 100, 100)] * 4 + \
+                [(200, 0, 0)] * 2 + \
+                [(100, 100, 100)] * 2
+
+            self.assertEquals(actual, expected)
+
+    def test_parse_and_validate_placeholder__invalid_fit(self):
+        tl = self._get_basic_object()
+
+        parameters = {
+            "left": 0,
+            "top": 0,
+            "width": 50,
+            "height": 100,
+            "fit": "shrink"
+        }
+
+        try:
+            tl._parse_and_validate_placeholder('test-placeholder', parameters)
+        except AssertionError:
+            pass
+        else:
+            raise Exception("Expected assertion for invalid fit.")
+
     def test_apply_component__unknown_placeholder(self):
         tl = self._get_basic_object()
 
@@ -683,3 +981,459 @@ class TestSimpleTemplateLayout(unittest.TestCase):
 
         self.assertEquals(tl.placeholder_total_coverage, (24, 24))
         self.assertTrue(tl.is_covered)
+
+    def test_placeholder_total_coverage__hole(self):
+        # The bounding-box of these placeholders covers the whole template,
+        # but the center pixels aren't covered.
+
+        small_config = u"""\
+{
+    "placeholders": {
+        "top": {
+            "left": 0,
+            "top": 0,
+            "width": 4,
+            "height": 1
+        },
+        "left": {
+            "left": 0,
+            "top": 1,
+            "width": 1,
+            "height": 2
+        },
+        "right": {
+            "left": 3,
+            "top": 1,
+            "width": 1,
+            "height": 2
+        },
+        "bottom": {
+            "left": 0,
+            "top": 3,
+            "width": 4,
+            "height": 1
+        }
+    }
+}
+"""
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                4)
+
+        tl = self._get_basic_object(
+                template_im=template_im,
+                config=small_config)
+
+        self.assertEquals(tl.placeholder_total_coverage, (12, 16))
+        self.assertFalse(tl.is_covered)
+
+        expected = [
+            templatelayer.template_layout._REGION(top=1, left=1, height=2, width=2),
+        ]
+
+        self.assertEquals(tl.uncovered_regions, expected)
+
+    def test_uncovered_regions(self):
+        small_config = u"""\
+{
+    "placeholders": {
+        "top-left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 2
+        },
+        "middle-center": {
+            "left": 0,
+            "top": 2,
+            "width": 4,
+            "height": 2
+        }
+    }
+}
+"""
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                6)
+
+        tl = self._get_basic_object(
+                template_im=template_im,
+                config=small_config)
+
+        expected = [
+            templatelayer.template_layout._REGION(top=0, left=2, height=2, width=2),
+            templatelayer.template_layout._REGION(top=4, left=0, height=2, width=4),
+        ]
+
+        self.assertEquals(tl.uncovered_regions, expected)
+
+        # Nothing is uncovered once every pixel has a placeholder.
+
+        tl = self._get_basic_object()
+        self.assertTrue(tl.is_covered)
+        self.assertEquals(tl.uncovered_regions, [])
+
+    def test_placeholder_at(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                300)
+
+        lc = json.loads(_TEST_GOOD_LAYOUT_CONFIG)
+        tl = templatelayer.template_layout.SimpleTemplateLayout(template_im, lc)
+
+        self.assertEquals(tl.placeholder_at(0, 0).name, 'top-left')
+        self.assertEquals(tl.placeholder_at(49, 99).name, 'top-left')
+        self.assertEquals(tl.placeholder_at(50, 99).name, 'top-right')
+        self.assertEquals(tl.placeholder_at(50, 100).name, 'middle-center')
+        self.assertEquals(tl.placeholder_at(99, 299).name, 'bottom-center')
+
+        self.assertIsNone(tl.placeholder_at(100, 0))
+        self.assertIsNone(tl.placeholder_at(0, 300))
+        self.assertIsNone(tl.placeholder_at(-1, 0))
+
+    def test_placeholders_in(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                300)
+
+        lc = json.loads(_TEST_GOOD_LAYOUT_CONFIG)
+        tl = templatelayer.template_layout.SimpleTemplateLayout(template_im, lc)
+
+        def get_names(rect):
+            return [ph.name for ph in tl.placeholders_in(rect)]
+
+        region = \
+            templatelayer.template_layout._REGION(
+                top=90,
+                left=40,
+                height=20,
+                width=20)
+
+        self.assertEquals(
+            get_names(region),
+            ['top-left', 'top-right', 'middle-center'])
+
+        # Right and bottom edges are exclusive.
+        self.assertEquals(get_names((0, 0, 100, 50)), ['top-left'])
+
+        self.assertEquals(
+            get_names((0, 0, 300, 100)),
+            ['top-left', 'top-right', 'middle-center', 'bottom-center'])
+
+        self.assertEquals(get_names((300, 0, 10, 10)), [])
+        self.assertEquals(get_names((0, 0, 0, 10)), [])
+
+    def test_validate_bounds(self):
+        config = {
+            'placeholders': {
+                'inside': {
+                    'left': 0,
+                    'top': 0,
+                    'width': 50,
+                    'height': 100,
+                },
+                'outside': {
+                    'left': 50,
+                    'top': 250,
+                    'width': 50,
+                    'height': 51,
+                },
+            },
+        }
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                300)
+
+        # Clipped by default.
+
+        tl = templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                config)
+
+        self.assertEquals(tl.placeholder_total_coverage, (7500, 30000))
+
+        try:
+            templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                config,
+                validate_bounds=True)
+        except templatelayer.template_layout.PlaceholderOutOfBoundsError as e:
+            self.assertEquals(
+                str(e),
+                "Placeholder [outside] (50, 250) - (100, 301) is not within "
+                "the template (100, 300).")
+        else:
+            raise Exception("Expected out-of-bounds error.")
+
+        try:
+            templatelayer.template_layout.CompiledTemplate(
+                template_im,
+                config,
+                validate_bounds=True)
+        except templatelayer.template_layout.PlaceholderOutOfBoundsError:
+            pass
+        else:
+            raise Exception("Expected out-of-bounds error.")
+
+        config['placeholders']['outside']['height'] = 50
+
+        templatelayer.template_layout.CompiledTemplate(
+            template_im,
+            config,
+            validate_bounds=True)
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_new_layout(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                300)
+
+        lc = json.loads(_TEST_GOOD_LAYOUT_CONFIG)
+        ct = templatelayer.template_layout.CompiledTemplate(template_im, lc)
+
+        self.assertEquals(ct.size, (100, 300))
+        self.assertEquals(ct.mode, 'RGB')
+
+        # Apply the same placeholder in two separate renders.
+
+        for color in [(1, 1, 1), (2, 2, 2)]:
+            tl = ct.new_layout()
+            self.assertEquals(tl.applied_placeholder_names, [])
+
+            ph = tl.get_placeholder_config('top-left')
+            placeholder_im = \
+                templatelayer.testing_common.get_new_image(
+                    ph.width,
+                    ph.height,
+                    color=color)
+
+            tl.apply_component('top-left', placeholder_im)
+
+            self.assertEquals(tl.applied_placeholder_names, ['top-left'])
+            self.assertEquals(tl.resource.getpixel((0, 0)), color)
+
+        # Neither the compiled template nor the original image are modified.
+
+        self.assertEquals(ct.new_layout().resource.getpixel((0, 0)), (0, 0, 0))
+        self.assertEquals(template_im.getpixel((0, 0)), (0, 0, 0))
+
+    def test_render(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                300)
+
+        lc = json.loads(_TEST_GOOD_LAYOUT_CONFIG)
+        ct = templatelayer.template_layout.CompiledTemplate(template_im, lc)
+
+        placeholder_im = \
+            templatelayer.testing_common.get_new_image(
+                100,
+                100,
+                color=(3, 3, 3))
+
+        im = ct.render({ 'bottom-center': placeholder_im })
+
+        self.assertEquals(im.getpixel((0, 0)), (0, 0, 0))
+        self.assertEquals(im.getpixel((0, 299)), (3, 3, 3))
+
+    def test_masks(self):
+        config = {
+            "placeholders": {
+                "masked": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "mask.png"
+                },
+                "alpha": {
+                    "left": 2,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "alpha"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            PIL.Image.new('LA', (2, 2), (0, 7)).save('mask.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            ct = \
+                templatelayer.template_layout.CompiledTemplate(
+                    template_im,
+                    config)
+
+            self.assertEquals(sorted(ct.masks.keys()), ['masked'])
+
+            # The alpha band is used as the mask.
+            mask_im = ct.masks['masked']
+            self.assertEquals(mask_im.mode, 'L')
+            self.assertEquals(mask_im.getpixel((0, 0)), 7)
+
+            # Every layout shares the loaded masks.
+            self.assertIs(ct.new_layout().get_mask('masked'), mask_im)
+
+    def test_masks__not_compatible(self):
+        config = {
+            "placeholders": {
+                "masked": {
+                    "left": 0,
+                    "top": 0,
+                    "width": 2,
+                    "height": 2,
+                    "mask": "mask.png"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            PIL.Image.new('L', (3, 3)).save('mask.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    2)
+
+            try:
+                templatelayer.template_layout.CompiledTemplate(
+                    template_im,
+                    config)
+            except templatelayer.template_layout.PlaceholderNotCompatibleException:
+                pass
+            else:
+                raise Exception("Expected compatibility exception.")
+
+
+class TestPlaceholderTable(unittest.TestCase):
+    def test_mapping(self):
+        placeholders = [
+            templatelayer.template_layout._PLACEHOLDER(name='b', top=0, left=0, height=1, width=2),
+            templatelayer.template_layout._PLACEHOLDER(name='a', top=1, left=0, height=1, width=2, fit='contain'),
+        ]
+
+        pt = templatelayer.template_layout.PlaceholderTable.from_placeholders(placeholders)
+
+        self.assertEquals(list(pt.keys()), ['b', 'a'])
+        self.assertEquals(list(pt.values()), placeholders)
+        self.assertEquals(pt['a'], placeholders[1])
+        self.assertEquals(pt.get_index('a'), 1)
+        self.assertIsNone(pt.get_index('c'))
+        self.assertEquals(len(pt), 2)
+        self.assertTrue('b' in pt)
+        self.assertFalse('c' in pt)
+
+        expected = {
+            'a': placeholders[1],
+            'b': placeholders[0],
+        }
+
+        self.assertEquals(pt, expected)
+
+        self.assertEquals(pt.tops.typecode, 'i')
+        self.assertEquals(pt.get_covered_area(2, 2), 4)
+        self.assertEquals(pt.get_covered_area(1, 1), 1)
+
+    def test_assert_in_bounds(self):
+        placeholders = [
+            templatelayer.template_layout._PLACEHOLDER(name='a', top=0, left=0, height=2, width=2),
+            templatelayer.template_layout._PLACEHOLDER(name='b', top=0, left=-1, height=1, width=1),
+            templatelayer.template_layout._PLACEHOLDER(name='c', top=2, left=0, height=1, width=4),
+        ]
+
+        pt = templatelayer.template_layout.PlaceholderTable.from_placeholders(placeholders[:1])
+        pt.assert_in_bounds(2, 2)
+
+        for size in ((1, 2), (2, 1)):
+            try:
+                pt.assert_in_bounds(*size)
+            except templatelayer.template_layout.PlaceholderOutOfBoundsError:
+                pass
+            else:
+                raise Exception("Expected out-of-bounds error: {}".format(size))
+
+        for ph in placeholders[1:]:
+            pt = templatelayer.template_layout.PlaceholderTable.from_placeholders([placeholders[0], ph])
+
+            try:
+                pt.assert_in_bounds(3, 3)
+            except templatelayer.template_layout.PlaceholderOutOfBoundsError as e:
+                self.assertTrue(str(e).startswith("Placeholder [{}] ".format(ph.name)))
+            else:
+                raise Exception("Expected out-of-bounds error: [{}]".format(ph.name))
+
+    def test_mapping__not_compact(self):
+        ph = templatelayer.template_layout._PLACEHOLDER(name='float', top=0.5, left=0, height=1, width=1)
+        pt = templatelayer.template_layout.PlaceholderTable.from_placeholders([ph])
+
+        self.assertEquals(pt['float'], ph)
+
+    def test_applied_state(self):
+        # Enough placeholders to span more than one byte of applied-state.
+
+        config = {
+            'placeholders': {
+                str(i): {
+                    'left': i,
+                    'top': 0,
+                    'width': 1,
+                    'height': 1,
+                }
+                for i
+                in range(10)
+            },
+        }
+
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                10,
+                1)
+
+        tl = templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                config)
+
+        component_im = \
+            templatelayer.testing_common.get_new_image(
+                1,
+                1)
+
+        for name in ('9', '0', '3'):
+            tl.apply_component(name, component_im)
+
+        self.assertEquals(tl.applied_placeholder_names, ['0', '3', '9'])
+
+        self.assertEquals(
+            tl.unapplied_placeholder_names,
+            ['1', '2', '4', '5', '6', '7', '8'])
+
+        self.assertFalse(tl.is_completely_applied)
+
+        for name in tl.unapplied_placeholder_names:
+            tl.apply_component(name, component_im)
+
+        self.assertEquals(tl.unapplied_placeholder_names, [])
+        self.assertTrue(tl.is_completely_applied)
+
+        try:
+            tl.apply_component('3', component_im)
+        except AssertionError:
+            pass
+        else:
+            raise Exception("Expected failure for reapplied placeholder.")
@@ -0,0 +1,319 @@
+import unittest
+import io
+
+import PIL.Image
+
+import templatelayer.tiled
+import templatelayer.template_layout
+import templatelayer.raw_template
+import templatelayer.testing_common
+
+_TEST_LAYOUT_CONFIG = {
+    "placeholders": {
+        "top-left": {
+            "left": 0,
+            "top": 0,
+            "width": 2,
+            "height": 3
+        },
+        "middle": {
+            "left": 1,
+            "top": 4,
+            "width": 3,
+            "height": 5
+        },
+        "bottom-right": {
+            "left": 2,
+            "top": 9,
+            "width": 2,
+            "height": 1
+        }
+    }
+}
+
+_COMPONENT_COLORS = {
+    'top-left': (1, 1, 1),
+    'middle': (2, 2, 2),
+    'bottom-right': (3, 3, 3),
+}
+
+
+class TestTiledRenderer(unittest.TestCase):
+    def _write_components(self):
+        components = {}
+        for name, color in _COMPONENT_COLORS.items():
+            ph = _TEST_LAYOUT_CONFIG['placeholders'][name]
+            filename = name + '.png'
+
+            templatelayer.testing_common.get_new_image(
+                ph['width'],
+                ph['height'],
+                color=color).save(filename)
+
+            components[name] = filename
+
+        return components
+
+    def _get_expected(self, template_im, components):
+        ct = \
+            templatelayer.template_layout.CompiledTemplate(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        im_mapping = {
+            name: PIL.Image.open(filepath)
+            for name, filepath
+            in components.items()
+        }
+
+        return ct.render(im_mapping)
+
+    def test_render(self):
+        with templatelayer.testing_common.temp_path():
+            components = self._write_components()
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    10,
+                    color=(9, 9, 9))
+
+            expected_im = self._get_expected(template_im, components)
+
+            tl = \
+                templatelayer.template_layout.SimpleTemplateLayout(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            # Strips that both align and don't align with placeholder edges.
+
+            for strip_height in (1, 2, 3, 4, 100):
+                tr = \
+                    templatelayer.tiled.TiledRenderer(
+                        template_im,
+                        tl.placeholder_configs,
+                        strip_height=strip_height)
+
+                f = io.BytesIO()
+                tr.render(components, f)
+
+                f.seek(0)
+                actual_im = PIL.Image.open(f)
+
+                self.assertEquals(actual_im.mode, 'RGB')
+                self.assertEquals(
+                    list(actual_im.getdata()),
+                    list(expected_im.getdata()))
+
+    def test_render__raw_template(self):
+        with templatelayer.testing_common.temp_path():
+            components = self._write_components()
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    10,
+                    color=(9, 9, 9)).convert('RGBA')
+
+            expected_im = self._get_expected(template_im, components)
+
+            templatelayer.raw_template.write_raw_template(
+                template_im,
+                'template.raw')
+
+            rt = templatelayer.raw_template.RawTemplate('template.raw')
+
+            tl = \
+                templatelayer.template_layout.SimpleTemplateLayout(
+                    rt.image,
+                    _TEST_LAYOUT_CONFIG)
+
+            tr = \
+                templatelayer.tiled.TiledRenderer(
+                    rt.image,
+                    tl.placeholder_configs,
+                    canvas_mode=rt.mode,
+                    strip_height=3)
+
+            f = io.BytesIO()
+            tr.render(components, f)
+
+            f.seek(0)
+            actual_im = PIL.Image.open(f)
+
+            self.assertEquals(actual_im.mode, 'RGBA')
+            self.assertEquals(
+                list(actual_im.getdata()),
+                list(expected_im.getdata()))
+
+    def test_render__masks(self):
+        config = {
+            "placeholders": {
+                "masked": {
+                    "left": 1,
+                    "top": 1,
+                    "width": 2,
+                    "height": 4,
+                    "mask": "mask.png"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            mask_im = PIL.Image.new('L', (2, 4), 0)
+            mask_im.putpixel((0, 0), 255)
+            mask_im.putpixel((1, 3), 128)
+            mask_im.save('mask.png')
+
+            templatelayer.testing_common.get_new_image(
+                2,
+                4,
+                color=(200, 100, 0)).save('masked.png')
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    6,
+                    color=(9, 9, 9))
+
+            ct = \
+                templatelayer.template_layout.CompiledTemplate(
+                    template_im,
+                    config)
+
+            with PIL.Image.open('masked.png') as component_im:
+                expected_im = ct.render({ 'masked': component_im })
+
+            tr = \
+                templatelayer.tiled.TiledRenderer(
+                    template_im,
+                    ct.placeholder_configs,
+                    strip_height=3,
+                    masks=ct.masks)
+
+            f = io.BytesIO()
+            tr.render({ 'masked': 'masked.png' }, f)
+
+            f.seek(0)
+            actual_im = PIL.Image.open(f)
+
+            self.assertEquals(
+                list(actual_im.getdata()),
+                list(expected_im.getdata()))
+
+            self.assertEquals(actual_im.getpixel((1, 1)), (200, 100, 0))
+            self.assertEquals(actual_im.getpixel((1, 2)), (9, 9, 9))
+
+    def test_render__fit(self):
+        config = {
+            "placeholders": {
+                "contained": {
+                    "left": 0,
+                    "top": 1,
+                    "width": 2,
+                    "height": 6,
+                    "fit": "contain"
+                },
+                "covered": {
+                    "left": 2,
+                    "top": 0,
+                    "width": 2,
+                    "height": 5,
+                    "fit": "cover"
+                }
+            }
+        }
+
+        with templatelayer.testing_common.temp_path():
+            component_im = \
+                templatelayer.testing_common.get_new_image(
+                    6,
+                    9,
+                    color=(200, 100, 0))
+
+            component_im.paste((0, 100, 200), (0, 0, 6, 3))
+            component_im.save('component.png')
+
+            components = {
+                'contained': 'component.png',
+                'covered': 'component.png',
+            }
+
+            template_im = \
+                templatelayer.testing_common.get_new_image(
+                    4,
+                    8,
+                    color=(9, 9, 9))
+
+            ct = \
+                templatelayer.template_layout.CompiledTemplate(
+                    template_im,
+                    config)
+
+            with PIL.Image.open('component.png') as im:
+                expected_im = ct.render({ 'contained': im, 'covered': im })
+
+            for strip_height in (1, 2, 3, 100):
+                tr = \
+                    templatelayer.tiled.TiledRenderer(
+                        template_im,
+                        ct.placeholder_configs,
+                        strip_height=strip_height)
+
+                f = io.BytesIO()
+                tr.render(components, f)
+
+                f.seek(0)
+                actual_im = PIL.Image.open(f)
+
+                self.assertEquals(
+                    list(actual_im.getdata()),
+                    list(expected_im.getdata()))
+
+    def test_render__not_compatible(self):
+        with templatelayer.testing_common.temp_path():
+            templatelayer.testing_common.get_new_image(
+                5,
+                5).save('wrong.png')
+
+            template_im = templatelayer.testing_common.get_new_image(4, 10)
+
+            tl = \
+                templatelayer.template_layout.SimpleTemplateLayout(
+                    template_im,
+                    _TEST_LAYOUT_CONFIG)
+
+            tr = \
+                templatelayer.tiled.TiledRenderer(
+                    template_im,
+                    tl.placeholder_configs)
+
+            try:
+                tr.render({ 'middle': 'wrong.png' }, io.BytesIO())
+            except templatelayer.template_layout.PlaceholderNotCompatibleException:
+                pass
+            else:
+                raise Exception("Expected compatibility exception.")
+
+    def test_render__unsupported_mode(self):
+        template_im = \
+            templatelayer.testing_common.get_new_image(
+                4,
+                10).convert('CMYK')
+
+        tl = \
+            templatelayer.template_layout.SimpleTemplateLayout(
+                template_im,
+                _TEST_LAYOUT_CONFIG)
+
+        tr = \
+            templatelayer.tiled.TiledRenderer(
+                template_im,
+                tl.placeholder_configs)
+
+        try:
+            tr.render({}, io.BytesIO())
+        except templatelayer.tiled.TiledRenderException:
+            pass
+        else:
+            raise Exception("Expected exception for unsupported mode.")